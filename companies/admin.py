@@ -1,12 +1,50 @@
+from decimal import Decimal
 from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connections, models
+from django.db.models.functions import Coalesce, NullIf, Round
 from django.http import HttpResponse, HttpResponseRedirect
 from django.urls import path, reverse
+from django.utils.functional import cached_property
 from django.core.management import call_command
+from . import history
+from .approval import review_many
 from .models import (
     ServiceCategory, ProductCategory, Location,
-    Business, PoliticalData, EditRequest, DataSource
+    Business, PoliticalData, PoliticalDataHistory, EditRequest, DataSource
 )
 
+class EstimatedCountPaginator(Paginator):
+    """
+    For an unfiltered changelist of a large table, pages with PostgreSQL's
+    row estimate for the table instead of a COUNT(*) over every row. Searches
+    and filters are counted exactly.
+    """
+    # Below this many rows an exact count is cheap and the estimate least accurate
+    threshold = 10000
+
+    def estimated_count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql' or queryset.query.where or queryset.query.distinct:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # reltuples is -1 (0 before PostgreSQL 14) until the table is analyzed
+        return int(row[0]) if row and row[0] > 0 else None
+
+    @cached_property
+    def count(self):
+        estimate = self.estimated_count()
+        if estimate is not None and estimate >= self.threshold:
+            return estimate
+        return super().count
+
+
 class CategoryImportMixin:
     def get_urls(self):
         urls = super().get_urls()
@@ -50,16 +88,70 @@ class EditRequestInline(admin.TabularInline):
     readonly_fields = ('created_at', 'reviewed_at')
 
 
+class LocationStateFilter(admin.SimpleListFilter):
+    """
+    Businesses with a location in a state. Lists the states rather than every
+    location, and filters with an EXISTS on the through table instead of a
+    join, so the changelist needs no DISTINCT.
+    """
+    title = 'location'
+    parameter_name = 'state'
+
+    def lookups(self, request, model_admin):
+        states = Location.objects.order_by('state').values_list('state', flat=True).distinct()
+        return [(state, state) for state in states]
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        through = Business.locations.through
+        return queryset.filter(models.Exists(
+            through.objects.filter(business=models.OuterRef('pk'), location__state=self.value())
+        ))
+
+
 # Step 3: Updated BusinessAdmin to include inlines
 @admin.register(Business)
 class BusinessAdmin(admin.ModelAdmin):
     list_display = ('name', 'website', 'provides_services', 'provides_products', 'created_at', 'updated_at')
     search_fields = ('name', 'description', 'website')
-    list_filter = ('provides_services', 'provides_products', 'locations')
+    list_filter = ('provides_services', 'provides_products', LocationStateFilter)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
     filter_horizontal = ('services', 'products', 'locations')
     prepopulated_fields = {'slug': ('name',)}
     inlines = [PoliticalDataInline, EditRequestInline]  # Added inlines here
 
+    def save_formset(self, request, form, formset, change):
+        if formset.model is not PoliticalData:
+            return super().save_formset(request, form, formset, change)
+        befores = [
+            (inline_form, history.form_snapshot(inline_form))
+            for inline_form in formset.forms if inline_form.has_changed()
+        ]
+        super().save_formset(request, form, formset, change)
+        history.record(
+            history.entry(before, inline_form.instance, 'admin', user=request.user)
+            for inline_form, before in befores
+        )
+
+
+def percentage(part, total):
+    """
+    SQL for the share of total that part makes up, as a percentage rounded
+    like the PoliticalData percentage properties: NULL when there is no total
+    """
+    zero, hundred = models.Value(Decimal('0')), models.Value(Decimal('100'))
+    return Round(
+        Coalesce(models.F(part), zero) * hundred / NullIf(models.F(total), zero),
+        2,
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def format_percentage(value):
+    return f"{value:.1f}%" if value else "N/A"
+
 
 @admin.register(PoliticalData)
 class PoliticalDataAdmin(admin.ModelAdmin):
@@ -74,7 +166,8 @@ class PoliticalDataAdmin(admin.ModelAdmin):
         'senior_employee_trump_donor',
         'last_updated'
     )
-    search_fields = ('business__name', 'data_source')
+    list_select_related = ('business',)
+    search_fields = ('business__name',)
     list_filter = (
         'direct_america_pac_donor',
         'direct_save_america_pac_donor',
@@ -84,35 +177,93 @@ class PoliticalDataAdmin(admin.ModelAdmin):
         'senior_employee_america_pac_donor',
         'senior_employee_save_america_pac_donor'
     )
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    def get_queryset(self, request):
+        # Percentages are computed in the query, so the columns can be sorted on
+        return super().get_queryset(request).annotate(
+            direct_conservative_pct=percentage('direct_conservative_total_donations', 'direct_total_donations'),
+            direct_liberal_pct=percentage('direct_liberal_total_donations', 'direct_total_donations'),
+            pac_conservative_pct=percentage('affiliated_pac_conservative_total_donations', 'affiliated_pac_total_donations'),
+            pac_liberal_pct=percentage('affiliated_pac_liberal_total_donations', 'affiliated_pac_total_donations'),
+        )
 
     def get_direct_conservative_pct(self, obj):
-        return f"{obj.direct_conservative_percentage:.1f}%" if obj.direct_conservative_percentage else "N/A"
+        return format_percentage(obj.direct_conservative_pct)
     get_direct_conservative_pct.short_description = "Direct Cons %"
+    get_direct_conservative_pct.admin_order_field = 'direct_conservative_pct'
 
     def get_direct_liberal_pct(self, obj):
-        return f"{obj.direct_liberal_percentage:.1f}%" if obj.direct_liberal_percentage else "N/A"
+        return format_percentage(obj.direct_liberal_pct)
     get_direct_liberal_pct.short_description = "Direct Lib %"
+    get_direct_liberal_pct.admin_order_field = 'direct_liberal_pct'
 
     def get_pac_conservative_pct(self, obj):
-        return f"{obj.affiliated_pac_conservative_percentage:.1f}%" if obj.affiliated_pac_conservative_percentage else "N/A"
+        return format_percentage(obj.pac_conservative_pct)
     get_pac_conservative_pct.short_description = "PAC Cons %"
+    get_pac_conservative_pct.admin_order_field = 'pac_conservative_pct'
 
     def get_pac_liberal_pct(self, obj):
-        return f"{obj.affiliated_pac_liberal_percentage:.1f}%" if obj.affiliated_pac_liberal_percentage else "N/A"
+        return format_percentage(obj.pac_liberal_pct)
     get_pac_liberal_pct.short_description = "PAC Lib %"
+    get_pac_liberal_pct.admin_order_field = 'pac_liberal_pct'
+
+    def save_model(self, request, obj, form, change):
+        before = history.form_snapshot(form)
+        super().save_model(request, obj, form, change)
+        history.record([history.entry(before, obj, 'admin', user=request.user)])
+
+    def delete_model(self, request, obj):
+        before = history.snapshot(obj)
+        super().delete_model(request, obj)
+        history.record([history.entry(before, None, 'admin', business=obj.business, user=request.user)])
+
+    def delete_queryset(self, request, queryset):
+        objs = list(queryset.select_related('business'))
+        super().delete_queryset(request, queryset)
+        history.record(
+            history.entry(history.snapshot(obj), None, 'admin', business=obj.business, user=request.user)
+            for obj in objs
+        )
+
+
+@admin.register(PoliticalDataHistory)
+class PoliticalDataHistoryAdmin(admin.ModelAdmin):
+    list_display = ('business', 'changed_at', 'source', 'changed_by', 'edit_request', 'changed_fields')
+    list_filter = ('source',)
+    search_fields = ('business__name', 'changed_by__username', 'note')
+    list_select_related = ('business', 'changed_by', 'edit_request')
+    date_hierarchy = 'changed_at'
+    ordering = ('-changed_at', '-id')
+
+    def changed_fields(self, obj):
+        return ', '.join(obj.changes)
+    changed_fields.short_description = "Changed fields"
+
+    # The history is append-only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(EditRequest)
 class EditRequestAdmin(admin.ModelAdmin):
-    list_display = ('business', 'submitted_by', 'status', 'justification', 'created_at', 'reviewed_at')
+    list_display = ('business', 'submitted_by', 'status', 'duplicate_count', 'justification', 'created_at', 'reviewed_at')
     search_fields = ('business__name', 'submitted_by__username', 'justification', 'review_notes')
     list_filter = ('status',)
     filter_horizontal = ('services_to_add', 'services_to_remove', 'products_to_add', 'products_to_remove')
-    readonly_fields = ('created_at', 'reviewed_at')
+    readonly_fields = ('created_at', 'reviewed_at', 'duplicate_count')
+    actions = ['approve_selected', 'reject_selected']
 
     fieldsets = (
         ('Basic Information', {
-            'fields': ('business', 'submitted_by', 'status', 'justification', 'supporting_links')
+            'fields': ('business', 'submitted_by', 'status', 'duplicate_count', 'justification', 'supporting_links')
         }),
         ('Direct Donation Changes', {
             'fields': (
@@ -150,11 +301,53 @@ class EditRequestAdmin(admin.ModelAdmin):
         }),
     )
 
+    def review_selected(self, request, queryset, status):
+        reviewed, conflicted = review_many(queryset, request.user, status)
+        self.message_user(request, f'{len(reviewed)} edit request(s) {status}.', messages.SUCCESS)
+        if conflicted:
+            self.message_user(
+                request,
+                f'{len(conflicted)} edit request(s) conflict with another selected request '
+                'for the same business and were left pending.',
+                messages.WARNING,
+            )
+
+    def approve_selected(self, request, queryset):
+        self.review_selected(request, queryset, 'approved')
+    approve_selected.short_description = "Approve selected pending edit requests"
+
+    def reject_selected(self, request, queryset):
+        self.review_selected(request, queryset, 'rejected')
+    reject_selected.short_description = "Reject selected pending edit requests"
+
+
+class LinkHealthFilter(admin.SimpleListFilter):
+    title = 'link health'
+    parameter_name = 'link'
+
+    def lookups(self, request, model_admin):
+        return (
+            ('ok', 'Working'),
+            ('broken', 'Broken'),
+            ('unchecked', 'Not checked yet'),
+        )
+
+    def queryset(self, request, queryset):
+        if self.value() == 'ok':
+            return queryset.filter(last_checked_at__isnull=False, check_failures=0)
+        if self.value() == 'broken':
+            return queryset.filter(check_failures__gt=0)
+        if self.value() == 'unchecked':
+            return queryset.filter(last_checked_at__isnull=True)
+        return queryset
+
 
 # Step 4: Register DataSource model
 @admin.register(DataSource)
 class DataSourceAdmin(admin.ModelAdmin):
-    list_display = ('business', 'url', 'reason', 'is_approved', 'created_at')
+    list_display = ('business', 'url', 'reason', 'is_approved', 'last_status', 'last_checked_at', 'created_at')
     search_fields = ('business__name', 'url', 'reason')
-    list_filter = ('is_approved', 'reason')
+    list_filter = ('is_approved', 'reason', LinkHealthFilter)
+    list_select_related = ('business',)
+    readonly_fields = ('last_checked_at', 'last_status', 'last_error', 'check_failures')
     ordering = ('-created_at',)
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from ..approval import BUSINESS_FIELDS, M2M_CHANGE_SETS, POLITICAL_FIELDS
 from ..models import EditRequest, Business
 
 class BusinessSerializer(serializers.ModelSerializer):
@@ -13,11 +14,9 @@ class EditRequestSerializer(serializers.ModelSerializer):
         model = EditRequest
         fields = [
             'id', 'business', 'submitted_by', 'status',
-            'name', 'description', 'republican_percentage',
-            'democrat_percentage', 'trump_donor',
-            'america_pac_donor', 'total_donations',
+            *BUSINESS_FIELDS, *POLITICAL_FIELDS, *M2M_CHANGE_SETS,
             'data_source', 'justification', 'supporting_links',
             'created_at', 'reviewed_at', 'reviewed_by',
-            'review_notes'
+            'review_notes', 'changes'
         ]
-        read_only_fields = ['status', 'reviewed_at', 'reviewed_by', 'review_notes']
\ No newline at end of file
+        read_only_fields = ['status', 'reviewed_at', 'reviewed_by', 'review_notes', 'changes']
\ No newline at end of file
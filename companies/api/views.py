@@ -1,7 +1,9 @@
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
+from .. import approval, submission
 from ..models import EditRequest, Business
 from .serializers import EditRequestSerializer, BusinessSerializer
 
@@ -11,14 +13,41 @@ class EditRequestViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def perform_create(self, serializer):
-        serializer.save(submitted_by=self.request.user)
+        edit_request = serializer.save(submitted_by=self.request.user)
+        approval.record_changes(edit_request)
     
+    def update(self, request, *args, **kwargs):
+        # Proposals can only change while pending, so a reviewer never
+        # approves something other than what the review page showed
+        try:
+            with transaction.atomic():
+                edit_request = EditRequest.objects.select_for_update().get(pk=self.get_object().pk)
+                if edit_request.status != 'pending':
+                    return Response(
+                        {'error': f'Edit request {edit_request.pk} has already been {edit_request.status}.'},
+                        status=409,
+                    )
+                return super().update(request, *args, **kwargs)
+        except IntegrityError:
+            # The edit now matches another pending request (unique_pending_edit_request)
+            return Response({'error': 'An identical edit request is already pending.'}, status=409)
+
+    def perform_update(self, serializer):
+        edit_request = serializer.save()
+        # Re-snapshot the edited changes; requests submitted through the
+        # form also keep their fingerprint current for coalescing
+        if edit_request.fingerprint:
+            edit_request.fingerprint = submission.request_fingerprint(edit_request)
+        edit_request.changes = approval.snapshot_changes(edit_request)
+        edit_request.save(update_fields=['changes', 'fingerprint'])
+
     def get_queryset(self):
         # Regular users can only see their own edit requests
         # Admins can see all
+        queryset = EditRequest.objects.for_review()
         if self.request.user.is_staff:
-            return EditRequest.objects.all()
-        return EditRequest.objects.filter(submitted_by=self.request.user)
+            return queryset
+        return queryset.filter(submitted_by=self.request.user)
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
     def review(self, request, pk=None):
@@ -26,34 +55,32 @@ class EditRequestViewSet(viewsets.ModelViewSet):
         status = request.data.get('status')
         notes = request.data.get('review_notes', '')
         
-        if status not in ['approved', 'rejected']:
+        if status not in approval.REVIEW_STATUSES:
             return Response({'error': 'Invalid status'}, status=400)
-            
-        edit_request.status = status
-        edit_request.reviewed_by = request.user
-        edit_request.review_notes = notes
-        edit_request.save()
-        
-        if status == 'approved':
-            # Apply the changes to the business
-            self._apply_changes(edit_request)
-            
+
+        try:
+            edit_request = approval.review(edit_request, request.user, status, notes)
+        except approval.AlreadyReviewed as e:
+            return Response({'error': str(e)}, status=409)
         return Response(EditRequestSerializer(edit_request).data)
-    
-    def _apply_changes(self, edit_request):
-        business = edit_request.business
-        # Update the business with the approved changes
-        for field in ['name', 'description']:
-            if getattr(edit_request, field):
-                setattr(business, field, getattr(edit_request, field))
-                
-        # Update political data
-        political_data = business.politicaldata
-        for field in ['republican_percentage', 'democrat_percentage', 
-                     'trump_donor', 'america_pac_donor', 
-                     'total_donations', 'data_source']:
-            if getattr(edit_request, field) is not None:
-                setattr(political_data, field, getattr(edit_request, field))
-        
-        business.save()
-        political_data.save()
\ No newline at end of file
+
+    @action(detail=False, methods=['post'], url_path='bulk-review',
+            permission_classes=[permissions.IsAdminUser])
+    def bulk_review(self, request):
+        # JSON bodies send a list; form bodies repeat the field
+        ids = request.data.getlist('ids') if hasattr(request.data, 'getlist') else request.data.get('ids')
+        status = request.data.get('status')
+        notes = request.data.get('review_notes', '')
+
+        if status not in approval.REVIEW_STATUSES:
+            return Response({'error': 'Invalid status'}, status=400)
+        if not isinstance(ids, list) or not ids or not all(str(pk).isdigit() for pk in ids):
+            return Response({'error': 'ids must be a list of edit request ids'}, status=400)
+
+        reviewed, conflicted = approval.review_many(
+            EditRequest.objects.filter(pk__in=ids), request.user, status, notes
+        )
+        return Response({
+            'reviewed': [edit_request.pk for edit_request in reviewed],
+            'conflicted': [edit_request.pk for edit_request in conflicted],
+        })
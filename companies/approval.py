@@ -0,0 +1,350 @@
+"""
+Applying reviewed edit requests to businesses.
+
+The fields an EditRequest can change are derived from the models: any
+concrete, non-automatic field it shares by name with Business or
+PoliticalData. The service/product change sets are read from their four
+through tables in one query, and changes are written with one bulk
+statement per table, so approving one request or a batch of hundreds takes
+the same fixed number of queries.
+"""
+from collections import Counter
+from decimal import Decimal
+from django.db import models, transaction
+from django.utils import timezone
+from . import history
+from .models import Business, DataSource, EditRequest, EditRequestCount, PoliticalData
+
+REVIEW_STATUSES = ('approved', 'rejected')
+
+class AlreadyReviewed(Exception):
+    """Raised when reviewing an edit request that is no longer pending"""
+
+def _shared_fields(target):
+    target_fields = {
+        field.name for field in target._meta.concrete_fields
+        if not field.primary_key and not field.is_relation
+        and not getattr(field, 'auto_now', False)
+        and not getattr(field, 'auto_now_add', False)
+    }
+    return tuple(
+        field.name for field in EditRequest._meta.concrete_fields
+        if field.name in target_fields
+    )
+
+BUSINESS_FIELDS = _shared_fields(Business)
+POLITICAL_FIELDS = _shared_fields(PoliticalData)
+
+# Business relation -> EditRequest change sets (to add, to remove)
+M2M_CHANGES = {
+    'services': ('services_to_add', 'services_to_remove'),
+    'products': ('products_to_add', 'products_to_remove'),
+}
+M2M_CHANGE_SETS = tuple(name for names in M2M_CHANGES.values() for name in names)
+
+def proposed_values(edit_request, fields):
+    """
+    {field: value} for the fields the edit request sets; blank and null
+    values leave the current data alone
+    """
+    values = {}
+    for name in fields:
+        value = getattr(edit_request, name)
+        if value is not None and value != '':
+            values[name] = value
+    return values
+
+def m2m_changes_for(edit_requests):
+    """
+    {edit request pk: {change set: set of category ids}} for the four M2M
+    change sets, read with a single UNION over their through tables
+    """
+    pks = [edit_request.pk for edit_request in edit_requests]
+    queries = []
+    for name in M2M_CHANGE_SETS:
+        field = EditRequest._meta.get_field(name)
+        source = field.m2m_field_name()
+        queries.append(
+            field.remote_field.through.objects
+            .filter(**{f'{source}__in': pks})
+            .values_list(
+                source,
+                models.Value(name, output_field=models.CharField()),
+                field.m2m_reverse_field_name(),
+            )
+        )
+    changes = {pk: {name: set() for name in M2M_CHANGE_SETS} for pk in pks}
+    if pks:
+        for edit_request_pk, name, pk in queries[0].union(*queries[1:], all=True):
+            changes[edit_request_pk][name].add(pk)
+    return changes
+
+def m2m_changes(edit_request):
+    return m2m_changes_for([edit_request])[edit_request.pk]
+
+def get_political_data(business):
+    try:
+        return business.politicaldata
+    except PoliticalData.DoesNotExist:
+        return None
+
+def _snapshot_value(value):
+    if isinstance(value, (Decimal, float)):
+        return f"{value:.2f}"
+    return value
+
+def snapshot_changes(edit_request):
+    """
+    The request's changes against the current data as a compact,
+    JSON-ready list of [field, before, after]. Category changes list names,
+    with an empty before for additions and an empty after for removals.
+    """
+    business = edit_request.business
+    political_data = get_political_data(business)
+    snapshot = []
+
+    for fields, target in ((BUSINESS_FIELDS, business), (POLITICAL_FIELDS, political_data)):
+        for field, value in proposed_values(edit_request, fields).items():
+            before = getattr(target, field) if target else None
+            snapshot.append([field, _snapshot_value(before), _snapshot_value(value)])
+
+    changes = m2m_changes(edit_request)
+    for relation, (add_name, remove_name) in M2M_CHANGES.items():
+        ids = changes[add_name] | changes[remove_name]
+        if not ids:
+            continue
+        names = dict(
+            Business._meta.get_field(relation).related_model.objects
+            .filter(pk__in=ids).values_list('pk', 'name')
+        )
+        if changes[add_name]:
+            snapshot.append([add_name, [], sorted(names[pk] for pk in changes[add_name])])
+        if changes[remove_name]:
+            snapshot.append([remove_name, sorted(names[pk] for pk in changes[remove_name]), []])
+
+    source_urls = sorted(DataSource.objects.filter(edit_request=edit_request).values_list('url', flat=True))
+    if source_urls:
+        snapshot.append(['data_sources', [], source_urls])
+    return snapshot
+
+def record_changes(edit_request):
+    """
+    Store the request's snapshot on EditRequest.changes. Call once the
+    request's categories and data sources have been saved.
+    """
+    edit_request.changes = snapshot_changes(edit_request)
+    edit_request.save(update_fields=['changes'])
+    return edit_request.changes
+
+def find_conflicts(edit_requests, changes):
+    """
+    Pks of requests that disagree with another request for the same
+    business: a field set to different values, or a category one request
+    adds and another removes
+    """
+    by_business = {}
+    for edit_request in edit_requests:
+        by_business.setdefault(edit_request.business_id, []).append(edit_request)
+
+    conflicts = set()
+    for group in by_business.values():
+        if len(group) < 2:
+            continue
+        values = {}
+        for edit_request in group:
+            proposed = proposed_values(edit_request, BUSINESS_FIELDS + POLITICAL_FIELDS)
+            for name, value in proposed.items():
+                values.setdefault(name, {}).setdefault(value, set()).add(edit_request.pk)
+            for relation, (add_name, remove_name) in M2M_CHANGES.items():
+                for name, adds in ((add_name, True), (remove_name, False)):
+                    for pk in changes[edit_request.pk][name]:
+                        values.setdefault((relation, pk), {}).setdefault(adds, set()).add(edit_request.pk)
+        for proposals in values.values():
+            if len(proposals) > 1:
+                conflicts.update(*proposals.values())
+    return conflicts
+
+def apply_changes(edit_requests, changes=None):
+    """
+    Apply approved edit requests to their businesses with one statement per
+    table, however many requests and businesses there are, recording each
+    request's political data changes in the history. Requests for the
+    same business are applied in order, so run find_conflicts() first when
+    they may disagree. Load the requests with EditRequest.objects.for_review()
+    so the businesses and their political data don't cost extra queries.
+    """
+    if not edit_requests:
+        return
+    if changes is None:
+        changes = m2m_changes_for(edit_requests)
+    now = timezone.now()
+
+    businesses = {}
+    changed_businesses = {}
+    business_fields = set()
+    existing_political = {}
+    new_political = {}
+    political_fields = set()
+    m2m = {relation: ({}, {}) for relation in M2M_CHANGES}
+    history_entries = []
+
+    for edit_request in edit_requests:
+        # Requests for the same business share one instance
+        business = businesses.setdefault(edit_request.business_id, edit_request.business)
+
+        values = proposed_values(edit_request, BUSINESS_FIELDS)
+        if values:
+            for name, value in values.items():
+                setattr(business, name, value)
+            business.updated_at = now
+            business_fields.update(values)
+            changed_businesses[business.pk] = business
+
+        values = proposed_values(edit_request, POLITICAL_FIELDS)
+        if values:
+            political_data = (
+                existing_political.get(business.pk) or new_political.get(business.pk)
+                or get_political_data(business)
+            )
+            if political_data is None:
+                before = history.snapshot(None)
+                political_data = PoliticalData(business=business)
+                new_political[business.pk] = political_data
+            else:
+                before = history.snapshot(political_data)
+                if political_data.pk:
+                    existing_political[business.pk] = political_data
+            for name, value in values.items():
+                setattr(political_data, name, value)
+            political_data.last_updated = now
+            political_fields.update(values)
+            history_entries.append(history.entry(
+                before, political_data, 'edit_request', business=business,
+                user=edit_request.reviewed_by, edit_request=edit_request, when=now,
+            ))
+
+        for relation, (add_name, remove_name) in M2M_CHANGES.items():
+            to_add, to_remove = m2m[relation]
+            added = to_add.setdefault(business.pk, set())
+            removed = to_remove.setdefault(business.pk, set())
+            added.difference_update(changes[edit_request.pk][remove_name])
+            added.update(changes[edit_request.pk][add_name])
+            removed.difference_update(changes[edit_request.pk][add_name])
+            removed.update(changes[edit_request.pk][remove_name])
+
+    if changed_businesses:
+        Business.objects.bulk_update(
+            changed_businesses.values(), [*sorted(business_fields), 'updated_at']
+        )
+    if existing_political:
+        PoliticalData.objects.bulk_update(
+            existing_political.values(), [*sorted(political_fields), 'last_updated']
+        )
+    if new_political:
+        PoliticalData.objects.bulk_create(new_political.values())
+        for business_pk, political_data in new_political.items():
+            businesses[business_pk].politicaldata = political_data
+    history.record(history_entries)
+
+    for relation, (to_add, to_remove) in m2m.items():
+        _apply_m2m(businesses, relation, to_add, to_remove)
+
+    DataSource.objects.filter(edit_request__in=edit_requests).update(is_approved=True)
+
+def _apply_m2m(businesses, relation, to_add, to_remove):
+    """
+    One DELETE and one INSERT on the Business through table for all businesses
+    """
+    field = Business._meta.get_field(relation)
+    through = field.remote_field.through
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+
+    condition = models.Q()
+    for business_pk, pks in to_remove.items():
+        if pks:
+            condition |= models.Q(**{source: business_pk, f'{target}__in': pks})
+    if condition:
+        through.objects.filter(condition).delete()
+
+    rows = [
+        through(**{f'{source}_id': business_pk, f'{target}_id': pk})
+        for business_pk, pks in to_add.items() for pk in pks
+    ]
+    if rows:
+        # The through table's unique (business, category) pair makes re-adding a no-op
+        through.objects.bulk_create(rows, ignore_conflicts=True)
+
+    for business in businesses.values():
+        if hasattr(business, '_prefetched_objects_cache'):
+            business._prefetched_objects_cache.pop(relation, None)
+
+def _record_review(edit_requests, reviewer, status, notes):
+    reviewed_at = timezone.now()
+    EditRequest.objects.filter(pk__in=[edit_request.pk for edit_request in edit_requests]).update(
+        status=status, reviewed_by=reviewer, reviewed_at=reviewed_at, review_notes=notes
+    )
+    # update() skips the signals that maintain the status counts
+    deltas = Counter()
+    for edit_request in edit_requests:
+        deltas[getattr(edit_request, '_loaded_status', edit_request.status)] -= 1
+        deltas[status] += 1
+        edit_request.status = edit_request._loaded_status = status
+        edit_request.reviewed_by = reviewer
+        edit_request.reviewed_at = reviewed_at
+        edit_request.review_notes = notes
+    EditRequestCount.adjust(deltas)
+
+def review(edit_request, reviewer, status, notes=''):
+    """
+    Record a review decision and, for approvals, apply the changes, all in
+    one transaction. Used by the review page and the API. Returns the
+    reviewed request, re-read under lock; raises AlreadyReviewed if it has
+    been reviewed since it was loaded.
+    """
+    if status not in REVIEW_STATUSES:
+        raise ValueError(f'Invalid review status: {status!r}')
+    with transaction.atomic():
+        # As in review_many, lock the request and its business, so a double
+        # submission or a stale review page can't apply the changes twice
+        edit_request = (
+            EditRequest.objects.for_review()
+            .select_for_update(of=('self', 'business'))
+            .get(pk=edit_request.pk)
+        )
+        if edit_request.status != 'pending':
+            raise AlreadyReviewed(f'Edit request {edit_request.pk} has already been {edit_request.status}.')
+        _record_review([edit_request], reviewer, status, notes)
+        if status == 'approved':
+            apply_changes([edit_request])
+    return edit_request
+
+def review_many(queryset, reviewer, status, notes=''):
+    """
+    Review every pending request in queryset in one transaction. When
+    approving, requests that conflict with another request in the batch
+    for the same business are left pending for individual review.
+    Returns (reviewed, conflicted) lists of edit requests.
+    """
+    if status not in REVIEW_STATUSES:
+        raise ValueError(f'Invalid review status: {status!r}')
+    with transaction.atomic():
+        # Lock the requests and their businesses so concurrent reviews of
+        # the same rows wait rather than apply twice or overwrite each other
+        edit_requests = list(
+            queryset.filter(status='pending').for_review()
+            .select_for_update(of=('self', 'business'))
+            .order_by('created_at', 'pk')
+        )
+        conflicted = []
+        changes = None
+        if status == 'approved' and edit_requests:
+            changes = m2m_changes_for(edit_requests)
+            conflicts = find_conflicts(edit_requests, changes)
+            conflicted = [edit_request for edit_request in edit_requests if edit_request.pk in conflicts]
+            edit_requests = [edit_request for edit_request in edit_requests if edit_request.pk not in conflicts]
+        if edit_requests:
+            _record_review(edit_requests, reviewer, status, notes)
+            if status == 'approved':
+                apply_changes(edit_requests, changes)
+    return edit_requests, conflicted
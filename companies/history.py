@@ -0,0 +1,135 @@
+"""
+Audit history of businesses' political data.
+
+Every write to PoliticalData records a PoliticalDataHistory row holding
+only the fields that changed, as {field: [old, new]}, together with who
+made the change and what caused it. Rows are built unsaved with entry()
+and written by record() in a single INSERT, inside the caller's
+transaction. Because each row carries the new values, the state at any
+point in time is the fold of a business's rows up to that point, read in
+order from the (business, changed_at) index.
+"""
+from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+from .models import PoliticalData, PoliticalDataHistory
+
+TRACKED_FIELDS = tuple(
+    field.name for field in PoliticalData._meta.concrete_fields
+    if not field.primary_key and not field.is_relation
+    and not getattr(field, 'auto_now', False)
+)
+
+def _json_value(value):
+    if isinstance(value, (Decimal, float)):
+        return f"{value:.2f}"
+    return value
+
+def snapshot(source):
+    """
+    {field: JSON value} for the tracked fields of a PoliticalData instance.
+    None gives all None, for data that doesn't exist yet or any more.
+    """
+    if source is None:
+        return {name: None for name in TRACKED_FIELDS}
+    return {name: _json_value(getattr(source, name)) for name in TRACKED_FIELDS}
+
+def form_snapshot(form):
+    """
+    Snapshot of a PoliticalData model form's instance as it was before the
+    form's changes were applied to it (the form's initial data, for the
+    fields it has)
+    """
+    if form.instance._state.adding:
+        return snapshot(None)
+    before = snapshot(form.instance)
+    before.update({
+        name: _json_value(form.initial.get(name)) for name in TRACKED_FIELDS if name in form.fields
+    })
+    return before
+
+def entry(before, political_data, source, business=None, user=None, edit_request=None, note='', when=None):
+    """
+    Unsaved history row for the change from the before snapshot to
+    political_data (None once it has been deleted), or None when no tracked
+    field changed
+    """
+    after = snapshot(political_data)
+    changes = {
+        name: [before[name], after[name]]
+        for name in TRACKED_FIELDS if before[name] != after[name]
+    }
+    if not changes:
+        return None
+    return PoliticalDataHistory(
+        business=business or political_data.business,
+        changed_at=when or timezone.now(),
+        changed_by=user,
+        edit_request=edit_request,
+        source=source,
+        note=note[:255],
+        changes=changes,
+    )
+
+def created(political_data, source, **kwargs):
+    """History row for newly created political data"""
+    return entry(snapshot(None), political_data, source, **kwargs)
+
+def record(entries):
+    """
+    Write the history rows in one INSERT, skipping Nones
+    """
+    rows = [row for row in entries if row is not None]
+    if rows:
+        PoliticalDataHistory.objects.bulk_create(rows)
+    return rows
+
+def state_at(business, when):
+    """
+    The business's political data as it was at when, as {field: value}, or
+    None if it had none then
+    """
+    deltas = (
+        PoliticalDataHistory.objects
+        .filter(business=business, changed_at__lte=when)
+        .order_by('changed_at', 'id')
+        .values_list('changes', flat=True)
+    )
+    state = {name: None for name in TRACKED_FIELDS}
+    for changes in deltas.iterator():
+        for name, (_, new) in changes.items():
+            if name in state:
+                state[name] = new
+    if all(value is None for value in state.values()):
+        return None
+    values = {}
+    for name, value in state.items():
+        field = PoliticalData._meta.get_field(name)
+        # A field added after the history began has no recorded value
+        values[name] = field.get_default() if value is None and not field.null else field.to_python(value)
+    return values
+
+def rollback(business, when, user=None):
+    """
+    Restore the business's political data to its state at when, recording
+    the rollback in the history. Returns the restored PoliticalData, or None
+    if the business had no political data then (nothing is changed).
+    """
+    state = state_at(business, when)
+    if state is None:
+        return None
+    with transaction.atomic():
+        political_data = PoliticalData.objects.select_for_update().filter(business=business).first()
+        if political_data is None:
+            before = snapshot(None)
+            political_data = PoliticalData(business=business)
+        else:
+            before = snapshot(political_data)
+        for name, value in state.items():
+            setattr(political_data, name, value)
+        political_data.save()
+        record([entry(
+            before, political_data, 'rollback', business=business, user=user,
+            note=f'Restored state as of {when.isoformat()}',
+        )])
+    return political_data
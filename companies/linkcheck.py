@@ -0,0 +1,136 @@
+"""
+Checking that data source URLs still resolve.
+
+Sources are checked concurrently from an asyncio event loop: requests run
+on a thread pool sized to the concurrency limit, a semaphore bounds how many
+are in flight, and a per-host limiter spaces out requests to the same site
+so a business with hundreds of sources on one domain isn't hammered. Each
+request is conditional on the ETag and Last-Modified seen last time, so an
+unchanged page costs a 304 and no body.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.utils import timezone
+from .models import DataSource
+
+USER_AGENT = 'TheBlueList link checker (+https://mybluelist.org)'
+
+# DataSource fields written back after a check
+RESULT_FIELDS = ['last_checked_at', 'last_status', 'last_error', 'check_failures', 'etag', 'last_modified']
+
+@dataclass
+class CheckResult:
+    status: int = None  # None when no response was received
+    etag: str = ''
+    last_modified: str = ''
+    error: str = ''
+
+    @property
+    def ok(self):
+        return self.status is not None and self.status < 400
+
+class HostLimiter:
+    """
+    Spaces out request starts to the same host by at least interval seconds.
+    Can be shared by successive event loops, e.g. across batches.
+    """
+    def __init__(self, interval):
+        self.interval = interval
+        self.next_start = {}
+
+    async def wait(self, host):
+        # Reserving the slot doesn't await, so tasks can't interleave here
+        now = time.monotonic()
+        start = max(now, self.next_start.get(host, now))
+        self.next_start[host] = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+def fetch(session, url, etag='', last_modified='', timeout=None):
+    """
+    Conditional GET of url. Only the headers are read; the body is discarded.
+    """
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    try:
+        with session.get(url, headers=headers, timeout=timeout, stream=True, allow_redirects=True) as response:
+            return CheckResult(
+                status=response.status_code,
+                etag=response.headers.get('ETag', '')[:255],
+                last_modified=response.headers.get('Last-Modified', '')[:64],
+                error='' if response.status_code < 400 else (response.reason or '')[:255],
+            )
+    except requests.RequestException as e:
+        return CheckResult(error=(str(e) or type(e).__name__)[:255])
+
+def make_session(pool_size):
+    session = requests.Session()
+    session.headers['User-Agent'] = USER_AGENT
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+async def check_urls(sources, concurrency=None, limiter=None, timeout=None):
+    """
+    Check the sources' URLs. Returns {source pk: CheckResult}.
+    """
+    concurrency = concurrency or settings.LINK_CHECK_CONCURRENCY
+    limiter = limiter or HostLimiter(settings.LINK_CHECK_HOST_INTERVAL)
+    timeout = timeout or settings.LINK_CHECK_TIMEOUT
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    session = make_session(concurrency)
+
+    async def check(source, executor):
+        # Wait for the host before taking a slot, so sources queued behind a
+        # busy host don't hold up other hosts
+        await limiter.wait(urlsplit(source.url).hostname or '')
+        async with semaphore:
+            return source.pk, await loop.run_in_executor(
+                executor, fetch, session, source.url, source.etag, source.last_modified, timeout
+            )
+
+    with session, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = await asyncio.gather(*(check(source, executor) for source in sources))
+    return dict(results)
+
+def apply_results(sources, results, checked_at=None):
+    """
+    Record the results on the sources and save them in one UPDATE. A 304
+    keeps the previous status and validators: the page hasn't changed.
+    """
+    checked_at = checked_at or timezone.now()
+    for source in sources:
+        result = results[source.pk]
+        source.last_checked_at = checked_at
+        source.last_error = result.error
+        if result.status == 304:
+            source.last_status = source.last_status or 200
+        else:
+            source.last_status = result.status
+            source.etag = result.etag if result.ok else ''
+            source.last_modified = result.last_modified if result.ok else ''
+        source.check_failures = 0 if result.ok else source.check_failures + 1
+    DataSource.objects.bulk_update(sources, RESULT_FIELDS)
+    return sources
+
+def check_sources(sources, **options):
+    """
+    Check a batch of DataSources and save the results. Call from synchronous
+    code only; the checks run in their own event loop.
+    """
+    sources = list(sources)
+    if not sources:
+        return []
+    results = asyncio.run(check_urls(sources, **options))
+    return apply_results(sources, results)
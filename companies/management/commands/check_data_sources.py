@@ -0,0 +1,59 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from companies.linkcheck import HostLimiter, check_sources
+from companies.models import DataSource
+
+class Command(BaseCommand):
+    help = 'Check that data source URLs still resolve and record each status'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.LINK_CHECK_CONCURRENCY,
+                            help='Requests in flight at once')
+        parser.add_argument('--host-interval', type=float, default=settings.LINK_CHECK_HOST_INTERVAL,
+                            help='Seconds between requests to the same host')
+        parser.add_argument('--timeout', type=float, default=settings.LINK_CHECK_TIMEOUT,
+                            help='Seconds to wait for each response')
+        parser.add_argument('--older-than', type=float, default=0,
+                            help='Only check sources not checked in this many hours')
+        parser.add_argument('--approved-only', action='store_true',
+                            help='Only check approved sources')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Sources checked and saved per batch')
+
+    def handle(self, *args, **options):
+        sources = DataSource.objects.only(
+            'pk', 'url', 'last_status', 'check_failures', 'etag', 'last_modified'
+        )
+        if options['older_than']:
+            cutoff = timezone.now() - timedelta(hours=options['older_than'])
+            sources = sources.filter(Q(last_checked_at__isnull=True) | Q(last_checked_at__lt=cutoff))
+        if options['approved_only']:
+            sources = sources.filter(is_approved=True)
+
+        # Shared by all batches, so hosts are spaced out across batch boundaries too
+        limiter = HostLimiter(options['host_interval'])
+        checked = broken = 0
+        last_pk = 0
+        # Keyset pagination over the primary key; each batch is saved before
+        # the next is read, so an interrupted run keeps its progress
+        while True:
+            batch = list(sources.filter(pk__gt=last_pk).order_by('pk')[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            check_sources(
+                batch,
+                concurrency=options['concurrency'],
+                limiter=limiter,
+                timeout=options['timeout'],
+            )
+            checked += len(batch)
+            for source in batch:
+                if source.is_broken:
+                    broken += 1
+                    self.stdout.write(f'{source.url}: {source.last_status or source.last_error}')
+
+        self.stdout.write(self.style.SUCCESS(f'Data sources: {checked} checked, {broken} broken'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from companies.models import EditRequestCount
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-status edit request counts shown on the review queue'
+
+    def handle(self, *args, **options):
+        counts = EditRequestCount.recount()
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f'{status}: {count}' for status, count in counts.items())
+        ))
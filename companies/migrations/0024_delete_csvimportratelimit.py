@@ -0,0 +1,16 @@
+# Generated by Django 5.1.3 on 2026-10-19 05:38
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0023_politicaldata_affiliated_pac_maga_inc_donor_and_more'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='CSVImportRateLimit',
+        ),
+    ]
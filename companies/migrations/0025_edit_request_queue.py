@@ -0,0 +1,65 @@
+# Generated by Django 5.1.3 on 2026-10-19 05:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def count_edit_requests(apps, schema_editor):
+    EditRequest = apps.get_model('companies', 'EditRequest')
+    EditRequestCount = apps.get_model('companies', 'EditRequestCount')
+    counts = {'pending': 0, 'approved': 0, 'rejected': 0}
+    counts.update(
+        EditRequest.objects.order_by().values_list('status').annotate(models.Count('id'))
+    )
+    EditRequestCount.objects.bulk_create(
+        [EditRequestCount(status=status, count=count) for status, count in counts.items()]
+    )
+
+
+def create_business_name_trigram_index(apps, schema_editor):
+    """
+    Lets the review queue's business name filter (icontains, i.e. ILIKE
+    '%...%') use an index. Skipped where pg_trgm isn't available; the filter
+    still works, just without the index.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS business_name_trgm_idx '
+        'ON companies_business USING gin (name gin_trgm_ops)'
+    )
+
+
+def drop_business_name_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS business_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0024_delete_csvimportratelimit'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EditRequestCount',
+            fields=[
+                ('status', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='editrequest',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='edit_request_queue_idx'),
+        ),
+        migrations.RunPython(count_edit_requests, migrations.RunPython.noop),
+        migrations.RunPython(create_business_name_trigram_index, drop_business_name_trigram_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-19 05:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0025_edit_request_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='editrequest',
+            name='changes',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
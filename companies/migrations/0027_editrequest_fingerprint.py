@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-19 05:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0026_editrequest_changes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='editrequest',
+            name='duplicate_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='editrequest',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddConstraint(
+            model_name='editrequest',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'pending'), models.Q(('fingerprint', ''), _negated=True)), fields=('business', 'fingerprint'), name='unique_pending_edit_request'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.1.3 on 2026-10-19 05:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def record_baseline(apps, schema_editor):
+    """
+    Start each business's history with its current political data, so past
+    states can be read back to the moment the history began
+    """
+    PoliticalData = apps.get_model('companies', 'PoliticalData')
+    PoliticalDataHistory = apps.get_model('companies', 'PoliticalDataHistory')
+    fields = [
+        field.name for field in PoliticalData._meta.concrete_fields
+        if not field.primary_key and not field.is_relation and not getattr(field, 'auto_now', False)
+    ]
+
+    def json_value(value):
+        # Amounts are stored as strings, as companies.history does
+        return value if isinstance(value, bool) else f"{value:.2f}"
+
+    rows = []
+    for political_data in PoliticalData.objects.order_by('pk').iterator(chunk_size=1000):
+        rows.append(PoliticalDataHistory(
+            business_id=political_data.business_id,
+            changed_at=political_data.last_updated,
+            source='baseline',
+            changes={
+                name: [None, json_value(getattr(political_data, name))]
+                for name in fields if getattr(political_data, name) is not None
+            },
+        ))
+        if len(rows) == 1000:
+            PoliticalDataHistory.objects.bulk_create(rows)
+            rows = []
+    PoliticalDataHistory.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0027_editrequest_fingerprint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PoliticalDataHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('source', models.CharField(choices=[('baseline', 'Existing data'), ('edit_request', 'Edit request'), ('import', 'CSV import'), ('manual', 'Added manually'), ('admin', 'Admin'), ('rollback', 'Rollback')], max_length=20)),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('changes', models.JSONField()),
+                ('business', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='political_history', to='companies.business')),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='political_data_changes', to=settings.AUTH_USER_MODEL)),
+                ('edit_request', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='political_history', to='companies.editrequest')),
+            ],
+            options={
+                'verbose_name_plural': 'Political data history',
+                'ordering': ['business', 'changed_at', 'id'],
+                'indexes': [models.Index(fields=['business', 'changed_at', 'id'], name='political_history_idx')],
+            },
+        ),
+        migrations.RunPython(record_baseline, migrations.RunPython.noop),
+    ]
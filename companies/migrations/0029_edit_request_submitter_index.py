@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-19 05:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0028_political_data_history'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='editrequest',
+            index=models.Index(fields=['submitted_by', 'created_at', 'id'], name='edit_request_submitter_idx'),
+        ),
+    ]
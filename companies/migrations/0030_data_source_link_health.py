@@ -0,0 +1,47 @@
+# Generated by Django 5.1.3 on 2026-10-19 05:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0029_edit_request_submitter_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasource',
+            name='check_failures',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='datasource',
+            name='etag',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='datasource',
+            name='last_checked_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='datasource',
+            name='last_error',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='datasource',
+            name='last_modified',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='datasource',
+            name='last_status',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='datasource',
+            index=models.Index(fields=['last_checked_at'], name='data_source_checked_idx'),
+        ),
+    ]
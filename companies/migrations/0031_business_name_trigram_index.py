@@ -0,0 +1,24 @@
+# Generated by Django 5.1.3 on 2026-10-19 06:07
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations
+from companies.operations import AddTrigramIndex, TrigramExtensionIfAvailable
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0030_data_source_link_health'),
+    ]
+
+    operations = [
+        # 0025 created business_name_trgm_idx on the bare column outside the
+        # migration state; icontains filters on UPPER(name), which it can't serve
+        migrations.RunSQL('DROP INDEX IF EXISTS business_name_trgm_idx', migrations.RunSQL.noop),
+        TrigramExtensionIfAvailable(),
+        AddTrigramIndex(
+            model_name='business',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='business_name_trgm_idx'),
+        ),
+    ]
@@ -1,7 +1,10 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.contrib.auth.models import Permission, User
 from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import FieldDoesNotExist
 from django.utils import timezone
 from django.utils.text import slugify
 
@@ -61,6 +64,11 @@ class Business(models.Model):
         permissions = [
             ("can_import_business_csv", "Can import business data via CSV"),
         ]
+        indexes = [
+            # Name searches (icontains compiles to UPPER(name) LIKE UPPER('%...%')).
+            # Needs pg_trgm; the migration skips it where that isn't available.
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='business_name_trgm_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -143,26 +151,6 @@ class Business(models.Model):
         
         return similarity_scores[:limit]
 
-class CSVImportRateLimit(models.Model):
-    """Track CSV import attempts for rate limiting"""
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    last_import_attempt = models.DateTimeField(auto_now=True)
-
-    class Meta:
-        indexes = [
-            models.Index(fields=['user', 'last_import_attempt'])
-        ]
-
-    @classmethod
-    def can_import(cls, user):
-        """Check if user can import based on rate limit"""
-        last_import = cls.objects.filter(user=user).first()
-        if not last_import:
-            return True
-            
-        time_since_last = timezone.now() - last_import.last_import_attempt
-        return time_since_last.total_seconds() > 30
-
 class DataSource(models.Model):
    business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name='data_sources')
    url = models.URLField() 
@@ -184,6 +172,14 @@ class DataSource(models.Model):
        related_name='data_sources'
    )
 
+   # Link health, recorded by the check_data_sources command
+   last_checked_at = models.DateTimeField(null=True, blank=True, editable=False)
+   last_status = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)  # HTTP status
+   last_error = models.CharField(max_length=255, blank=True, editable=False)
+   check_failures = models.PositiveSmallIntegerField(default=0, editable=False)  # consecutive
+   etag = models.CharField(max_length=255, blank=True, editable=False)
+   last_modified = models.CharField(max_length=64, blank=True, editable=False)
+
    class Meta:
        ordering = ['-created_at']
        constraints = [
@@ -192,10 +188,36 @@ class DataSource(models.Model):
                name='unique_business_url'
            )
        ]
+       indexes = [
+           # The link checker's --older-than selection
+           models.Index(fields=['last_checked_at'], name='data_source_checked_idx'),
+       ]
+
+   @property
+   def is_broken(self):
+       """The last check failed: an error response or no response at all"""
+       return self.last_checked_at is not None and self.check_failures > 0
 
    def __str__(self):
        return f"Data source for {self.business.name}"
 
+class EditRequestQuerySet(models.QuerySet):
+    def for_review(self):
+        """
+        Load what reviewing and applying a request reads: the business with
+        its political data, and who submitted and reviewed it
+        """
+        return self.select_related('business__politicaldata', 'submitted_by', 'reviewed_by')
+
+    def status_counts(self):
+        """
+        {status: count} for the requests in this queryset, from one grouped
+        aggregate
+        """
+        counts = {status: 0 for status, _ in EditRequest.STATUS_CHOICES}
+        counts.update(self.order_by().values_list('status').annotate(models.Count('id')))
+        return counts
+
 class EditRequest(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending Review'),
@@ -274,11 +296,52 @@ class EditRequest(models.Model):
         related_name='reviewed_edits'
     )
     review_notes = models.TextField(blank=True)
+    # [[field, before, after], ...] captured at submission, see
+    # companies.approval.record_changes(); null until computed
+    changes = models.JSONField(null=True, blank=True, editable=False)
+    # Hash of the change set (companies.submission.fingerprint) and how many
+    # identical submissions were folded into this request while pending
+    fingerprint = models.CharField(max_length=64, blank=True, editable=False)
+    duplicate_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = EditRequestQuerySet.as_manager()
 
     class Meta:
         permissions = [
             ("can_review_edits", "Can review edit requests"),
         ]
+        indexes = [
+            # The review queue: one status, newest first, keyset paginated
+            models.Index(fields=['status', 'created_at', 'id'], name='edit_request_queue_idx'),
+            # A contributor's own requests, newest first (the edit requests page)
+            models.Index(fields=['submitted_by', 'created_at', 'id'], name='edit_request_submitter_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['business', 'fingerprint'],
+                condition=models.Q(status='pending') & ~models.Q(fingerprint=''),
+                name='unique_pending_edit_request',
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so EditRequestCount can be adjusted when the status changes
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+    @classmethod
+    def change_label(cls, field):
+        """Readable label for a field named in the changes snapshot"""
+        try:
+            return str(cls._meta.get_field(field).verbose_name)
+        except (AttributeError, FieldDoesNotExist):
+            return field.replace('_', ' ')
+
+    @property
+    def changed_fields(self):
+        return [self.change_label(field) for field, _, _ in self.changes or []]
 
     @property
     def direct_conservative_percentage(self):
@@ -308,6 +371,63 @@ class EditRequest(models.Model):
             return None
         return (self.affiliated_pac_liberal_total_donations or 0) / self.affiliated_pac_total_donations * 100
 
+class EditRequestCount(models.Model):
+    """
+    Number of edit requests in each status, kept up to date as requests are
+    created, reviewed and deleted (see companies/signals.py) so the review
+    queue doesn't COUNT(*) the table on every view
+    """
+    status = models.CharField(max_length=20, primary_key=True)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.status}: {self.count}"
+
+    @classmethod
+    def adjust(cls, deltas):
+        """
+        Apply {status: change} in a single UPDATE
+        """
+        deltas = {status: delta for status, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        case = models.Case(
+            *[models.When(status=status, then=models.Value(delta)) for status, delta in deltas.items()],
+            output_field=models.IntegerField(),
+        )
+        updated = cls.objects.filter(status__in=deltas).update(count=models.F('count') + case)
+        if updated < len(deltas):
+            # Rows are created by the migration and recount(), so this only
+            # happens for a status added since
+            existing = set(cls.objects.filter(status__in=deltas).values_list('status', flat=True))
+            cls.objects.bulk_create(
+                [cls(status=status, count=delta) for status, delta in deltas.items() if status not in existing],
+                ignore_conflicts=True,
+            )
+
+    @classmethod
+    def get_counts(cls):
+        counts = {status: 0 for status, _ in EditRequest.STATUS_CHOICES}
+        counts.update(cls.objects.values_list('status', 'count'))
+        return counts
+
+    @classmethod
+    def recount(cls):
+        """
+        Rebuild the counts from the edit request table
+        """
+        counts = {status: 0 for status, _ in EditRequest.STATUS_CHOICES}
+        counts.update(
+            EditRequest.objects.order_by().values_list('status').annotate(models.Count('id'))
+        )
+        cls.objects.bulk_create(
+            [cls(status=status, count=count) for status, count in counts.items()],
+            update_conflicts=True,
+            unique_fields=['status'],
+            update_fields=['count'],
+        )
+        return counts
+
 class Location(models.Model):
     city = models.CharField(max_length=100)
     state = models.CharField(max_length=2)
@@ -453,6 +573,54 @@ class PoliticalData(models.Model):
         liberal_total = (self.direct_liberal_total_donations or 0) + (self.affiliated_pac_liberal_total_donations or 0)
         return round(liberal_total / total * 100, 2)
 
+class PoliticalDataHistory(models.Model):
+    """
+    Append-only record of changes to a business's political data. Each row
+    holds only the fields that changed, as {field: [old, new]}; see
+    companies/history.py for writing rows and reading past states.
+    """
+    SOURCE_CHOICES = [
+        ('baseline', 'Existing data'),
+        ('edit_request', 'Edit request'),
+        ('import', 'CSV import'),
+        ('manual', 'Added manually'),
+        ('admin', 'Admin'),
+        ('rollback', 'Rollback'),
+    ]
+
+    # Kept on the business rather than the political data so the history
+    # outlives a deleted PoliticalData row
+    business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name='political_history')
+    changed_at = models.DateTimeField(default=timezone.now)
+    changed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='political_data_changes'
+    )
+    edit_request = models.ForeignKey(
+        EditRequest,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='political_history'
+    )
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    note = models.CharField(max_length=255, blank=True)
+    changes = models.JSONField()
+
+    class Meta:
+        verbose_name_plural = "Political data history"
+        ordering = ['business', 'changed_at', 'id']
+        indexes = [
+            # One business's history in order, for history views and state_at()
+            models.Index(fields=['business', 'changed_at', 'id'], name='political_history_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_source_display()} change to {self.business_id} at {self.changed_at:%Y-%m-%d %H:%M}"
+
 class ProductCategory(models.Model):
     name = models.CharField(max_length=100)
     parent = models.ForeignKey(
@@ -0,0 +1,39 @@
+"""
+Migration operations for PostgreSQL's pg_trgm extension.
+
+pg_trgm is a contrib module that not every PostgreSQL server ships. These
+operations always update the migration state, so the models, makemigrations
+and the database schema agree on which indexes exist, but skip the database
+work where the extension can't be installed. Queries the indexes would
+serve still work there, just without them.
+"""
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+def trigram_available(connection):
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+class TrigramExtensionIfAvailable(TrigramExtension):
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if trigram_available(schema_editor.connection):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if trigram_available(schema_editor.connection):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+class AddTrigramIndex(migrations.AddIndex):
+    """
+    AddIndex for an index using a pg_trgm operator class
+    """
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if trigram_available(schema_editor.connection):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if trigram_available(schema_editor.connection):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
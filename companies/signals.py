@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import EditRequest, EditRequestCount
+
+@receiver(post_save, sender=EditRequest)
+def edit_request_saved(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_loaded_status', None)
+    if created:
+        EditRequestCount.adjust({instance.status: 1})
+    elif previous is not None and previous != instance.status:
+        EditRequestCount.adjust({previous: -1, instance.status: 1})
+    instance._loaded_status = instance.status
+
+@receiver(post_delete, sender=EditRequest)
+def edit_request_deleted(sender, instance, **kwargs):
+    status = instance.__dict__.get('status')
+    if status is not None:
+        EditRequestCount.adjust({status: -1})
@@ -0,0 +1,89 @@
+"""
+Saving the data source URLs submitted with a business.
+
+URLs are normalized before they are stored, so the same page submitted with
+a different scheme case, trailing slash or tracking parameters is one
+DataSource. New sources are written with a single INSERT that skips URLs the
+business already has (the unique_business_url constraint), so concurrent
+submissions of the same URL can't race.
+"""
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from .models import DataSource
+
+# Query parameters added by ad and analytics tools, not part of the page
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'gbraid', 'wbraid', 'msclkid', 'yclid',
+    'mc_cid', 'mc_eid', 'igshid', '_ga', '_gl', 'ref_src',
+}
+TRACKING_PREFIXES = ('utm_',)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+def is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+def normalize_url(url):
+    """
+    Canonical form of a submitted URL: https assumed when the scheme is
+    missing, scheme and host lowercased, default port, fragment, tracking
+    parameters and trailing slash dropped. Returns '' for a blank URL and
+    raises ValidationError for an invalid one.
+    """
+    submitted = url.strip()
+    if not submitted:
+        return ''
+    url = submitted if '://' in submitted else f'https://{submitted}'
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        raise ValidationError(f'{submitted} is not a valid URL.')
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    if ':' in host:
+        host = f'[{host}]'
+    # Any user:password@ is dropped; sources are public pages
+    netloc = host if port in (None, DEFAULT_PORTS.get(scheme)) else f'{host}:{port}'
+    # Filtered without decoding, so the remaining parameters keep their encoding
+    query = '&'.join(
+        param for param in parts.query.split('&')
+        if param and not is_tracking_param(unquote_plus(param.split('=', 1)[0]))
+    )
+    url = urlunsplit((scheme, netloc, parts.path.rstrip('/'), query, ''))
+
+    try:
+        URLValidator()(url)
+    except ValidationError:
+        raise ValidationError(f'{submitted} is not a valid URL.')
+    if len(url) > DataSource._meta.get_field('url').max_length:
+        raise ValidationError(f'{submitted} is too long.')
+    return url
+
+def normalize_urls(urls):
+    """
+    The distinct normalized URLs in urls, in submission order, without blanks
+    """
+    return list(dict.fromkeys(filter(None, (normalize_url(url) for url in urls))))
+
+def add_sources(business, urls, reason, is_approved=False, edit_request=None):
+    """
+    Save the business's new data source URLs in one INSERT, ignoring URLs it
+    already has. Returns the normalized URLs.
+    """
+    urls = normalize_urls(urls)
+    if urls:
+        DataSource.objects.bulk_create(
+            [
+                DataSource(
+                    business=business, url=url, reason=reason,
+                    is_approved=is_approved, edit_request=edit_request,
+                )
+                for url in urls
+            ],
+            ignore_conflicts=True,
+        )
+    return urls
@@ -0,0 +1,147 @@
+"""
+Turning a submitted update form into an EditRequest.
+
+The form is prefilled with the business's current data, so the submission
+is normalized (blank numbers mean "no change", not zero) and diffed against
+that data, keeping only the fields that actually change. The remaining
+change set is fingerprinted; an identical pending request for the same
+business is reused instead of queueing a duplicate.
+"""
+import hashlib
+import json
+from decimal import Decimal, InvalidOperation
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
+from .approval import (
+    BUSINESS_FIELDS, M2M_CHANGES, POLITICAL_FIELDS, get_political_data, m2m_changes, proposed_values,
+)
+from .models import EditRequest, PoliticalData
+
+def parse_submission(data):
+    """
+    Normalize the update form: stripped text, Decimal amounts, checkbox
+    booleans and category id sets. Blank text and numbers become None.
+    """
+    values = {}
+    for name in BUSINESS_FIELDS + POLITICAL_FIELDS:
+        field = EditRequest._meta.get_field(name)
+        if isinstance(field, models.BooleanField):
+            values[name] = name in data
+        elif isinstance(field, models.DecimalField):
+            raw = data.get(name, '').strip()
+            if not raw:
+                values[name] = None
+                continue
+            try:
+                value = Decimal(raw)
+            except InvalidOperation:
+                value = None
+            if value is None or not value.is_finite():
+                raise ValidationError(f'{field.verbose_name.capitalize()} must be a number.')
+            if value.adjusted() >= field.max_digits - field.decimal_places:
+                raise ValidationError(f'{field.verbose_name.capitalize()} is too large.')
+            values[name] = value.quantize(Decimal(1).scaleb(-field.decimal_places))
+        else:
+            values[name] = data.get(name, '').strip() or None
+
+    for add_name, remove_name in M2M_CHANGES.values():
+        for name in (add_name, remove_name):
+            values[name] = {int(pk) for pk in data.getlist(name) if str(pk).isdigit()}
+    return values
+
+def diff_submission(business, values):
+    """
+    Drop everything in values that matches the business's current data.
+    Uses the business's prefetched services and products when available.
+    """
+    # Without political data, compare against the model defaults
+    political_data = get_political_data(business) or PoliticalData()
+    changes = {}
+    for fields, target in ((BUSINESS_FIELDS, business), (POLITICAL_FIELDS, political_data)):
+        for name in fields:
+            value = values.get(name)
+            if value is not None and value != getattr(target, name):
+                changes[name] = value
+
+    for relation, (add_name, remove_name) in M2M_CHANGES.items():
+        current = {category.pk for category in getattr(business, relation).all()}
+        to_add = values.get(add_name, set()) - current
+        to_remove = values.get(remove_name, set()) & current
+        if to_add:
+            changes[add_name] = to_add
+        if to_remove:
+            changes[remove_name] = to_remove
+    return changes
+
+def fingerprint(changes):
+    """
+    Stable hash of a change set, used to spot identical pending requests
+    """
+    canonical = {
+        name: sorted(value) if isinstance(value, set) else str(value)
+        for name, value in changes.items()
+    }
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+
+def request_fingerprint(edit_request):
+    """
+    Fingerprint of a saved request's change set, for when it is edited
+    after submission
+    """
+    changes = proposed_values(edit_request, BUSINESS_FIELDS + POLITICAL_FIELDS)
+    changes.update({name: pks for name, pks in m2m_changes(edit_request).items() if pks})
+    return fingerprint(changes)
+
+def submit(business, user, data):
+    """
+    Create an EditRequest for the changes in data, or coalesce it into an
+    identical pending request. Returns (edit_request, created); edit_request
+    is None when nothing would change.
+    """
+    changes = diff_submission(business, parse_submission(data))
+    if not changes:
+        return None, False
+
+    key = fingerprint(changes)
+    duplicate = _coalesce(business, key)
+    if duplicate is not None:
+        return duplicate, False
+
+    fields = {name: value for name, value in changes.items() if not isinstance(value, set)}
+    try:
+        with transaction.atomic():
+            edit_request = EditRequest.objects.create(
+                business=business,
+                submitted_by=user,
+                fingerprint=key,
+                justification=data['justification'],
+                supporting_links=data.get('supporting_links', ''),
+                **fields,
+            )
+    except IntegrityError:
+        # Lost a race with an identical submission (unique_pending_edit_request)
+        duplicate = _coalesce(business, key)
+        if duplicate is None:
+            raise
+        return duplicate, False
+
+    for add_name, remove_name in M2M_CHANGES.values():
+        for name in (add_name, remove_name):
+            if changes.get(name):
+                getattr(edit_request, name).set(changes[name])
+    return edit_request, True
+
+def _coalesce(business, key):
+    """
+    Count another submission against the pending request with this
+    fingerprint, if there is one
+    """
+    edit_request = EditRequest.objects.filter(
+        business=business, fingerprint=key, status='pending'
+    ).first()
+    if edit_request is not None:
+        EditRequest.objects.filter(pk=edit_request.pk).update(
+            duplicate_count=models.F('duplicate_count') + 1
+        )
+        edit_request.duplicate_count += 1
+    return edit_request
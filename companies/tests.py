@@ -1,3 +1,1040 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest.mock import patch
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.http import QueryDict
+from django.urls import reverse
+from django.utils import timezone
+from companies.approval import (
+    BUSINESS_FIELDS,
+    AlreadyReviewed,
+    POLITICAL_FIELDS,
+    REVIEW_STATUSES,
+    m2m_changes,
+    record_changes,
+    review,
+    review_many,
+    snapshot_changes,
+)
+from companies import history
+from companies.admin import EstimatedCountPaginator
+from companies.operations import trigram_available
+from companies.linkcheck import HostLimiter, check_sources
+from companies.sources import add_sources, normalize_url
+from companies.submission import diff_submission, parse_submission, submit
+from companies.models import (
+    Business,
+    DataSource,
+    EditRequest,
+    EditRequestCount,
+    Location,
+    PoliticalData,
+    PoliticalDataHistory,
+    ProductCategory,
+    ServiceCategory,
+)
 
-# Create your tests here.
+class EditRequestTestCase(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.reviewer = User.objects.create_user(
+            username='reviewer', email='reviewer@example.com', password='password',
+            email_verified=True, recovery_key_viewed=True, is_staff=True,
+        )
+        self.reviewer.user_permissions.add(Permission.objects.get(codename='can_review_edits'))
+        self.submitter = User.objects.create_user(
+            username='submitter', email='submitter@example.com', password='password',
+            email_verified=True, recovery_key_viewed=True,
+        )
+        self.business = Business.objects.create(name='Acme', description='Old description')
+        self.political_data = PoliticalData.objects.create(
+            business=self.business,
+            direct_total_donations=Decimal('100.00'),
+            direct_conservative_total_donations=Decimal('80.00'),
+        )
+        self.services = [ServiceCategory.objects.create(name=f'Service {i}') for i in range(6)]
+        self.products = [ProductCategory.objects.create(name=f'Product {i}') for i in range(6)]
+
+    def create_edit_request(self, **fields):
+        fields.setdefault('justification', 'Because')
+        return EditRequest.objects.create(
+            business=self.business, submitted_by=self.submitter, **fields
+        )
+
+    def load(self, edit_request):
+        return EditRequest.objects.for_review().get(pk=edit_request.pk)
+
+class TestApprovalEngine(EditRequestTestCase):
+    def test_field_map_matches_models(self):
+        self.assertEqual(
+            BUSINESS_FIELDS, ('name', 'description', 'provides_services', 'provides_products')
+        )
+        self.assertIn('direct_total_donations', POLITICAL_FIELDS)
+        self.assertIn('senior_employee_trump_donor', POLITICAL_FIELDS)
+        self.assertNotIn('data_source', POLITICAL_FIELDS)
+        self.assertNotIn('last_updated', POLITICAL_FIELDS)
+
+    def test_approve_applies_changes(self):
+        self.business.services.add(self.services[0], self.services[1])
+        edit_request = self.create_edit_request(
+            name='Acme Corp',
+            provides_services=True,
+            direct_total_donations=Decimal('200.00'),
+            senior_employee_trump_donor=True,
+        )
+        edit_request.services_to_add.set([self.services[2], self.services[1]])
+        edit_request.services_to_remove.set([self.services[0]])
+        edit_request.products_to_add.set([self.products[0]])
+        source = DataSource.objects.create(
+            business=self.business, url='https://example.com/a', reason='update',
+            edit_request=edit_request,
+        )
+
+        review(self.load(edit_request), self.reviewer, 'approved', 'Looks right')
+
+        self.business.refresh_from_db()
+        self.political_data.refresh_from_db()
+        edit_request.refresh_from_db()
+        source.refresh_from_db()
+        self.assertEqual(self.business.name, 'Acme Corp')
+        # Blank fields leave the current value alone
+        self.assertEqual(self.business.description, 'Old description')
+        self.assertTrue(self.business.provides_services)
+        self.assertEqual(self.political_data.direct_total_donations, Decimal('200.00'))
+        self.assertEqual(self.political_data.direct_conservative_total_donations, Decimal('80.00'))
+        self.assertTrue(self.political_data.senior_employee_trump_donor)
+        self.assertEqual(
+            set(self.business.services.all()), {self.services[1], self.services[2]}
+        )
+        self.assertEqual(list(self.business.products.all()), [self.products[0]])
+        self.assertTrue(source.is_approved)
+        self.assertEqual(edit_request.status, 'approved')
+        self.assertEqual(edit_request.reviewed_by, self.reviewer)
+        self.assertEqual(edit_request.review_notes, 'Looks right')
+
+    def test_approval_query_count_is_fixed(self):
+        def approve(count):
+            edit_request = self.create_edit_request(name=f'Renamed {count}', direct_total_donations=count)
+            edit_request.services_to_add.set(self.services[:count])
+            edit_request.services_to_remove.set(self.services[count:count * 2])
+            edit_request.products_to_add.set(self.products[:count])
+            edit_request.products_to_remove.set(self.products[count:count * 2])
+            edit_request = self.load(edit_request)
+            with CaptureQueriesContext(connection) as queries:
+                review(edit_request, self.reviewer, 'approved')
+            return len(queries)
+
+        # Savepoint, locked request, request, status counts, business,
+        # political data, history, change sets, two deletes, two inserts,
+        # data sources, release
+        self.assertEqual(approve(1), 14)
+        self.assertEqual(approve(3), 14)
+
+    def test_approve_creates_missing_political_data(self):
+        self.political_data.delete()
+        edit_request = self.create_edit_request(direct_total_donations=Decimal('5.00'))
+        review(self.load(edit_request), self.reviewer, 'approved')
+        self.assertEqual(
+            PoliticalData.objects.get(business=self.business).direct_total_donations,
+            Decimal('5.00'),
+        )
+
+    def test_reject_changes_nothing(self):
+        edit_request = self.create_edit_request(name='Rejected name')
+        edit_request.services_to_add.set([self.services[0]])
+        review(self.load(edit_request), self.reviewer, 'rejected')
+        self.business.refresh_from_db()
+        self.assertEqual(self.business.name, 'Acme')
+        self.assertFalse(self.business.services.exists())
+        self.assertEqual(EditRequest.objects.get(pk=edit_request.pk).status, 'rejected')
+
+    def test_reviewed_request_is_not_reviewed_again(self):
+        edit_request = self.create_edit_request(name='Acme Corp', direct_total_donations=Decimal('150.00'))
+        stale = self.load(edit_request)
+        review(self.load(edit_request), self.reviewer, 'approved')
+        self.business.name = 'Acme'
+        self.business.save()
+
+        for status in REVIEW_STATUSES:
+            with self.assertRaises(AlreadyReviewed):
+                review(stale, self.reviewer, status)
+        self.business.refresh_from_db()
+        self.assertEqual(self.business.name, 'Acme')
+        self.assertEqual(EditRequest.objects.get(pk=edit_request.pk).status, 'approved')
+        self.assertEqual(PoliticalDataHistory.objects.filter(edit_request=edit_request).count(), 1)
+        self.assertEqual(
+            EditRequestCount.get_counts(), {'pending': 0, 'approved': 1, 'rejected': 0}
+        )
+
+    def test_invalid_status(self):
+        edit_request = self.create_edit_request()
+        with self.assertRaises(ValueError):
+            review(edit_request, self.reviewer, 'pending')
+
+    def test_m2m_changes_single_query(self):
+        edit_request = self.create_edit_request()
+        edit_request.services_to_add.set(self.services[:2])
+        edit_request.products_to_remove.set(self.products[:1])
+        with self.assertNumQueries(1):
+            changes = m2m_changes(edit_request)
+        self.assertEqual(changes['services_to_add'], {s.pk for s in self.services[:2]})
+        self.assertEqual(changes['products_to_remove'], {self.products[0].pk})
+        self.assertEqual(changes['services_to_remove'], set())
+
+class TestReviewEntryPoints(EditRequestTestCase):
+    def setUp(self):
+        super().setUp()
+        self.edit_request = self.create_edit_request(
+            name='Acme Corp', direct_total_donations=Decimal('150.00'), provides_products=True
+        )
+        self.edit_request.services_to_add.set([self.services[0]])
+
+    def test_review_page_shows_changes(self):
+        self.client.force_login(self.reviewer)
+        url = reverse('review_edit_request', args=[self.edit_request.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        changes = response.context['changes']
+        self.assertEqual(changes['name'], {'current': 'Acme', 'proposed': 'Acme Corp'})
+        self.assertEqual(changes['direct total donations']['current'], '100.00')
+        self.assertEqual(changes['provides products']['proposed'], 'Yes')
+        self.assertEqual(changes['services to add']['proposed'], 'Service 0')
+
+    def test_review_page_approves(self):
+        self.client.force_login(self.reviewer)
+        url = reverse('review_edit_request', args=[self.edit_request.pk])
+        response = self.client.post(url, {'action': 'approve', 'review_notes': 'ok'})
+        self.assertRedirects(response, reverse('review_edit_requests'), fetch_redirect_response=False)
+        self.business.refresh_from_db()
+        self.assertEqual(self.business.name, 'Acme Corp')
+        self.assertEqual(list(self.business.services.all()), [self.services[0]])
+
+    def test_api_review_action(self):
+        self.client.force_login(self.reviewer)
+        url = reverse('editrequest-review', args=[self.edit_request.pk])
+        self.assertEqual(self.client.post(url, {'status': 'bogus'}).status_code, 400)
+        response = self.client.post(url, {'status': 'approved', 'review_notes': 'ok'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'approved')
+        self.political_data.refresh_from_db()
+        self.assertEqual(self.political_data.direct_total_donations, Decimal('150.00'))
+
+    def test_already_reviewed_request(self):
+        review(self.load(self.edit_request), self.reviewer, 'rejected')
+        self.client.force_login(self.reviewer)
+
+        url = reverse('review_edit_request', args=[self.edit_request.pk])
+        response = self.client.post(url, {'action': 'approve'}, follow=True)
+        self.assertContains(response, 'has already been rejected')
+        url = reverse('editrequest-review', args=[self.edit_request.pk])
+        self.assertEqual(self.client.post(url, {'status': 'approved'}).status_code, 409)
+
+        self.business.refresh_from_db()
+        self.assertEqual(self.business.name, 'Acme')
+        self.assertEqual(EditRequest.objects.get(pk=self.edit_request.pk).status, 'rejected')
+
+    def test_admin_actions(self):
+        other = self.create_edit_request(name='Other name')
+        request = RequestFactory().post('/')
+        request.user = self.reviewer
+        model_admin = site._registry[EditRequest]
+
+        with patch.object(model_admin, 'message_user'):
+            model_admin.reject_selected(request, EditRequest.objects.filter(pk=other.pk))
+            model_admin.approve_selected(request, EditRequest.objects.all())
+
+        self.business.refresh_from_db()
+        self.assertEqual(self.business.name, 'Acme Corp')
+        self.assertEqual(EditRequest.objects.get(pk=other.pk).status, 'rejected')
+        self.assertEqual(EditRequest.objects.get(pk=self.edit_request.pk).status, 'approved')
+
+class TestBulkReview(EditRequestTestCase):
+    def create_business(self, name):
+        business = Business.objects.create(name=name, description='Description')
+        PoliticalData.objects.create(business=business)
+        return business
+
+    def create_batch(self, count):
+        edit_requests = []
+        for index in range(count):
+            business = self.create_business(f'Business {len(edit_requests)}-{count}')
+            edit_request = EditRequest.objects.create(
+                business=business, submitted_by=self.submitter, justification='Because',
+                name=f'{business.name} renamed', direct_total_donations=index + 1,
+            )
+            edit_request.services_to_add.set([self.services[index % 6]])
+            edit_request.products_to_remove.set([self.products[index % 6]])
+            edit_requests.append(edit_request)
+        return EditRequest.objects.filter(pk__in=[edit_request.pk for edit_request in edit_requests])
+
+    def test_batch_query_count_is_fixed(self):
+        def approve(count):
+            queryset = self.create_batch(count)
+            with CaptureQueriesContext(connection) as queries:
+                reviewed, conflicted = review_many(queryset, self.reviewer, 'approved')
+            self.assertEqual(len(reviewed), count)
+            self.assertEqual(conflicted, [])
+            return len(queries)
+
+        self.assertEqual(approve(2), approve(6))
+        for business in Business.objects.filter(name__startswith='Business ').select_related('politicaldata'):
+            self.assertTrue(business.name.endswith('renamed'))
+            self.assertEqual(business.services.count(), 1)
+        self.assertFalse(EditRequest.objects.filter(status='pending').exists())
+
+    def test_conflicting_requests_stay_pending(self):
+        first = self.create_edit_request(name='Name A')
+        second = self.create_edit_request(name='Name B')
+        adds = self.create_edit_request()
+        adds.services_to_add.set([self.services[0]])
+        removes = self.create_edit_request()
+        removes.services_to_remove.set([self.services[0]])
+        other_business = self.create_business('Other')
+        other = EditRequest.objects.create(
+            business=other_business, submitted_by=self.submitter, justification='Because',
+            name='Other renamed',
+        )
+
+        reviewed, conflicted = review_many(EditRequest.objects.all(), self.reviewer, 'approved')
+
+        self.assertEqual(reviewed, [other])
+        self.assertEqual({edit_request.pk for edit_request in conflicted},
+                         {first.pk, second.pk, adds.pk, removes.pk})
+        self.assertEqual(
+            EditRequest.objects.filter(status='pending').count(), 4
+        )
+        self.business.refresh_from_db()
+        self.assertEqual(self.business.name, 'Acme')
+
+    def test_compatible_requests_for_one_business_are_merged(self):
+        self.create_edit_request(name='Acme Corp', direct_total_donations=Decimal('300.00'))
+        later = self.create_edit_request(
+            description='New description', direct_total_donations=Decimal('300.00')
+        )
+        later.products_to_add.set([self.products[1]])
+
+        reviewed, conflicted = review_many(EditRequest.objects.all(), self.reviewer, 'approved')
+
+        self.assertEqual(len(reviewed), 2)
+        self.assertEqual(conflicted, [])
+        self.business.refresh_from_db()
+        self.political_data.refresh_from_db()
+        self.assertEqual(self.business.name, 'Acme Corp')
+        self.assertEqual(self.business.description, 'New description')
+        self.assertEqual(self.political_data.direct_total_donations, Decimal('300.00'))
+        self.assertEqual(list(self.business.products.all()), [self.products[1]])
+
+    def test_reject_skips_conflict_checks(self):
+        self.create_edit_request(name='Name A')
+        self.create_edit_request(name='Name B')
+        reviewed, conflicted = review_many(EditRequest.objects.all(), self.reviewer, 'rejected')
+        self.assertEqual(len(reviewed), 2)
+        self.assertEqual(conflicted, [])
+        self.business.refresh_from_db()
+        self.assertEqual(self.business.name, 'Acme')
+
+    def test_already_reviewed_requests_are_skipped(self):
+        edit_request = self.create_edit_request(name='Acme Corp')
+        review(self.load(edit_request), self.reviewer, 'rejected')
+        reviewed, _ = review_many(EditRequest.objects.all(), self.reviewer, 'approved')
+        self.assertEqual(reviewed, [])
+        self.business.refresh_from_db()
+        self.assertEqual(self.business.name, 'Acme')
+
+    def test_bulk_review_view(self):
+        first = self.create_edit_request(name='Acme Corp')
+        second = self.create_edit_request(name='Acme Inc')
+        self.client.force_login(self.reviewer)
+        url = reverse('bulk_review_edit_requests')
+
+        self.assertEqual(self.client.get(url).status_code, 405)
+        response = self.client.post(url, {
+            'action': 'approve', 'edit_request_ids': [first.pk, second.pk],
+        }, follow=True)
+        messages = [str(message) for message in response.context['messages']]
+        self.assertIn('0 edit request(s) approved successfully.', messages)
+        self.assertTrue(any('left pending: Acme' in message for message in messages))
+
+        response = self.client.post(url, {
+            'action': 'reject', 'edit_request_ids': [second.pk], 'review_notes': 'Duplicate',
+        })
+        self.assertRedirects(response, reverse('review_edit_requests'), fetch_redirect_response=False)
+        second.refresh_from_db()
+        self.assertEqual((second.status, second.review_notes), ('rejected', 'Duplicate'))
+
+    def test_api_bulk_review(self):
+        queryset = self.create_batch(3)
+        self.client.force_login(self.reviewer)
+        url = reverse('editrequest-bulk-review')
+        ids = list(queryset.values_list('pk', flat=True))
+
+        response = self.client.post(url, {'ids': 'x', 'status': 'approved'}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            url, {'ids': ids, 'status': 'approved'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.json()['reviewed']), sorted(ids))
+        self.assertEqual(response.json()['conflicted'], [])
+
+class TestReviewQueue(EditRequestTestCase):
+    def test_status_counts_are_maintained(self):
+        first = self.create_edit_request(name='One')
+        second = self.create_edit_request(name='Two')
+        third = self.create_edit_request(description='Three')
+        self.assertEqual(
+            EditRequestCount.get_counts(), {'pending': 3, 'approved': 0, 'rejected': 0}
+        )
+
+        review(self.load(first), self.reviewer, 'approved')
+        review_many(EditRequest.objects.filter(pk=second.pk), self.reviewer, 'rejected')
+        # A status change saved through the model, as the admin form does
+        third = EditRequest.objects.get(pk=third.pk)
+        third.status = 'rejected'
+        third.save()
+        self.assertEqual(
+            EditRequestCount.get_counts(), {'pending': 0, 'approved': 1, 'rejected': 2}
+        )
+
+        self.business.delete()
+        self.assertEqual(
+            EditRequestCount.get_counts(), {'pending': 0, 'approved': 0, 'rejected': 0}
+        )
+
+    def test_recount(self):
+        self.create_edit_request(name='One')
+        EditRequestCount.objects.update(count=99)
+        call_command('recount_edit_requests', stdout=StringIO())
+        self.assertEqual(
+            EditRequestCount.get_counts(), {'pending': 1, 'approved': 0, 'rejected': 0}
+        )
+
+    @override_settings(REVIEW_QUEUE_PAGE_SIZE=2)
+    def test_queue_is_keyset_paginated(self):
+        edit_requests = [self.create_edit_request(name=f'Name {index}') for index in range(5)]
+        other = Business.objects.create(name='Globex', description='Other')
+        EditRequest.objects.create(business=other, submitted_by=self.submitter, justification='x')
+        self.client.force_login(self.reviewer)
+        url = reverse('review_edit_requests')
+
+        seen = []
+        response = self.client.get(url, {'business': 'acm'})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['status_counts']['pending'], 6)
+            seen.extend(response.context['edit_requests'])
+            if not response.context['next_query']:
+                break
+            response = self.client.get(f"{url}?{response.context['next_query']}")
+
+        self.assertEqual(seen, sorted(edit_requests, key=lambda e: (e.created_at, e.pk), reverse=True))
+        self.assertIsNotNone(response.context['first_query'])
+
+    def test_queue_ignores_bad_cursor(self):
+        self.create_edit_request(name='One')
+        self.client.force_login(self.reviewer)
+        response = self.client.get(reverse('review_edit_requests'), {'cursor': 'nonsense'})
+        self.assertEqual(len(response.context['edit_requests']), 1)
+
+    def test_business_filter_uses_trigram_index(self):
+        if not trigram_available(connection):
+            self.skipTest('pg_trgm is not available')
+        queryset = (
+            EditRequest.objects.filter(status='pending', business__name__icontains='acm')
+            .order_by('-created_at', '-id')
+        )
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}', params)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+        self.assertIn('business_name_trgm_idx', plan)
+
+class TestUserEditRequests(EditRequestTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other_business = Business.objects.create(name='Globex', description='Other')
+        self.edit_requests = []
+        for index, status in enumerate(['pending', 'approved', 'rejected', 'pending', 'approved']):
+            business = self.business if index % 2 else self.other_business
+            self.edit_requests.append(EditRequest.objects.create(
+                business=business, submitted_by=self.submitter, justification='x',
+                name=f'Name {index}', status=status,
+            ))
+        # Someone else's request is not counted
+        EditRequest.objects.create(business=self.business, submitted_by=self.reviewer, justification='x')
+        self.client.force_login(self.submitter)
+
+    def test_status_counts(self):
+        with self.assertNumQueries(1):
+            counts = EditRequest.objects.filter(submitted_by=self.submitter).status_counts()
+        self.assertEqual(counts, {'pending': 2, 'approved': 2, 'rejected': 1})
+
+    @override_settings(USER_EDIT_REQUESTS_PAGE_SIZE=2)
+    def test_list_is_keyset_paginated(self):
+        url = reverse('edit_requests')
+        seen = []
+        response = self.client.get(url)
+        while True:
+            self.assertEqual(response.context['total_count'], 5)
+            seen.extend(response.context['edit_requests'])
+            if not response.context['next_query']:
+                break
+            response = self.client.get(f"{url}?{response.context['next_query']}")
+        self.assertEqual(seen, sorted(self.edit_requests, key=lambda e: (e.created_at, e.pk), reverse=True))
+
+    def test_status_filter(self):
+        response = self.client.get(reverse('edit_requests'), {'status': 'approved'})
+        self.assertEqual(
+            [edit_request.status for edit_request in response.context['edit_requests']], ['approved'] * 2
+        )
+        self.assertContains(response, 'Pending (2)')
+
+    def test_query_count_does_not_grow_with_rows(self):
+        url = reverse('edit_requests')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        for index in range(5):
+            self.create_edit_request(name=f'More {index}')
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(url)
+        self.assertEqual(len(few), len(many))
+
+class TestChangeSnapshots(EditRequestTestCase):
+    def test_snapshot_contents(self):
+        self.business.services.add(self.services[1])
+        edit_request = self.create_edit_request(
+            name='Acme Corp', direct_total_donations=150.0, senior_employee_trump_donor=True
+        )
+        edit_request.services_to_add.set([self.services[0]])
+        edit_request.services_to_remove.set([self.services[1]])
+        DataSource.objects.create(
+            business=self.business, url='https://example.com/a', reason='update',
+            edit_request=edit_request,
+        )
+        self.assertEqual(snapshot_changes(self.load(edit_request)), [
+            ['name', 'Acme', 'Acme Corp'],
+            ['direct_total_donations', '100.00', '150.00'],
+            ['senior_employee_trump_donor', False, True],
+            ['services_to_add', [], ['Service 0']],
+            ['services_to_remove', ['Service 1'], []],
+            ['data_sources', [], ['https://example.com/a']],
+        ])
+
+    def test_submit_update_records_snapshot(self):
+        self.client.force_login(self.submitter)
+        response = self.client.post(reverse('submit_update', args=[self.business.pk]), {
+            'name': 'Acme Corp',
+            'justification': 'Renamed',
+            'services_to_add': [self.services[2].pk],
+        })
+        self.assertRedirects(response, reverse('business_search'), fetch_redirect_response=False)
+        edit_request = EditRequest.objects.get(business=self.business)
+        snapshot = {field: (before, after) for field, before, after in edit_request.changes}
+        self.assertEqual(snapshot['name'], ('Acme', 'Acme Corp'))
+        self.assertEqual(snapshot['services_to_add'], ([], ['Service 2']))
+
+    def test_review_page_renders_from_snapshot(self):
+        edit_request = self.create_edit_request(name='Acme Corp', direct_total_donations=1)
+        edit_request.products_to_add.set([self.products[0]])
+        record_changes(edit_request)
+        self.client.force_login(self.reviewer)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('review_edit_request', args=[edit_request.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['changes']['products to add'], {
+            'current': 'None', 'proposed': 'Product 0'
+        })
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('companies_politicaldata', sql)
+        self.assertNotIn('companies_productcategory', sql)
+
+    def test_review_page_backfills_missing_snapshot(self):
+        edit_request = self.create_edit_request(name='Acme Corp')
+        self.assertIsNone(edit_request.changes)
+        self.client.force_login(self.reviewer)
+        self.client.get(reverse('review_edit_request', args=[edit_request.pk]))
+        edit_request.refresh_from_db()
+        self.assertEqual(edit_request.changes, [['name', 'Acme', 'Acme Corp']])
+
+    def test_user_list_shows_changed_fields(self):
+        edit_request = self.create_edit_request(name='Acme Corp', direct_total_donations=1)
+        record_changes(edit_request)
+        self.client.force_login(self.submitter)
+        response = self.client.get(reverse('edit_requests'))
+        self.assertContains(response, 'Name, direct total donations')
+
+class TestSubmissionPipeline(EditRequestTestCase):
+    def form_data(self, **changes):
+        """The update form as rendered for the business, with changes applied"""
+        data = QueryDict(mutable=True)
+        data.update({
+            'name': self.business.name,
+            'description': self.business.description,
+            'direct_total_donations': '100.00',
+            'direct_conservative_total_donations': '80.00',
+            'justification': 'Because',
+        })
+        for name, value in changes.items():
+            if isinstance(value, list):
+                data.setlist(name, [str(item) for item in value])
+            else:
+                data[name] = value
+        return data
+
+    def submit(self, **changes):
+        business = Business.objects.select_related('politicaldata').prefetch_related(
+            'services', 'products'
+        ).get(pk=self.business.pk)
+        return submit(business, self.submitter, self.form_data(**changes))
+
+    def test_api_update_refreshes_snapshot_and_fingerprint(self):
+        edit_request, _ = self.submit(name='Acme Corp')
+        record_changes(edit_request)
+        self.client.force_login(self.submitter)
+        url = reverse('editrequest-detail', args=[edit_request.pk])
+        response = self.client.patch(url, {'name': 'Acme Inc'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+        edit_request.refresh_from_db()
+        self.assertEqual(edit_request.changes, [['name', 'Acme', 'Acme Inc']])
+        # A matching submission now folds into the edited request
+        duplicate, created = self.submit(name='Acme Inc')
+        self.assertFalse(created)
+        self.assertEqual(duplicate.pk, edit_request.pk)
+
+    def test_api_update_rejected_once_reviewed(self):
+        edit_request, _ = self.submit(name='Acme Corp')
+        review(self.load(edit_request), self.reviewer, 'rejected')
+        self.client.force_login(self.submitter)
+        url = reverse('editrequest-detail', args=[edit_request.pk])
+        response = self.client.patch(url, {'name': 'Acme Inc'}, content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(EditRequest.objects.get(pk=edit_request.pk).name, 'Acme Corp')
+
+    def test_api_update_matching_another_pending_request(self):
+        edit_request, _ = self.submit(name='Acme Corp')
+        other, _ = self.submit(name='Acme Inc')
+        self.client.force_login(self.submitter)
+        url = reverse('editrequest-detail', args=[other.pk])
+        response = self.client.patch(url, {'name': 'Acme Corp'}, content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(EditRequest.objects.get(pk=other.pk).name, 'Acme Inc')
+
+    def test_blank_numbers_mean_no_change(self):
+        values = parse_submission(self.form_data(direct_total_donations='', liberal=''))
+        self.assertIsNone(values['direct_total_donations'])
+        self.assertIsNone(values['senior_employee_total_donations'])
+        self.assertEqual(values['direct_conservative_total_donations'], Decimal('80.00'))
+        self.assertFalse(values['senior_employee_trump_donor'])
+
+    def test_invalid_numbers_are_rejected(self):
+        for value in ('abc', 'NaN', '1e20'):
+            with self.assertRaises(ValidationError):
+                parse_submission(self.form_data(direct_total_donations=value))
+
+    def test_unchanged_form_is_a_no_op(self):
+        self.business.services.add(self.services[0])
+        edit_request, created = self.submit(
+            direct_total_donations='100', services_to_add=[self.services[0].pk]
+        )
+        self.assertIsNone(edit_request)
+        self.assertFalse(created)
+        self.assertFalse(EditRequest.objects.exists())
+
+    def test_only_changed_fields_are_stored(self):
+        self.business.services.add(self.services[0])
+        edit_request, created = self.submit(
+            name='Acme Corp',
+            senior_employee_trump_donor='on',
+            services_to_add=[self.services[0].pk, self.services[1].pk],
+            services_to_remove=[self.services[0].pk, self.services[2].pk],
+        )
+        self.assertTrue(created)
+        self.assertEqual(edit_request.name, 'Acme Corp')
+        self.assertEqual(edit_request.description, '')
+        self.assertIsNone(edit_request.direct_total_donations)
+        self.assertIsNone(edit_request.direct_america_pac_donor)
+        self.assertTrue(edit_request.senior_employee_trump_donor)
+        self.assertEqual(list(edit_request.services_to_add.all()), [self.services[1]])
+        self.assertEqual(list(edit_request.services_to_remove.all()), [self.services[0]])
+
+    def test_identical_pending_requests_are_coalesced(self):
+        first, created = self.submit(name='Acme Corp', direct_total_donations='150')
+        self.assertTrue(created)
+        second, created = self.submit(name='Acme Corp', direct_total_donations='150.00')
+        self.assertFalse(created)
+        self.assertEqual(second.pk, first.pk)
+        first.refresh_from_db()
+        self.assertEqual(first.duplicate_count, 1)
+        self.assertEqual(EditRequest.objects.count(), 1)
+
+        different, created = self.submit(name='Acme Corp', direct_total_donations='151')
+        self.assertTrue(created)
+
+        # Once reviewed, the same change can be proposed again
+        review(self.load(different), self.reviewer, 'rejected')
+        again, created = self.submit(name='Acme Corp', direct_total_donations='151')
+        self.assertTrue(created)
+        self.assertNotEqual(again.pk, different.pk)
+
+    def test_diff_against_missing_political_data(self):
+        self.political_data.delete()
+        business = Business.objects.get(pk=self.business.pk)
+        changes = diff_submission(business, parse_submission(self.form_data(
+            direct_total_donations='', senior_employee_trump_donor='on'
+        )))
+        self.assertEqual(changes, {
+            'direct_conservative_total_donations': Decimal('80.00'),
+            'senior_employee_trump_donor': True,
+        })
+
+    def test_submit_update_view_messages(self):
+        self.client.force_login(self.submitter)
+        url = reverse('submit_update', args=[self.business.pk])
+
+        response = self.client.post(url, self.form_data(), follow=True)
+        self.assertContains(response, 'nothing to update')
+
+        response = self.client.post(url, self.form_data(direct_total_donations='lots'))
+        self.assertContains(response, 'Direct total donations must be a number.')
+
+        self.client.post(url, self.form_data(name='Acme Corp'))
+        response = self.client.post(url, self.form_data(name='Acme Corp'), follow=True)
+        self.assertContains(response, 'already awaiting review')
+        self.assertEqual(EditRequest.objects.get().duplicate_count, 1)
+
+class TestDataSources(EditRequestTestCase):
+    def test_normalize_url(self):
+        cases = {
+            'example.com/report/': 'https://example.com/report',
+            'HTTPS://Example.COM:443/Report/?utm_source=x&id=3&fbclid=y#top': 'https://example.com/Report?id=3',
+            'http://example.com:8080/?q=a%20b&UTM_Medium=z': 'http://example.com:8080?q=a%20b',
+            '  ': '',
+        }
+        for url, expected in cases.items():
+            with self.subTest(url=url):
+                self.assertEqual(normalize_url(url), expected)
+        for url in ('not a url', 'https://:80', 'https://example.com/' + 'a' * 200):
+            with self.subTest(url=url), self.assertRaises(ValidationError):
+                normalize_url(url)
+
+    def test_add_sources_is_one_insert(self):
+        DataSource.objects.create(business=self.business, url='https://example.com/a', reason='import')
+        urls = [
+            'https://example.com/a/', 'example.com/b', 'https://example.com/b?utm_campaign=x',
+            '', 'https://example.com/c',
+        ]
+        with self.assertNumQueries(1):
+            added = add_sources(self.business, urls, 'update')
+        self.assertEqual(added, ['https://example.com/a', 'https://example.com/b', 'https://example.com/c'])
+        self.assertEqual(
+            list(DataSource.objects.filter(business=self.business).order_by('url').values_list('url', 'reason')),
+            [('https://example.com/a', 'import'), ('https://example.com/b', 'update'), ('https://example.com/c', 'update')],
+        )
+
+    def test_submit_update_sources(self):
+        self.client.force_login(self.submitter)
+        url = reverse('submit_update', args=[self.business.pk])
+        data = {
+            'name': 'Acme Corp', 'description': self.business.description, 'justification': 'Because',
+            'new_data_sources[]': ['https://example.com/a/', 'https://EXAMPLE.com/a?utm_source=feed'],
+        }
+        self.client.post(url, data)
+        edit_request = EditRequest.objects.get()
+        self.assertEqual(
+            list(edit_request.data_sources.values_list('url', flat=True)), ['https://example.com/a']
+        )
+        self.assertIn(['data_sources', [], ['https://example.com/a']], edit_request.changes)
+
+        data['new_data_sources[]'] = ['not a url']
+        response = self.client.post(url, data)
+        self.assertContains(response, 'not a url is not a valid URL.')
+
+class TestPoliticalDataHistory(EditRequestTestCase):
+    def setUp(self):
+        super().setUp()
+        self.start = timezone.now() - timedelta(days=2)
+        history.record([history.created(self.political_data, 'baseline', when=self.start)])
+
+    def test_approval_records_deltas(self):
+        edit_request = self.create_edit_request(
+            name='Acme Corp', direct_total_donations=Decimal('250.00'),
+            direct_conservative_total_donations=Decimal('80.00'), senior_employee_trump_donor=True,
+        )
+        review(self.load(edit_request), self.reviewer, 'approved')
+
+        entry = PoliticalDataHistory.objects.get(source='edit_request')
+        self.assertEqual(entry.business, self.business)
+        self.assertEqual(entry.edit_request, edit_request)
+        self.assertEqual(entry.changed_by, self.reviewer)
+        # Only fields whose value changed, with the business name untracked
+        self.assertEqual(entry.changes, {
+            'direct_total_donations': ['100.00', '250.00'],
+            'senior_employee_trump_donor': [False, True],
+        })
+
+    def test_batch_approval_records_one_row_per_request(self):
+        first = self.create_edit_request(direct_total_donations=Decimal('150.00'))
+        second = self.create_edit_request(direct_liberal_total_donations=Decimal('20.00'))
+        review_many(EditRequest.objects.filter(pk__in=[first.pk, second.pk]), self.reviewer, 'approved')
+        entries = PoliticalDataHistory.objects.filter(source='edit_request').order_by('id')
+        self.assertEqual([entry.edit_request_id for entry in entries], [first.pk, second.pk])
+        self.assertEqual(entries[1].changes, {'direct_liberal_total_donations': [None, '20.00']})
+
+    def test_rejection_and_no_op_approval_record_nothing(self):
+        rejected = self.create_edit_request(direct_total_donations=Decimal('1.00'))
+        review(self.load(rejected), self.reviewer, 'rejected')
+        unchanged = self.create_edit_request(direct_total_donations=Decimal('100.00'))
+        review(self.load(unchanged), self.reviewer, 'approved')
+        self.assertFalse(PoliticalDataHistory.objects.exclude(source='baseline').exists())
+
+    def test_state_at(self):
+        edit_request = self.create_edit_request(direct_total_donations=Decimal('300.00'))
+        review(self.load(edit_request), self.reviewer, 'approved')
+        later = timezone.now()
+
+        self.assertIsNone(history.state_at(self.business, self.start - timedelta(seconds=1)))
+        with self.assertNumQueries(1):
+            past = history.state_at(self.business, self.start + timedelta(seconds=1))
+        self.assertEqual(past['direct_total_donations'], Decimal('100.00'))
+        self.assertEqual(past['direct_conservative_total_donations'], Decimal('80.00'))
+        self.assertFalse(past['senior_employee_trump_donor'])
+        self.assertEqual(history.state_at(self.business, later)['direct_total_donations'], Decimal('300.00'))
+
+    def test_rollback(self):
+        edit_request = self.create_edit_request(
+            direct_total_donations=Decimal('300.00'), direct_america_pac_donor=True,
+        )
+        review(self.load(edit_request), self.reviewer, 'approved')
+
+        history.rollback(self.business, self.start + timedelta(seconds=1), user=self.reviewer)
+
+        self.political_data.refresh_from_db()
+        self.assertEqual(self.political_data.direct_total_donations, Decimal('100.00'))
+        self.assertFalse(self.political_data.direct_america_pac_donor)
+        entry = PoliticalDataHistory.objects.get(source='rollback')
+        self.assertEqual(entry.changed_by, self.reviewer)
+        self.assertEqual(entry.changes['direct_total_donations'], ['300.00', '100.00'])
+
+    def test_admin_edits_are_recorded(self):
+        model_admin = site._registry[PoliticalData]
+        request = RequestFactory().post('/')
+        request.user = get_user_model().objects.create_superuser(
+            username='admin', email='admin@example.com', password='password',
+        )
+        form_class = model_admin.get_form(request, self.political_data, change=True)
+        data = {
+            name: value for name, value in form_class(instance=self.political_data).initial.items()
+            if value not in (None, False)
+        }
+        data['direct_total_donations'] = '120.00'
+        form = form_class(data, instance=self.political_data)
+        self.assertTrue(form.is_valid(), form.errors)
+
+        model_admin.save_model(request, form.save(commit=False), form, change=True)
+
+        entry = PoliticalDataHistory.objects.get(source='admin')
+        self.assertEqual(entry.changed_by, request.user)
+        self.assertEqual(entry.changes, {'direct_total_donations': ['100.00', '120.00']})
+
+        model_admin.delete_model(request, self.political_data)
+        self.assertIsNone(history.state_at(self.business, timezone.now()))
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves /ok with validators, /missing as a 404 and /moved as a redirect to /ok"""
+    etag = '"v1"'
+    last_modified = 'Mon, 05 Oct 2026 10:00:00 GMT'
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers), time.monotonic()))
+        if self.path == '/ok':
+            if self.headers.get('If-None-Match') == self.etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = b'<html>report</html>'
+            self.send_response(200)
+            self.send_header('ETag', self.etag)
+            self.send_header('Last-Modified', self.last_modified)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == '/moved':
+            self.send_response(301)
+            self.send_header('Location', '/ok')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        else:
+            self.send_error(404)
+
+    def log_message(self, *args):
+        pass
+
+class TestLinkChecker(EditRequestTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        cls.server.requests = []
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.server.requests.clear()
+
+    def add_source(self, path):
+        return DataSource.objects.create(business=self.business, url=f'{self.base_url}{path}', reason='import')
+
+    def test_records_status_and_validators(self):
+        ok, missing, moved = self.add_source('/ok'), self.add_source('/missing'), self.add_source('/moved')
+        # Nothing listens on port 9 on the loopback interface
+        unreachable = DataSource.objects.create(business=self.business, url='http://127.0.0.1:9/', reason='import')
+
+        out = StringIO()
+        call_command('check_data_sources', '--host-interval', '0', '--timeout', '2', stdout=out)
+        self.assertIn('4 checked, 2 broken', out.getvalue())
+
+        for source in (ok, missing, moved, unreachable):
+            source.refresh_from_db()
+            self.assertIsNotNone(source.last_checked_at)
+        self.assertEqual((ok.last_status, ok.etag, ok.check_failures), (200, '"v1"', 0))
+        self.assertEqual(ok.last_modified, StubHandler.last_modified)
+        self.assertEqual(moved.last_status, 200)
+        self.assertEqual((missing.last_status, missing.check_failures), (404, 1))
+        self.assertTrue(missing.is_broken)
+        self.assertIsNone(unreachable.last_status)
+        self.assertTrue(unreachable.last_error)
+
+    def test_conditional_requests(self):
+        source = self.add_source('/ok')
+        check_sources(DataSource.objects.filter(pk=source.pk), limiter=HostLimiter(0))
+        check_sources(DataSource.objects.filter(pk=source.pk), limiter=HostLimiter(0))
+
+        (_, first, _), (_, second, _) = self.server.requests
+        self.assertNotIn('If-None-Match', first)
+        self.assertEqual(second['If-None-Match'], '"v1"')
+        self.assertEqual(second['If-Modified-Since'], StubHandler.last_modified)
+        source.refresh_from_db()
+        # A 304 keeps the status and validators from the last full response
+        self.assertEqual((source.last_status, source.etag), (200, '"v1"'))
+
+    def test_failures_accumulate_until_fixed(self):
+        source = self.add_source('/missing')
+        for _ in range(2):
+            check_sources(DataSource.objects.filter(pk=source.pk), limiter=HostLimiter(0))
+        source.refresh_from_db()
+        self.assertEqual(source.check_failures, 2)
+
+        DataSource.objects.filter(pk=source.pk).update(url=f'{self.base_url}/ok')
+        check_sources(DataSource.objects.filter(pk=source.pk), limiter=HostLimiter(0))
+        source.refresh_from_db()
+        self.assertEqual((source.check_failures, source.last_error), (0, ''))
+
+    def test_requests_to_one_host_are_spaced_out(self):
+        sources = [self.add_source(f'/missing{index}') for index in range(3)]
+        check_sources(sources, concurrency=3, limiter=HostLimiter(0.2))
+        starts = sorted(started for _, _, started in self.server.requests)
+        self.assertEqual(len(starts), 3)
+        self.assertGreaterEqual(starts[2] - starts[0], 0.35)
+
+    def test_older_than_skips_recent_checks(self):
+        self.add_source('/ok')
+        call_command('check_data_sources', '--host-interval', '0', stdout=StringIO())
+        out = StringIO()
+        call_command('check_data_sources', '--older-than', '1', stdout=out)
+        self.assertIn('0 checked', out.getvalue())
+
+class TestAdminChangelists(TestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(
+            username='admin', email='admin@example.com', password='password',
+        )
+        self.client.force_login(self.admin)
+        self.texas = Location.objects.create(
+            city='Austin', state='TX', zip_code='78701', latitude=30.27, longitude=-97.74
+        )
+        self.ohio = Location.objects.create(
+            city='Columbus', state='OH', zip_code='43004', latitude=39.96, longitude=-82.99
+        )
+
+    def create_businesses(self, count, start=0):
+        for index in range(start, start + count):
+            business = Business.objects.create(name=f'Business {index}', slug=f'business-{index}', description='x')
+            PoliticalData.objects.create(
+                business=business,
+                direct_total_donations=Decimal('300.00'),
+                direct_conservative_total_donations=Decimal(index),
+                affiliated_pac_total_donations=Decimal('0.00') if index % 2 else None,
+            )
+            business.locations.add(self.texas, self.ohio)
+
+    def changelist_queries(self, url, rows):
+        self.create_businesses(rows, start=Business.objects.count())
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_political_data_changelist_query_count_is_fixed(self):
+        url = reverse('admin:companies_politicaldata_changelist')
+        self.assertEqual(self.changelist_queries(url, 2), self.changelist_queries(url, 8))
+
+    def test_percentages_match_model_properties(self):
+        self.create_businesses(2)
+        response = self.client.get(reverse('admin:companies_politicaldata_changelist'), {'o': '2'})
+        rows = list(response.context['cl'].result_list)
+        self.assertEqual([row.business.name for row in rows], ['Business 0', 'Business 1'])
+        for row in rows:
+            self.assertEqual(row.direct_conservative_pct, row.direct_conservative_percentage)
+            self.assertIsNone(row.pac_conservative_pct)
+            self.assertIsNone(row.affiliated_pac_conservative_percentage)
+        self.assertContains(response, '0.3%')
+
+    def test_business_location_filter(self):
+        self.create_businesses(2)
+        other = Business.objects.create(name='Elsewhere', description='x')
+        other.locations.add(self.ohio)
+        url = reverse('admin:companies_business_changelist')
+
+        response = self.client.get(url, {'state': 'TX'})
+        self.assertEqual(
+            sorted(business.name for business in response.context['cl'].result_list),
+            ['Business 0', 'Business 1'],
+        )
+        # A business with two Ohio locations is not listed twice
+        response = self.client.get(url, {'state': 'OH'})
+        self.assertEqual(response.context['cl'].result_count, 3)
+        self.assertNotIn('DISTINCT', str(response.context['cl'].queryset.query))
+
+    def test_estimated_count_paginator(self):
+        self.create_businesses(3)
+        queryset = Business.objects.order_by('pk')
+        with patch.object(EstimatedCountPaginator, 'estimated_count', return_value=250000):
+            self.assertEqual(EstimatedCountPaginator(queryset, 100).count, 250000)
+        # Small tables, and tables PostgreSQL hasn't analyzed, are counted exactly
+        with patch.object(EstimatedCountPaginator, 'estimated_count', return_value=50):
+            self.assertEqual(EstimatedCountPaginator(queryset, 100).count, 3)
+        self.assertIsNone(EstimatedCountPaginator(queryset.filter(name='x'), 100).estimated_count())
+        estimate = EstimatedCountPaginator(queryset, 100).estimated_count()
+        self.assertTrue(estimate is None or isinstance(estimate, int))
@@ -10,6 +10,7 @@ urlpatterns = [
     path('filter-categories/', views.filter_categories, name='filter_categories'),
     path('import/', views.import_business, name='import_business'),
     path('review/', views.review_edit_requests, name='review_edit_requests'),
+    path('review/bulk/', views.bulk_review_edit_requests, name='bulk_review_edit_requests'),
     path('review/<int:edit_request_id>/', views.review_edit_request, name='review_edit_request'),
     path('search/', views.business_search, name='business_search'),
     path('update/<int:business_id>/', views.submit_update, name='submit_update'),
@@ -5,5 +5,7 @@ from .edit_requests import edit_requests
 from .filter_categories import filter_categories
 from .home import home
 from .import_business import import_business
-from .review_edit_requests import review_edit_requests, review_edit_request, is_reviewer
+from .review_edit_requests import (
+    bulk_review_edit_requests, review_edit_requests, review_edit_request, is_reviewer
+)
 from .submit_update import submit_update
\ No newline at end of file
@@ -2,9 +2,10 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
 from django.shortcuts import redirect, render
+from companies import history
+from companies.sources import add_sources
 from companies.models import (
     Business,
-    DataSource,
     PoliticalData, 
     ProductCategory, 
     ServiceCategory
@@ -38,7 +39,7 @@ def add_business(request):
                 )
                 
                 # Create the political data
-                PoliticalData.objects.create(
+                political_data = PoliticalData.objects.create(
                     business=business,
                     # Direct donations
                     direct_conservative_total_donations=safe_float(request.POST.get('direct_conservative_total_donations', 0)),
@@ -62,6 +63,7 @@ def add_business(request):
                     senior_employee_america_pac_donor=request.POST.get('senior_employee_america_pac_donor') == 'on',
                     senior_employee_save_america_pac_donor=request.POST.get('senior_employee_save_america_pac_donor') == 'on',
                 )
+                history.record([history.created(political_data, 'manual', user=request.user)])
 
                 # Handle data sources
                 form_data = {
@@ -69,16 +71,7 @@ def add_business(request):
                 }
 
                 # Create the data source records
-                for source_url in form_data['data_sources']:
-                    if source_url:
-                        DataSource.objects.get_or_create(
-                            business=business,
-                            url=source_url,
-                            defaults={
-                                'reason': 'manual_addition',
-                                'is_approved': True
-                            }
-                        )
+                add_sources(business, form_data['data_sources'], 'manual_addition', is_approved=True)
                 
                 # Handle parent company if specified
                 parent_name = request.POST.get('parent_company')
@@ -1,13 +1,33 @@
+from urllib.parse import urlencode
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
 from companies.models import (
     EditRequest
 )
+from .review_edit_requests import decode_cursor, keyset_page
 
 @login_required
 def edit_requests(request):
+    status = request.GET.get('status', '')
+    if status not in dict(EditRequest.STATUS_CHOICES):
+        status = ''
+
+    # (submitted_by, created_at, id) is covered by edit_request_submitter_idx
     user_requests = EditRequest.objects.filter(submitted_by=request.user)
+    status_counts = user_requests.status_counts()
+    if status:
+        user_requests = user_requests.filter(status=status)
+
+    cursor = decode_cursor(request.GET.get('cursor'))
+    page, next_cursor = keyset_page(
+        user_requests.select_related('business'), cursor, settings.USER_EDIT_REQUESTS_PAGE_SIZE
+    )
     return render(request, 'companies/edit_requests.html', {
-        'edit_requests': user_requests
+        'edit_requests': page,
+        'status': status,
+        'status_counts': status_counts,
+        'total_count': sum(status_counts.values()),
+        'next_query': urlencode({'status': status, 'cursor': next_cursor}) if next_cursor else None,
+        'first_query': urlencode({'status': status}) if cursor else None,
     })
-
@@ -3,12 +3,12 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required, permission_required
 from django.db import transaction
 from django.shortcuts import redirect, render
-from django.utils import timezone
 from io import TextIOWrapper
+from users.services.ratelimit import is_redirect, ratelimit
+from companies import history
+from companies.sources import add_sources
 from companies.models import (
     Business,
-    CSVImportRateLimit,
-    DataSource,
     PoliticalData, 
     ProductCategory, 
     ServiceCategory
@@ -17,12 +17,9 @@ import csv
 
 @login_required
 @permission_required('companies.can_import_business_csv')
+@ratelimit('import', key='user', count_if=is_redirect)  # only successful imports
 def import_business(request):
     if request.method == 'POST':
-        if not CSVImportRateLimit.can_import(request.user):
-            messages.error(request, 'Please wait 30 seconds between imports.')
-            return redirect('import_business')
-
         form_data = {
             'name': request.POST.get('name'),
             'website': request.POST.get('website'),
@@ -169,7 +166,7 @@ def import_business(request):
                                 senior_employee_maga_inc = True
 
                 # Create political data
-                PoliticalData.objects.create(
+                political_data = PoliticalData.objects.create(
                     business=business,
                     # Direct donations
                     direct_conservative_total_donations=direct_conservative_total,
@@ -196,24 +193,12 @@ def import_business(request):
                     senior_employee_save_america_pac_donor=senior_employee_save_america,
                     senior_employee_maga_inc_donor=senior_employee_maga_inc,
                 )
+                history.record([history.created(
+                    political_data, 'import', user=request.user, note=csv_file.name,
+                )])
 
                 # Create the data source records
-                for source_url in form_data['data_sources']:
-                    if source_url:
-                        DataSource.objects.get_or_create(
-                            business=business,
-                            url=source_url,
-                            defaults={
-                                'reason': 'import',
-                                'is_approved': True
-                            }
-                        )
-
-                # Update rate limit
-                CSVImportRateLimit.objects.update_or_create(
-                    user=request.user,
-                    defaults={'last_import_attempt': timezone.now()}
-                )
+                add_sources(business, form_data['data_sources'], 'import', is_approved=True)
 
                 messages.success(request, 'Business imported successfully!')
                 return redirect('business_detail', slug=business.slug)
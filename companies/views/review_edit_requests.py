@@ -1,216 +1,163 @@
+from datetime import datetime
+from urllib.parse import urlencode
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import permission_required
-from django.db import transaction
+from django.db.models import Q
 from django.shortcuts import get_object_or_404, redirect, render
-from django.utils import timezone
+from django.views.decorators.http import require_POST
+from companies.approval import AlreadyReviewed, record_changes, review, review_many
 from companies.models import (
-    EditRequest
+    EditRequest,
+    EditRequestCount
 )
 
 
 def is_reviewer(user):
     return user.is_authenticated and (user.is_staff or user.is_superuser)
 
+def format_value(value):
+    if value is None or value == '':
+        return 'Not set'
+    if isinstance(value, bool):
+        return 'Yes' if value else 'No'
+    return value
+
+def describe_changes(snapshot):
+    """
+    {label: {'current': ..., 'proposed': ...}} from an EditRequest.changes
+    snapshot, without reading the business or category tables
+    """
+    changes = {}
+    for field, before, after in snapshot:
+        if isinstance(after, list):
+            changes[EditRequest.change_label(field)] = {
+                'current': ', '.join(before) or 'None',
+                'proposed': ', '.join(after) or 'Will be removed',
+            }
+        else:
+            changes[EditRequest.change_label(field)] = {
+                'current': format_value(before),
+                'proposed': format_value(after),
+            }
+    return changes
+
 @permission_required('companies.can_review_edits', raise_exception=True)
 def review_edit_request(request, edit_request_id):
-    edit_request = get_object_or_404(
-        EditRequest.objects.select_related('business', 'submitted_by'),  # Changed this line
-        id=edit_request_id
-    )
-
     if request.method == 'POST':
+        edit_request = get_object_or_404(EditRequest.objects.for_review(), id=edit_request_id)
         action = request.POST.get('action')
         if action in ['approve', 'reject']:
-            with transaction.atomic():
-                edit_request.status = 'approved' if action == 'approve' else 'rejected'
-                edit_request.reviewed_by = request.user
-                edit_request.reviewed_at = timezone.now()
-                edit_request.review_notes = request.POST.get('review_notes', '')
-                edit_request.save()
-                
-                if action == 'approve':
-                    # Apply the changes to the business
-                    business = edit_request.business
-                    
-                    # Update basic info
-                    if edit_request.name:
-                        business.name = edit_request.name
-                    if edit_request.description:
-                        business.description = edit_request.description
-                    
-                    # Update service/product flags
-                    if edit_request.provides_services is not None:
-                        business.provides_services = edit_request.provides_services
-                    if edit_request.provides_products is not None:
-                        business.provides_products = edit_request.provides_products
-                    
-                    business.save()
-                    
-                    # Update political data
-                    political_data = business.politicaldata
-                    for field in ['conservative_percentage', 'conservative_total_donations',
-                                'liberal_percentage', 'liberal_total_donations',
-                                'trump_donor', 'america_pac_donor', 'save_america_pac_donor',
-                                'data_source']:
-                        value = getattr(edit_request, field)
-                        if value is not None:
-                            setattr(political_data, field, value)
-                    political_data.save()
-
-                    # approve the data source
-                    edit_request.data_sources.all().update(is_approved=True)
-                    
-                    # Update services
-                    if edit_request.services_to_add.exists():
-                        business.services.add(*edit_request.services_to_add.all())
-                    if edit_request.services_to_remove.exists():
-                        business.services.remove(*edit_request.services_to_remove.all())
-                    
-                    # Update products
-                    if edit_request.products_to_add.exists():
-                        business.products.add(*edit_request.products_to_add.all())
-                    if edit_request.products_to_remove.exists():
-                        business.products.remove(*edit_request.products_to_remove.all())
-                
+            try:
+                review(
+                    edit_request,
+                    request.user,
+                    'approved' if action == 'approve' else 'rejected',
+                    request.POST.get('review_notes', ''),
+                )
+            except AlreadyReviewed as e:
+                messages.warning(request, str(e))
+            else:
                 messages.success(request, f'Edit request {action}d successfully.')
-                return redirect('review_edit_requests')
-        pass
+            return redirect('review_edit_requests')
+    else:
+        edit_request = get_object_or_404(
+            EditRequest.objects.select_related('business', 'submitted_by'), id=edit_request_id
+        )
 
-    # Prepare changes display
-    changes = {}
-    business = edit_request.business
-    political_data = getattr(business, 'politicaldata', None)
-
-    if edit_request.name:
-        changes['Name'] = {
-            'current': business.name,
-            'proposed': edit_request.name
-        }
-
-    if edit_request.description:
-        changes['Description'] = {
-            'current': business.description,
-            'proposed': edit_request.description
-        }
-
-    # Check political data changes
-    political_fields = [
-        ('conservative_percentage', 'Conservative Percentage'),
-        ('conservative_total_donations', 'Conservative Total Donations'),
-        ('liberal_percentage', 'Liberal Percentage'),
-        ('liberal_total_donations', 'Liberal Total Donations'),
-    ]
-
-    if edit_request.description:
-        changes['Description'] = {
-            'current': business.description,
-            'proposed': edit_request.description
-        }
-
-    # Check political data changes
-    political_fields = [
-        ('conservative_percentage', 'Conservative Percentage'),
-        ('conservative_total_donations', 'Conservative Total Donations'),
-        ('liberal_percentage', 'Liberal Percentage'),
-        ('liberal_total_donations', 'Liberal Total Donations'),
-    ]
-
-    for field, label in political_fields:
-        new_value = getattr(edit_request, field)
-        if new_value is not None:
-            current_value = getattr(political_data, field) if political_data else None
-            changes[label] = {
-                'current': f"{current_value:.2f}" if current_value is not None else "Not set",
-                'proposed': f"{new_value:.2f}"
-            }
+    snapshot = edit_request.changes
+    if snapshot is None:
+        # Requests submitted before snapshots were recorded
+        snapshot = record_changes(edit_request)
 
-    # Check boolean political fields
-    boolean_fields = [
-        ('trump_donor', 'Trump Donor'),
-        ('america_pac_donor', 'America PAC Donor'),
-        ('save_america_pac_donor', 'Save America PAC Donor'),
-    ]
-
-    for field, label in boolean_fields:
-        new_value = getattr(edit_request, field)
-        if new_value is not None:
-            current_value = getattr(political_data, field) if political_data else False
-            changes[label] = {
-                'current': 'Yes' if current_value else 'No',
-                'proposed': 'Yes' if new_value else 'No'
-            }
-
-    # Check data source changes
-    if edit_request.data_source:
-        changes['Data Source'] = {
-            'current': political_data.data_source if political_data else '',
-            'proposed': edit_request.data_source
-        }
-
-    # Check service changes
-    if edit_request.services_to_add.exists():
-        services_to_add = edit_request.services_to_add.all()
-        changes['Services to Add'] = {
-            'current': 'None',
-            'proposed': ', '.join(s.name for s in services_to_add)
-        }
-
-    if edit_request.services_to_remove.exists():
-        services_to_remove = edit_request.services_to_remove.all()
-        changes['Services to Remove'] = {
-            'current': ', '.join(s.name for s in services_to_remove),
-            'proposed': 'Will be removed'
-        }
-
-    # Check product changes
-    if edit_request.products_to_add.exists():
-        products_to_add = edit_request.products_to_add.all()
-        changes['Products to Add'] = {
-            'current': 'None',
-            'proposed': ', '.join(p.name for p in products_to_add)
-        }
-
-    if edit_request.products_to_remove.exists():
-        products_to_remove = edit_request.products_to_remove.all()
-        changes['Products to Remove'] = {
-            'current': ', '.join(p.name for p in products_to_remove),
-            'proposed': 'Will be removed'
-        }
-
-    # Check service/product provision changes
-    if edit_request.provides_services is not None:
-        changes['Provides Services'] = {
-            'current': 'Yes' if business.provides_services else 'No',
-            'proposed': 'Yes' if edit_request.provides_services else 'No'
-        }
-
-    if edit_request.provides_products is not None:
-        changes['Provides Products'] = {
-            'current': 'Yes' if business.provides_products else 'No',
-            'proposed': 'Yes' if edit_request.provides_products else 'No'
-        }
-    
     return render(request, 'companies/review_edit_request.html', {
         'edit_request': edit_request,
-        'changes': changes,
+        'changes': describe_changes(snapshot),
     })
 
+@permission_required('companies.can_review_edits', raise_exception=True)
+@require_POST
+def bulk_review_edit_requests(request):
+    action = request.POST.get('action')
+    ids = [pk for pk in request.POST.getlist('edit_request_ids') if pk.isdigit()]
+    if action not in ['approve', 'reject'] or not ids:
+        messages.error(request, 'Select at least one edit request and an action.')
+        return redirect('review_edit_requests')
+
+    reviewed, conflicted = review_many(
+        EditRequest.objects.filter(pk__in=ids),
+        request.user,
+        'approved' if action == 'approve' else 'rejected',
+        request.POST.get('review_notes', ''),
+    )
+    messages.success(request, f'{len(reviewed)} edit request(s) {action}d successfully.')
+    if conflicted:
+        names = ', '.join(sorted({edit_request.business.name for edit_request in conflicted}))
+        messages.warning(
+            request,
+            f'{len(conflicted)} edit request(s) conflict with another selected request for '
+            f'the same business and were left pending: {names}'
+        )
+    return redirect('review_edit_requests')
+
+def encode_cursor(edit_request):
+    return f"{edit_request.created_at.isoformat()}|{edit_request.pk}"
+
+def decode_cursor(cursor):
+    """
+    (created_at, pk) from a cursor, or None if it is missing or malformed
+    """
+    try:
+        created_at, pk = cursor.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+def keyset_page(edit_requests, cursor, page_size):
+    """
+    One page of edit_requests, newest first, continuing after the row the
+    cursor names: each page picks up after the last row of the previous one,
+    so deep pages cost the same as the first. Returns (page, next cursor or
+    None on the last page).
+    """
+    edit_requests = edit_requests.order_by('-created_at', '-id')
+    if cursor:
+        created_at, pk = cursor
+        edit_requests = edit_requests.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+    page = list(edit_requests[:page_size + 1])
+    if len(page) > page_size:
+        page = page[:page_size]
+        return page, encode_cursor(page[-1])
+    return page, None
+
 @permission_required('companies.can_review_edits', raise_exception=True)
 def review_edit_requests(request):
     # Get filters
     status = request.GET.get('status', 'pending')
     business_filter = request.GET.get('business', '')
     
-    # Build queryset
-    edit_requests = EditRequest.objects.select_related('business', 'submitted_by').order_by('-created_at')
+    # Build queryset; (status, created_at, id) is covered by edit_request_queue_idx
+    edit_requests = EditRequest.objects.select_related('business', 'submitted_by')
     
     if status:
         edit_requests = edit_requests.filter(status=status)
     if business_filter:
+        # UPPER(name) LIKE ..., served by business_name_trgm_idx where pg_trgm is installed
         edit_requests = edit_requests.filter(business__name__icontains=business_filter)
+
+    cursor = decode_cursor(request.GET.get('cursor'))
+    page, next_cursor = keyset_page(edit_requests, cursor, settings.REVIEW_QUEUE_PAGE_SIZE)
+    next_query = None
+    if next_cursor:
+        next_query = urlencode({'status': status, 'business': business_filter, 'cursor': next_cursor})
     
     return render(request, 'companies/review_edit_requests.html', {
-        'edit_requests': edit_requests,
+        'edit_requests': page,
         'status': status,
         'business_filter': business_filter,
+        'status_counts': EditRequestCount.get_counts(),
+        'next_query': next_query,
+        'first_query': urlencode({'status': status, 'business': business_filter}) if cursor else None,
     })
@@ -1,5 +1,5 @@
 from cryptography.fernet import Fernet
-from decouple import config
+from decouple import Csv, config
 from pathlib import Path
 import os
 
@@ -15,6 +15,10 @@ if not os.path.exists('recovery_key.key'):
 with open('recovery_key.key', 'rb') as key_file:
     RECOVERY_KEY_ENCRYPTION_KEY = key_file.read()
 
+# Retired keys that can still decrypt existing recovery keys until
+# rotate_recovery_keys has re-encrypted them with the current key
+RECOVERY_KEY_PREVIOUS_KEYS = config('RECOVERY_KEY_PREVIOUS_KEYS', default='', cast=Csv())
+
 SECRET_KEY = config('SECRET_KEY')
 
 INSTALLED_APPS = [
@@ -70,6 +74,21 @@ TEMPLATES = [
 WSGI_APPLICATION = 'config.wsgi.application'
 
 AUTH_USER_MODEL = 'users.User'
+
+# Shared by every web worker and management command, so a cached value
+# invalidated in one process is gone for all of them. Create the table with
+# `python manage.py createcachetable`.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    }
+}
+
+# Anonymous sessions live in a signed cookie, logged-in ones in the database
+SESSION_ENGINE = 'users.sessions'
+SESSION_ANONYMOUS_COOKIE_MAX_SIZE = 3800  # bytes; larger sessions fall back to the database
+SESSION_CLEANUP_BATCH_SIZE = 1000
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
@@ -79,6 +98,54 @@ EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 DEFAULT_FROM_EMAIL = 'noreply@mybluelist.org'
 MAILTRAP_API_TOKEN = None  # Default to None
 MAILTRAP_SENDER_EMAIL = 'noreply@mybluelist.org'  # Default sender
+MAILTRAP_POOL_SIZE = 10  # keep-alive connections held by the transport
+MAILTRAP_TIMEOUT = 10  # seconds per API request
+
+# Outbox delivery (see users/management/commands/process_email_outbox.py)
+EMAIL_OUTBOX_BATCH_SIZE = 50
+EMAIL_OUTBOX_MAX_ATTEMPTS = 6
+EMAIL_OUTBOX_RETRY_DELAY = 30  # seconds, doubled after each failed attempt
+EMAIL_OUTBOX_MAX_RETRY_DELAY = 60 * 60
+EMAIL_OUTBOX_LEASE = 5 * 60  # seconds before an unfinished claim is retried
+
+# Abuse checks on signup/login (see users/services/abuse.py)
+BLOCKED_HASHES_LOCAL_TTL = 30  # seconds each worker reuses its blocked-hash set
+BLOCKED_HASHES_SHARED_CACHE = True  # share the set between workers via the cache
+EMAIL_HASH_CACHE_TIMEOUT = 60 * 60  # shared blocked-hash set; dropped on every change
+UNVERIFIED_ACCOUNT_MAX_AGE_DAYS = 14  # see delete_unverified_users
+
+# Activity timestamps (last_login, HashedEmail.last_used), see users/services/activity.py
+ACTIVITY_TIMESTAMP_GRANULARITY = 60 * 60  # seconds; newer values are not rewritten
+ACTIVITY_FLUSH_BATCH = 100
+ACTIVITY_FLUSH_INTERVAL = 30  # seconds a buffered timestamp may wait
+
+# Edit request review queue page size (keyset paginated)
+REVIEW_QUEUE_PAGE_SIZE = 50
+# A contributor's own edit requests page size (keyset paginated)
+USER_EDIT_REQUESTS_PAGE_SIZE = 25
+
+# Data source link checks (see companies/linkcheck.py)
+LINK_CHECK_CONCURRENCY = 20  # requests in flight
+LINK_CHECK_HOST_INTERVAL = 1.0  # seconds between requests to one host
+LINK_CHECK_TIMEOUT = 10  # seconds per request
+
+# Sliding-window rate limits applied with users.services.ratelimit.ratelimit
+RATELIMIT_ENABLE = True
+# CacheBackend shares counts between workers and restarts through RATELIMIT_CACHE
+# (the database cache table). LocalBackend counts per worker and forgets on
+# restart, so every gunicorn worker would allow the full rate; use it only
+# for a single process.
+RATELIMIT_BACKEND = 'users.services.ratelimit.CacheBackend'
+RATELIMIT_CACHE = 'default'
+RATELIMIT_PROXY_COUNT = 0  # trusted proxies adding X-Forwarded-For
+RATELIMITS = {
+    'login': '20/m',  # per IP
+    'login_username': '5/m',
+    'reset_password': '10/m',  # per IP
+    'reset_password_username': '5/h',
+    'signup': '10/h',  # per IP
+    'import': '1/30s',  # per user, successful imports only
+}
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -15,10 +15,22 @@ DATABASES = {
 
 # Test specific settings
 EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+EMAIL_TRANSPORT = 'users.services.mail.DjangoMailTransport'
 PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
 
 # Disable any resource-intensive settings
 MAX_ACCOUNTS_PER_EMAIL = 2  # If you use this setting
 
+# The cache outlives each test's rolled-back transaction, so abuse-check
+# caching is off unless a test enables it
+BLOCKED_HASHES_LOCAL_TTL = 0
+EMAIL_HASH_CACHE_TIMEOUT = 0
+
+# Write activity timestamps as soon as they are touched
+ACTIVITY_FLUSH_INTERVAL = 0
+
+# Counters would carry over between tests; rate limit tests enable this
+RATELIMIT_ENABLE = False
+
 # Override any settings that require external services
 MAILTRAP_API_TOKEN = 'dummy-token-for-testing'
\ No newline at end of file
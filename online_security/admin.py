@@ -1,11 +1,56 @@
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.http import JsonResponse
 from django.utils.html import format_html
 from django.urls import path
 from django.shortcuts import redirect
 from django.contrib import messages
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import require_POST
 from .models import Category, Recommendation, Solution, Tutorial, TutorialStep
 from .management.commands.populate_online_security_data import SecurityDataAdmin
 
+class OrderedAdminMixin:
+    """Move up/down actions and a bulk reorder endpoint for OrderedModelMixin models"""
+    actions = ['move_up', 'move_down']
+
+    def move_up(self, request, queryset):
+        for obj in queryset.order_by('order'):
+            # An earlier move may have rebalanced the scope
+            obj.refresh_from_db(fields=['order'])
+            obj.move_up()
+    move_up.short_description = "Move selected items up"
+
+    def move_down(self, request, queryset):
+        for obj in queryset.order_by('-order'):
+            obj.refresh_from_db(fields=['order'])
+            obj.move_down()
+    move_down.short_description = "Move selected items down"
+
+    def get_urls(self):
+        urls = super().get_urls()
+        opts = self.model._meta
+        custom_urls = [
+            path(
+                'reorder/',
+                self.admin_site.admin_view(self.reorder_view),
+                name=f'{opts.app_label}_{opts.model_name}_reorder',
+            ),
+        ]
+        return custom_urls + urls
+
+    @method_decorator(require_POST)
+    def reorder_view(self, request):
+        """Accept the full drag-and-drop ordering of a list as `ids` and apply it in one UPDATE"""
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        try:
+            pks = [int(pk) for pk in request.POST.getlist('ids')]
+        except ValueError:
+            return JsonResponse({'status': 'error'}, status=400)
+        updated = self.model.bulk_reorder(pks)
+        return JsonResponse({'status': 'success', 'updated': updated})
+
 class TutorialStepInline(admin.TabularInline):
     model = TutorialStep
     extra = 1
@@ -27,31 +72,17 @@ class SolutionInline(admin.TabularInline):
     extra = 1
 
 @admin.register(Category)
-class CategoryAdmin(SecurityDataAdmin, admin.ModelAdmin):
+class CategoryAdmin(OrderedAdminMixin, SecurityDataAdmin, admin.ModelAdmin):
     list_display = ['name', 'importance', 'order', 'recommendation_count']
     list_filter = ['importance']
     search_fields = ['name', 'description']
     ordering = ['order', 'name']
     inlines = [RecommendationInline]
-    actions = ['move_up', 'move_down']
 
     def recommendation_count(self, obj):
         return obj.recommendations.count()
     recommendation_count.short_description = 'Recommendations'
 
-    def move_up(self, request, queryset):
-        for obj in queryset:
-            if obj.order > 1:
-                obj.update_order(obj.order - 1)
-    move_up.short_description = "Move selected items up"
-
-    def move_down(self, request, queryset):
-        max_order = Category.objects.all().aggregate(models.Max('order'))['order__max']
-        for obj in queryset:
-            if obj.order < max_order:
-                obj.update_order(obj.order + 1)
-    move_down.short_description = "Move selected items down"
-
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
@@ -73,14 +104,13 @@ class CategoryAdmin(SecurityDataAdmin, admin.ModelAdmin):
         return redirect('admin:online_security_category_changelist')
 
 @admin.register(Recommendation)
-class RecommendationAdmin(admin.ModelAdmin):
+class RecommendationAdmin(OrderedAdminMixin, admin.ModelAdmin):
     list_display = ['name', 'importance', 'order', 'category_list', 'solution_count']
     list_filter = ['importance', 'categories']
     search_fields = ['name', 'description']
     ordering = ['order', 'name']
     filter_horizontal = ['categories']
     inlines = [SolutionInline]
-    actions = ['move_up', 'move_down']
 
     def category_list(self, obj):
         return ", ".join([c.name for c in obj.categories.all()])
@@ -90,21 +120,8 @@ class RecommendationAdmin(admin.ModelAdmin):
         return obj.solutions.count()
     solution_count.short_description = 'Solutions'
 
-    def move_up(self, request, queryset):
-        for obj in queryset:
-            if obj.order > 1:
-                obj.update_order(obj.order - 1)
-    move_up.short_description = "Move selected items up"
-
-    def move_down(self, request, queryset):
-        max_order = Recommendation.objects.all().aggregate(models.Max('order'))['order__max']
-        for obj in queryset:
-            if obj.order < max_order:
-                obj.update_order(obj.order + 1)
-    move_down.short_description = "Move selected items down"
-
 @admin.register(Solution)
-class SolutionAdmin(admin.ModelAdmin):
+class SolutionAdmin(OrderedAdminMixin, admin.ModelAdmin):
     list_display = [
         'name', 
         'type', 
@@ -119,7 +136,6 @@ class SolutionAdmin(admin.ModelAdmin):
     ordering = ['order', 'name']
     filter_horizontal = ['recommendations']
     inlines = [TutorialInline]
-    actions = ['move_up', 'move_down']
 
     def cost_display(self, obj):
         if obj.cost:
@@ -133,67 +149,26 @@ class SolutionAdmin(admin.ModelAdmin):
         return "All Platforms"
     platform_list.short_description = 'Supported Platforms'
 
-    def move_up(self, request, queryset):
-        for obj in queryset:
-            if obj.order > 1:
-                obj.update_order(obj.order - 1)
-    move_up.short_description = "Move selected items up"
-
-    def move_down(self, request, queryset):
-        max_order = Solution.objects.all().aggregate(models.Max('order'))['order__max']
-        for obj in queryset:
-            if obj.order < max_order:
-                obj.update_order(obj.order + 1)
-    move_down.short_description = "Move selected items down"
-
 @admin.register(Tutorial)
-class TutorialAdmin(admin.ModelAdmin):
+class TutorialAdmin(OrderedAdminMixin, admin.ModelAdmin):
     list_display = ['name', 'solution', 'difficulty', 'estimated_time', 'step_count', 'order']
     list_filter = ['difficulty', 'solution']
     search_fields = ['name', 'description']
     ordering = ['order', 'name']
     inlines = [TutorialStepInline]
-    actions = ['move_up', 'move_down']
 
     def step_count(self, obj):
         return obj.steps.count()
     step_count.short_description = 'Steps'
 
-    def move_up(self, request, queryset):
-        for obj in queryset:
-            if obj.order > 1:
-                obj.update_order(obj.order - 1)
-    move_up.short_description = "Move selected items up"
-
-    def move_down(self, request, queryset):
-        max_order = Tutorial.objects.all().aggregate(models.Max('order'))['order__max']
-        for obj in queryset:
-            if obj.order < max_order:
-                obj.update_order(obj.order + 1)
-    move_down.short_description = "Move selected items down"
-
 @admin.register(TutorialStep)
-class TutorialStepAdmin(admin.ModelAdmin):
+class TutorialStepAdmin(OrderedAdminMixin, admin.ModelAdmin):
     list_display = ['name', 'tutorial', 'order', 'has_image']
     list_filter = ['tutorial']
     search_fields = ['name', 'description']
     ordering = ['tutorial', 'order']
-    actions = ['move_up', 'move_down']
 
     def has_image(self, obj):
         return bool(obj.image_file)
     has_image.boolean = True
-    has_image.short_description = 'Has Image'
-
-    def move_up(self, request, queryset):
-        for obj in queryset:
-            if obj.order > 1:
-                obj.update_order(obj.order - 1)
-    move_up.short_description = "Move selected items up"
-
-    def move_down(self, request, queryset):
-        max_order = TutorialStep.objects.all().aggregate(models.Max('order'))['order__max']
-        for obj in queryset:
-            if obj.order < max_order:
-                obj.update_order(obj.order + 1)
-    move_down.short_description = "Move selected items down"
\ No newline at end of file
+    has_image.short_description = 'Has Image'
\ No newline at end of file
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 class OnlineSecurityConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'online_security'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,135 @@
+from decimal import Decimal, InvalidOperation
+from django.core.cache import cache
+from .models import Category, Recommendation, Solution
+
+CATALOG_CACHE_KEY = 'online_security:catalog'
+CATALOG_CACHE_TIMEOUT = 60 * 60
+
+# Annual cost thresholds used to bucket solutions for browsing
+COST_BANDS = [
+    ('free', 'Free'),
+    ('low', 'Under $50/year'),
+    ('medium', '$50 - $150/year'),
+    ('high', 'Over $150/year'),
+]
+
+DIFFICULTY_LEVELS = {
+    'very_easy': 1,
+    'easy': 2,
+    'medium': 3,
+    'hard': 4,
+    'very_hard': 5,
+}
+
+TIME_UNIT_MINUTES = {
+    'minutes': 1,
+    'hours': 60,
+    'days': 60 * 24,
+}
+
+COST_MULTIPLIERS = {
+    'month': 12,
+    'year': 1,
+    'one_time': 1,
+    'one-time': 1,
+}
+
+def annual_cost(cost, cost_duration):
+    """Normalize a solution's cost to a yearly figure (one-time costs count once)"""
+    if cost in (None, ''):
+        return 0.0
+    try:
+        amount = float(Decimal(str(cost)))
+    except (InvalidOperation, ValueError):
+        return 0.0
+    return amount * COST_MULTIPLIERS.get(cost_duration, 1)
+
+def cost_band(yearly_cost):
+    """Return the COST_BANDS key for a normalized yearly cost"""
+    if not yearly_cost:
+        return 'free'
+    if yearly_cost < 50:
+        return 'low'
+    if yearly_cost <= 150:
+        return 'medium'
+    return 'high'
+
+def implementation_minutes(implementation_time, unit):
+    """Convert the free-text implementation time to minutes, or None if unknown"""
+    try:
+        amount = float(implementation_time)
+    except (TypeError, ValueError):
+        return None
+    return amount * TIME_UNIT_MINUTES.get(unit, 1)
+
+def build_catalog():
+    """
+    Load the full recommendation/solution catalog as plain Python data.
+    Costs four queries regardless of catalog size.
+    """
+    categories = {
+        category['id']: category
+        for category in Category.objects.values('id', 'name', 'order')
+    }
+
+    solutions = {}
+    for solution in Solution.objects.values(
+        'id', 'name', 'type', 'cost', 'cost_duration',
+        'implementation_difficulty', 'learning_curve',
+        'implementation_time', 'implementation_time_unit',
+        'supported_platforms', 'order'
+    ):
+        solution['cost'] = float(solution['cost']) if solution['cost'] is not None else None
+        solution['annual_cost'] = annual_cost(solution['cost'], solution['cost_duration'])
+        solution['cost_band'] = cost_band(solution['annual_cost'])
+        solution['supported_platforms'] = solution['supported_platforms'] or []
+        solution['difficulty_level'] = DIFFICULTY_LEVELS.get(solution['implementation_difficulty'])
+        solution['learning_level'] = DIFFICULTY_LEVELS.get(solution['learning_curve'])
+        solution['implementation_minutes'] = implementation_minutes(
+            solution['implementation_time'], solution['implementation_time_unit']
+        )
+        solutions[solution['id']] = solution
+
+    recommendations = {}
+    for recommendation in Recommendation.objects.values(
+        'id', 'name', 'description', 'importance', 'order'
+    ):
+        recommendation['category_ids'] = []
+        recommendation['solution_ids'] = []
+        recommendations[recommendation['id']] = recommendation
+
+    category_links = Recommendation.categories.through.objects.values_list(
+        'recommendation_id', 'category_id'
+    )
+    for recommendation_id, category_id in category_links:
+        recommendations[recommendation_id]['category_ids'].append(category_id)
+
+    solution_links = Solution.recommendations.through.objects.values_list(
+        'recommendation_id', 'solution_id'
+    )
+    for recommendation_id, solution_id in solution_links:
+        recommendations[recommendation_id]['solution_ids'].append(solution_id)
+
+    for recommendation in recommendations.values():
+        recommendation['solution_ids'].sort(
+            key=lambda pk: (solutions[pk]['order'], solutions[pk]['name'])
+        )
+
+    return {
+        'categories': categories,
+        'recommendations': sorted(
+            recommendations.values(), key=lambda r: (r['order'], r['name'])
+        ),
+        'solutions': solutions,
+    }
+
+def get_catalog():
+    """Return the cached catalog, rebuilding it on a cache miss"""
+    catalog = cache.get(CATALOG_CACHE_KEY)
+    if catalog is None:
+        catalog = build_catalog()
+        cache.set(CATALOG_CACHE_KEY, catalog, CATALOG_CACHE_TIMEOUT)
+    return catalog
+
+def invalidate_catalog():
+    cache.delete(CATALOG_CACHE_KEY)
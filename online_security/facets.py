@@ -0,0 +1,145 @@
+from .catalog import COST_BANDS
+from .models import PLATFORM_CHOICES, Recommendation, Solution
+
+ALL_PLATFORMS = frozenset(platform for platform, _ in PLATFORM_CHOICES)
+
+IMPORTANCE_CHOICES = Recommendation._meta.get_field('importance').choices
+TYPE_CHOICES = Solution._meta.get_field('type').choices
+
+# Facets that describe the recommendation itself
+RECOMMENDATION_FACETS = ('category', 'importance')
+# Facets that match when at least one solution of the recommendation matches
+SOLUTION_FACETS = ('type', 'platform', 'cost', 'difficulty')
+FACETS = RECOMMENDATION_FACETS + SOLUTION_FACETS
+
+FACET_LABELS = {
+    'category': 'Category',
+    'importance': 'Severity',
+    'type': 'Solution Type',
+    'platform': 'Platform',
+    'cost': 'Cost',
+    'difficulty': 'Difficulty',
+}
+
+def parse_facet_filters(params):
+    """
+    Read multi-select facet values from a QueryDict. Values within a facet are
+    OR'd together, separate facets are AND'd.
+    """
+    filters = {}
+    for facet in FACETS:
+        values = {value for value in params.getlist(facet) if value}
+        if values:
+            filters[facet] = values
+
+    # Legacy single-select parameter from the original browse form
+    severity = params.get('severity')
+    if severity:
+        filters.setdefault('importance', set()).add(severity)
+    return filters
+
+def _recommendation_values(recommendation):
+    return {
+        'category': {str(pk) for pk in recommendation['category_ids']},
+        'importance': {recommendation['importance']},
+    }
+
+def _solution_values(solution):
+    return {
+        'type': {solution['type']},
+        # Solutions without platform data apply everywhere
+        'platform': set(solution['supported_platforms']) or set(ALL_PLATFORMS),
+        'cost': {solution['cost_band']},
+        'difficulty': {solution['implementation_difficulty']} if solution['implementation_difficulty'] else set(),
+    }
+
+def _matches(values, filters, facets, skip=None):
+    return all(
+        values[facet] & filters[facet]
+        for facet in facets
+        if facet in filters and facet != skip
+    )
+
+def _matches_query(recommendation, solutions, query):
+    if not query:
+        return True
+    query = query.lower()
+    return (
+        query in recommendation['name'].lower()
+        or query in recommendation['description'].lower()
+        or any(query in solution['name'].lower() for solution in solutions)
+    )
+
+def search_catalog(catalog, query='', filters=None):
+    """
+    Filter the catalog and compute facet counts in a single pass.
+
+    Each facet's counts are computed with every *other* facet applied, so
+    the counts show how many recommendations selecting that value would
+    leave. Returns (matching recommendation ids, counts per facet value).
+    """
+    filters = filters or {}
+    counts = {facet: {} for facet in FACETS}
+    matching_ids = []
+
+    for recommendation in catalog['recommendations']:
+        solutions = [catalog['solutions'][pk] for pk in recommendation['solution_ids']]
+        if not _matches_query(recommendation, solutions, query):
+            continue
+
+        rec_values = _recommendation_values(recommendation)
+        sol_values = [_solution_values(solution) for solution in solutions]
+
+        has_solution_match = any(
+            _matches(values, filters, SOLUTION_FACETS) for values in sol_values
+        ) if any(facet in filters for facet in SOLUTION_FACETS) else True
+
+        if has_solution_match and _matches(rec_values, filters, RECOMMENDATION_FACETS):
+            matching_ids.append(recommendation['id'])
+
+        for facet in RECOMMENDATION_FACETS:
+            if has_solution_match and _matches(rec_values, filters, RECOMMENDATION_FACETS, skip=facet):
+                for value in rec_values[facet]:
+                    counts[facet][value] = counts[facet].get(value, 0) + 1
+
+        if not _matches(rec_values, filters, RECOMMENDATION_FACETS):
+            continue
+        for facet in SOLUTION_FACETS:
+            reachable = set()
+            for values in sol_values:
+                if _matches(values, filters, SOLUTION_FACETS, skip=facet):
+                    reachable |= values[facet]
+            for value in reachable:
+                counts[facet][value] = counts[facet].get(value, 0) + 1
+
+    return matching_ids, counts
+
+def facet_options(catalog, counts, filters):
+    """Build the labelled option lists rendered by the browse page and JSON endpoint"""
+    choices = {
+        'category': [
+            (str(category['id']), category['name'])
+            for category in sorted(
+                catalog['categories'].values(), key=lambda c: (c['order'], c['name'])
+            )
+        ],
+        'importance': IMPORTANCE_CHOICES,
+        'type': TYPE_CHOICES,
+        'platform': PLATFORM_CHOICES,
+        'cost': COST_BANDS,
+        'difficulty': Solution.DIFFICULTY_CHOICES,
+    }
+
+    selected = filters or {}
+    return {
+        facet: [
+            {
+                'value': value,
+                'label': label,
+                'count': counts[facet].get(value, 0),
+                'selected': value in selected.get(facet, ()),
+            }
+            for value, label in choices[facet]
+        ]
+        for facet in FACETS
+    }
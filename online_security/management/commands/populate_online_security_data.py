@@ -6,21 +6,47 @@ from django.http import HttpResponse
 from django.urls import path
 from django.conf import settings
 from django.db import transaction
+from online_security.catalog import invalidate_catalog
 from online_security.models import Category, Recommendation, Solution
+from decimal import Decimal
+import hashlib
 import json
 import logging
 import os
 
 logger = logging.getLogger(__name__)
 
+CATEGORY_FIELDS = ['description', 'importance', 'order']
+RECOMMENDATION_FIELDS = ['description', 'importance', 'order']
+SOLUTION_FIELDS = [
+    'description', 'type', 'cost', 'cost_duration', 'implementation_difficulty',
+    'management_difficulty', 'learning_curve', 'implementation_time',
+    'implementation_time_unit', 'supported_platforms', 'strengths', 'weaknesses',
+    'download_link', 'order',
+]
+
+def normalize_value(model, field_name, value):
+    """Coerce a raw JSON value to what the database column would hold"""
+    if value is None:
+        return None
+    field = model._meta.get_field(field_name)
+    value = field.to_python(value)
+    if isinstance(value, Decimal):
+        value = value.quantize(Decimal(1).scaleb(-field.decimal_places))
+    return value
+
+def content_hash(values):
+    payload = json.dumps(values, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
 class Command(BaseCommand):
-    help = 'Populates the security database with predefined data from local JSON file'
+    help = 'Syncs the security database with predefined data from local JSON file'
 
     def add_arguments(self, parser):
         parser.add_argument(
             '--clear',
             action='store_true',
-            help='Clear existing data before importing',
+            help='Delete catalog entries and links that are no longer in the data file',
         )
 
     def handle(self, *args, **options):
@@ -30,22 +56,35 @@ class Command(BaseCommand):
             # Read data from local file
             with open(data_file_path, 'r', encoding='utf-8') as file:
                 data = json.load(file)
-            
+
+            categories, recommendations, solutions, category_links, solution_links = (
+                self.flatten(data)
+            )
+
             with transaction.atomic():
-                # Clear existing data if requested
-                if options['clear']:
-                    self.stdout.write('Clearing existing data...')
-                    Category.objects.all().delete()
-                    self.stdout.write('Existing data cleared.')
-
-                # Process categories and their nested data
-                for category_data in data['categories']:
-                    try:
-                        category = self.create_category(category_data)
-                        self.process_recommendations(category, category_data.get('recommendations', []))
-                    except Exception as e:
-                        logger.error(f"Error processing category {category_data.get('name', 'Unknown')}: {str(e)}")
-                        raise
+                category_ids = self.sync_model(
+                    Category, CATEGORY_FIELDS, categories, options['clear']
+                )
+                recommendation_ids = self.sync_model(
+                    Recommendation, RECOMMENDATION_FIELDS, recommendations, options['clear']
+                )
+                solution_ids = self.sync_model(
+                    Solution, SOLUTION_FIELDS, solutions, options['clear']
+                )
+
+                self.sync_links(
+                    Recommendation.categories.through, 'recommendation_id', 'category_id',
+                    {(recommendation_ids[r], category_ids[c]) for r, c in category_links},
+                    options['clear']
+                )
+                self.sync_links(
+                    Solution.recommendations.through, 'solution_id', 'recommendation_id',
+                    {(solution_ids[s], recommendation_ids[r]) for s, r in solution_links},
+                    options['clear']
+                )
+
+            # Bulk writes bypass model signals, so drop the cached catalog explicitly
+            invalidate_catalog()
 
             self.stdout.write(
                 self.style.SUCCESS('Successfully populated security data from local file')
@@ -64,80 +103,102 @@ class Command(BaseCommand):
             logger.error(error_msg)
             self.stderr.write(self.style.ERROR(error_msg))
 
-    def create_category(self, category_data):
-        """Create or update a category"""
-        category, created = Category.objects.update_or_create(
-            name=category_data['name'],
-            defaults={
+    def flatten(self, data):
+        """
+        Flatten the nested JSON into rows keyed by name plus (child, parent) name
+        links. A recommendation or solution listed under several parents keeps
+        the values of its last occurrence, matching the old update_or_create
+        behaviour.
+        """
+        categories, recommendations, solutions = {}, {}, {}
+        category_links, solution_links = set(), set()
+
+        for category_data in data['categories']:
+            categories[category_data['name']] = {
                 'description': category_data['description'],
                 'importance': category_data['importance'],
-                'order': category_data.get('order', 0)
-            }
-        )
-        action = 'Created' if created else 'Updated'
-        self.stdout.write(f'{action} category: {category.name}')
-        return category
-
-    def create_recommendation(self, recommendation_data, category):
-        """Create or update a recommendation"""
-        recommendation, created = Recommendation.objects.update_or_create(
-            name=recommendation_data['name'],
-            defaults={
-                'description': recommendation_data['description'],
-                'importance': recommendation_data['importance'],
-                'order': recommendation_data.get('order', 0)
-            }
-        )
-        recommendation.categories.add(category)
-        action = 'Created' if created else 'Updated'
-        self.stdout.write(f'{action} recommendation: {recommendation.name}')
-        return recommendation
-
-    def create_solution(self, solution_data, recommendation):
-        """Create or update a solution"""
-        solution, created = Solution.objects.update_or_create(
-            name=solution_data['name'],
-            defaults={
-                'description': solution_data['description'],
-                'type': solution_data['type'],
-                'cost': solution_data.get('cost'),
-                'cost_duration': solution_data.get('cost_duration'),
-                'implementation_difficulty': solution_data.get('implementation_difficulty'),
-                'management_difficulty': solution_data.get('management_difficulty'),
-                'learning_curve': solution_data.get('learning_curve'),
-                'implementation_time': solution_data.get('implementation_time'),
-                'implementation_time_unit': solution_data.get('implementation_time_unit'),
-                'supported_platforms': solution_data.get('supported_platforms', []),
-                'strengths': solution_data.get('strengths'),
-                'weaknesses': solution_data.get('weaknesses'),
-                'download_link': solution_data.get('download_link'),
-                'order': solution_data.get('order', 0)
+                'order': category_data.get('order', 0),
             }
+            for recommendation_data in category_data.get('recommendations', []):
+                recommendations[recommendation_data['name']] = {
+                    'description': recommendation_data['description'],
+                    'importance': recommendation_data['importance'],
+                    'order': recommendation_data.get('order', 0),
+                }
+                category_links.add((recommendation_data['name'], category_data['name']))
+
+                for solution_data in recommendation_data.get('solutions', []):
+                    values = {field: solution_data.get(field) for field in SOLUTION_FIELDS}
+                    values['supported_platforms'] = solution_data.get('supported_platforms') or []
+                    values['order'] = solution_data.get('order', 0)
+                    solutions[solution_data['name']] = values
+                    solution_links.add((solution_data['name'], recommendation_data['name']))
+
+        return categories, recommendations, solutions, category_links, solution_links
+
+    def sync_model(self, model, fields, rows, clear):
+        """
+        Diff the desired rows against the table by content hash and write only
+        what changed. Returns a mapping of name to primary key.
+        """
+        label = model._meta.verbose_name_plural.title()
+        desired = {
+            name: {field: normalize_value(model, field, values[field]) for field in fields}
+            for name, values in rows.items()
+        }
+
+        existing = {}
+        for obj in model.objects.all():
+            existing.setdefault(obj.name, obj)
+
+        to_create, to_update = [], []
+        for name, values in desired.items():
+            obj = existing.get(name)
+            if obj is None:
+                to_create.append(model(name=name, **values))
+                continue
+
+            current = {field: getattr(obj, field) for field in fields}
+            if content_hash(current) != content_hash(values):
+                for field, value in values.items():
+                    setattr(obj, field, value)
+                to_update.append(obj)
+
+        # bulk_create skips OrderedModelMixin.save, so the file's order is kept
+        model.objects.bulk_create(to_create)
+        if to_update:
+            model.objects.bulk_update(to_update, fields)
+
+        stale = [obj.pk for name, obj in existing.items() if name not in desired]
+        if clear and stale:
+            model.objects.filter(pk__in=stale).delete()
+
+        self.stdout.write(
+            f'{label}: {len(to_create)} created, {len(to_update)} updated, '
+            f'{len(desired) - len(to_create) - len(to_update)} unchanged, '
+            f'{len(stale) if clear else 0} deleted'
         )
-        solution.recommendations.add(recommendation)
-        action = 'Created' if created else 'Updated'
-        self.stdout.write(f'{action} solution: {solution.name}')
-        return solution
-
-    def process_recommendations(self, category, recommendations_data):
-        """Process all recommendations for a category"""
-        for recommendation_data in recommendations_data:
-            try:
-                recommendation = self.create_recommendation(recommendation_data, category)
-                self.process_solutions(recommendation, recommendation_data.get('solutions', []))
-            except Exception as e:
-                logger.error(f"Error processing recommendation {recommendation_data.get('name', 'Unknown')}: {str(e)}")
-                raise
-
-    def process_solutions(self, recommendation, solutions_data):
-        """Process all solutions for a recommendation"""
-        for solution_data in solutions_data:
-            try:
-                self.create_solution(solution_data, recommendation)
-            except Exception as e:
-                logger.error(f"Error processing solution {solution_data.get('name', 'Unknown')}: {str(e)}")
-                raise
 
+        ids = {name: obj.pk for name, obj in existing.items()}
+        ids.update({obj.name: obj.pk for obj in to_create})
+        return ids
+
+    def sync_links(self, through, child_field, parent_field, desired, clear):
+        """Insert missing M2M rows (and drop stale ones with --clear) in bulk"""
+        existing = {
+            (child_id, parent_id): pk
+            for pk, child_id, parent_id in through.objects.values_list('pk', child_field, parent_field)
+        }
+
+        through.objects.bulk_create([
+            through(**{child_field: child_id, parent_field: parent_id})
+            for child_id, parent_id in desired - existing.keys()
+        ])
+
+        if clear:
+            stale = [pk for link, pk in existing.items() if link not in desired]
+            if stale:
+                through.objects.filter(pk__in=stale).delete()
 
 # Admin integration
 class SecurityDataAdmin:
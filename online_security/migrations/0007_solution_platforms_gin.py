@@ -0,0 +1,28 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.db import migrations
+
+
+def normalize_mac_platform(apps, schema_editor):
+    """The bundled data file used 'MacOS', which the platform validator rejects"""
+    Solution = apps.get_model('online_security', 'Solution')
+    for solution in Solution.objects.filter(supported_platforms__contains=['MacOS']):
+        solution.supported_platforms = [
+            'Mac' if platform == 'MacOS' else platform
+            for platform in solution.supported_platforms
+        ]
+        solution.save(update_fields=['supported_platforms'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('online_security', '0006_alter_solution_strengths_alter_solution_weaknesses'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_mac_platform, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='solution',
+            index=GinIndex(fields=['supported_platforms'], name='solution_platforms_gin'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.3 on 2026-10-19 06:22
+
+import django.contrib.postgres.fields
+import online_security.models
+from django.db import migrations, models
+
+
+def empty_null_platforms(apps, schema_editor):
+    """Solutions without platform data now store an empty list"""
+    Solution = apps.get_model('online_security', 'Solution')
+    Solution.objects.filter(supported_platforms__isnull=True).update(supported_platforms=[])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('online_security', '0008_order_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(empty_null_platforms, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='solution',
+            name='supported_platforms',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=50), blank=True, default=list, size=None, validators=[online_security.models.validate_platforms]),
+        ),
+    ]
@@ -1,11 +1,21 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
 from django.db.models import F
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+
+PLATFORM_CHOICES = [
+    ('Mac', 'Mac'),
+    ('Windows', 'Windows'),
+    ('Linux', 'Linux'),
+    ('Android', 'Android'),
+    ('iOS', 'iOS'),
+    ('Browser', 'Browser'),
+]
 
 def validate_platforms(value):
-    valid_platforms = {'Mac', 'Windows', 'Linux', 'Android', 'iOS', 'Browser'}
+    valid_platforms = {platform for platform, _ in PLATFORM_CHOICES}
     invalid_platforms = [platform for platform in value if platform not in valid_platforms]
     if invalid_platforms:
         raise ValidationError(
@@ -14,33 +24,126 @@ def validate_platforms(value):
         )
 
 class OrderedModelMixin:
+    """
+    Sparse ordering: rows in a scope are spaced `order_gap` apart so a move only
+    rewrites the moved row. When two neighbours have no room left between them
+    the scope is renumbered in a single UPDATE. `order_scope` names the parent
+    fields that ordering is relative to (e.g. the tutorial a step belongs to).
+    """
+    order_gap = 1024
+    order_scope = ()
+
+    def get_order_queryset(self):
+        scope = {}
+        for field in self.order_scope:
+            attname = self._meta.get_field(field).attname
+            scope[attname] = getattr(self, attname)
+        return self.__class__.objects.filter(**scope)
+
     def save(self, *args, **kwargs):
-        if self._state.adding:  # If this is a new object
-            last_order = self.__class__.objects.aggregate(
+        if self._state.adding and not self.order:  # Append new objects to their scope
+            last_order = self.get_order_queryset().aggregate(
                 models.Max('order'))['order__max']
-            self.order = (last_order or 0) + 1
+            self.order = (last_order or 0) + self.order_gap
         super().save(*args, **kwargs)
 
-    def update_order(self, new_order):
-        if new_order == self.order:
-            return
+    @classmethod
+    def _order_is_unique(cls):
+        return any('order' in fields for fields in cls._meta.unique_together)
+
+    @classmethod
+    def bulk_reorder(cls, pks):
+        """
+        Renumber the given rows to follow the order of `pks` in one UPDATE.
+        Pass the complete ordering of a scope.
+        """
+        pks = list(pks)
+        if not pks:
+            return 0
 
         with transaction.atomic():
-            if new_order < self.order:
-                # Moving up in the list
-                self.__class__.objects.filter(
-                    order__gte=new_order,
-                    order__lt=self.order
-                ).update(order=F('order') + 1)
-            else:
-                # Moving down in the list
-                self.__class__.objects.filter(
-                    order__gt=self.order,
-                    order__lte=new_order
-                ).update(order=F('order') - 1)
-            
-            self.order = new_order
-            self.save()
+            queryset = cls.objects.filter(pk__in=pks)
+            if cls._order_is_unique():
+                # Move rows out of the way first so the renumbering can't collide
+                queryset.update(order=-F('order') - 1)
+            return queryset.update(order=models.Case(
+                *[models.When(pk=pk, then=models.Value((index + 1) * cls.order_gap))
+                  for index, pk in enumerate(pks)],
+                output_field=models.IntegerField()
+            ))
+
+    def rebalance(self):
+        """Respace every row in this object's scope"""
+        pks = self.get_order_queryset().order_by(*self._meta.ordering).values_list('pk', flat=True)
+        self.bulk_reorder(pks)
+        self.refresh_from_db(fields=['order'])
+
+    def _siblings(self):
+        return self.get_order_queryset().exclude(pk=self.pk)
+
+    def _place_between(self, lower, upper):
+        """Write a single new order value between two neighbour values"""
+        if lower is None and upper is None:
+            return True
+        if lower is None:
+            new_order = upper - self.order_gap
+        elif upper is None:
+            new_order = lower + self.order_gap
+        elif upper - lower > 1:
+            new_order = (lower + upper) // 2
+        else:
+            return False
+
+        self.__class__.objects.filter(pk=self.pk).update(order=new_order)
+        self.order = new_order
+        return True
+
+    def _move(self, find_neighbours):
+        with transaction.atomic():
+            if self._siblings().filter(order=self.order).exists():
+                self.rebalance()
+            neighbours = find_neighbours()
+            if neighbours is None:
+                return
+            if not self._place_between(*neighbours):
+                self.rebalance()
+                self._place_between(*find_neighbours())
+
+    def move_up(self):
+        """Swap places with the previous object in the scope"""
+        def find_neighbours():
+            previous = list(self._siblings().filter(
+                order__lt=self.order
+            ).order_by('-order').values_list('order', flat=True)[:2])
+            if not previous:
+                return None
+            return (previous[1] if len(previous) > 1 else None), previous[0]
+        self._move(find_neighbours)
+
+    def move_down(self):
+        """Swap places with the next object in the scope"""
+        def find_neighbours():
+            following = list(self._siblings().filter(
+                order__gt=self.order
+            ).order_by('order').values_list('order', flat=True)[:2])
+            if not following:
+                return None
+            return following[0], (following[1] if len(following) > 1 else None)
+        self._move(find_neighbours)
+
+    def update_order(self, new_order):
+        """Move to a 1-based position within the scope"""
+        def find_neighbours():
+            index = max(new_order - 1, 0)
+            siblings = self._siblings().order_by(*self._meta.ordering).values_list('order', flat=True)
+            if index == 0:
+                following = list(siblings[:1])
+                return None, (following[0] if following else None)
+            around = list(siblings[index - 1:index + 1])
+            if not around:
+                return None
+            return around[0], (around[1] if len(around) > 1 else None)
+        self._move(find_neighbours)
 
 class Category(OrderedModelMixin, models.Model):
     name = models.CharField(max_length=100)
@@ -58,6 +161,9 @@ class Category(OrderedModelMixin, models.Model):
     class Meta:
         verbose_name_plural = "Categories"
         ordering = ['order', 'name']
+        indexes = [
+            models.Index(fields=['order'], name='category_order_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -78,10 +184,32 @@ class Recommendation(OrderedModelMixin, models.Model):
 
     class Meta:
         ordering = ['order', 'name']
+        indexes = [
+            models.Index(fields=['order'], name='recommendation_order_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+class SolutionQuerySet(models.QuerySet):
+    def for_platforms(self, platforms, match_all=False, include_universal=True):
+        """
+        Filter to solutions supporting the given platforms. Uses the GIN index on
+        supported_platforms: `overlap` for any platform, `contains` for all of them.
+        Solutions without platform data apply everywhere and are kept by default;
+        they are matched with `contained_by` the empty array, which the same
+        index answers (an `= '{}'` or IS NULL test would need a sequential scan).
+        """
+        platforms = list(platforms)
+        if not platforms:
+            return self
+
+        lookup = 'supported_platforms__contains' if match_all else 'supported_platforms__overlap'
+        condition = models.Q(**{lookup: platforms})
+        if include_universal:
+            condition |= models.Q(supported_platforms__contained_by=[])
+        return self.filter(condition)
+
 class Solution(OrderedModelMixin, models.Model):
     COST_DURATION_CHOICES = [
         ('month', 'Month'),
@@ -151,10 +279,11 @@ class Solution(OrderedModelMixin, models.Model):
         null=True,
         blank=True
     )
+    # Empty for solutions that apply to every platform
     supported_platforms = ArrayField(
         models.CharField(max_length=50),
         validators=[validate_platforms],
-        null=True,
+        default=list,
         blank=True
     )
     strengths = models.TextField(null=True, blank=True)
@@ -173,13 +302,21 @@ class Solution(OrderedModelMixin, models.Model):
     recommendations = models.ManyToManyField(Recommendation, related_name='solutions')
     order = models.IntegerField(default=0)
 
+    objects = SolutionQuerySet.as_manager()
+
     class Meta:
         ordering = ['order', 'name']
+        indexes = [
+            GinIndex(fields=['supported_platforms'], name='solution_platforms_gin'),
+            models.Index(fields=['order'], name='solution_order_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 class Tutorial(OrderedModelMixin, models.Model):
+    order_scope = ('solution',)
+
     solution = models.ForeignKey(Solution, on_delete=models.CASCADE, related_name='tutorials')
     name = models.CharField(max_length=200)
     description = models.TextField()
@@ -192,11 +329,16 @@ class Tutorial(OrderedModelMixin, models.Model):
 
     class Meta:
         ordering = ['order', 'name']
+        indexes = [
+            models.Index(fields=['solution', 'order'], name='tutorial_solution_order_idx'),
+        ]
 
     def __str__(self):
         return f"{self.solution.name} - {self.name}"
 
 class TutorialStep(OrderedModelMixin, models.Model):
+    order_scope = ('tutorial',)
+
     tutorial = models.ForeignKey(Tutorial, on_delete=models.CASCADE, related_name='steps')
     order = models.IntegerField()
     name = models.CharField(max_length=200)
@@ -0,0 +1,94 @@
+from .catalog import DIFFICULTY_LEVELS
+
+# Yearly budget ceilings offered on the results page (None means no limit)
+BUDGET_CHOICES = [
+    ('', 'Any budget'),
+    ('free', 'Free only'),
+    ('low', 'Up to $50/year'),
+    ('medium', 'Up to $150/year'),
+]
+BUDGET_LIMITS = {
+    'free': 0,
+    'low': 50,
+    'medium': 150,
+}
+
+# Effort tolerance as (max difficulty level, max implementation minutes)
+EFFORT_CHOICES = [
+    ('', 'Any effort'),
+    ('low', 'Quick and easy'),
+    ('medium', 'A few hours'),
+]
+EFFORT_LIMITS = {
+    'low': (DIFFICULTY_LEVELS['easy'], 60),
+    'medium': (DIFFICULTY_LEVELS['medium'], 60 * 24),
+}
+
+WEIGHTS = {
+    'platform': 0.35,
+    'budget': 0.25,
+    'difficulty': 0.15,
+    'learning': 0.10,
+    'time': 0.15,
+}
+
+def _level_score(level, tolerance):
+    """1 within tolerance, dropping linearly to 0 at four levels beyond it"""
+    if level is None or tolerance is None or level <= tolerance:
+        return 1.0
+    return max(0.0, 1 - (level - tolerance) / 4)
+
+def _ratio_score(value, limit):
+    """1 within the limit, otherwise limit / value"""
+    if value is None or limit is None or value <= limit:
+        return 1.0
+    return limit / value
+
+def score_solutions(catalog, solution_ids, platforms=(), budget='', effort=''):
+    """
+    Score catalog solutions against the visitor's preferences.
+
+    All inputs come from the precomputed columns of the cached catalog, so
+    scoring is plain arithmetic with no database access. Returns a dict of
+    solution id to a score between 0 and 1.
+    """
+    platforms = set(platforms)
+    budget_limit = BUDGET_LIMITS.get(budget)
+    difficulty_limit, time_limit = EFFORT_LIMITS.get(effort, (None, None))
+
+    scores = {}
+    for solution_id in solution_ids:
+        solution = catalog['solutions'][solution_id]
+        supported = solution['supported_platforms']
+        platform_score = 1.0 if not platforms or not supported or platforms.intersection(supported) else 0.0
+
+        if budget_limit is None:
+            budget_score = 1.0
+        elif budget_limit == 0:
+            budget_score = 1.0 if not solution['annual_cost'] else 0.0
+        else:
+            budget_score = _ratio_score(solution['annual_cost'], budget_limit)
+
+        scores[solution_id] = (
+            WEIGHTS['platform'] * platform_score
+            + WEIGHTS['budget'] * budget_score
+            + WEIGHTS['difficulty'] * _level_score(solution['difficulty_level'], difficulty_limit)
+            + WEIGHTS['learning'] * _level_score(solution['learning_level'], difficulty_limit)
+            + WEIGHTS['time'] * _ratio_score(solution['implementation_minutes'], time_limit)
+        )
+    return scores
+
+def rank_solutions(catalog, solutions, **preferences):
+    """
+    Order solution instances by score (highest first), keeping the stored
+    order for ties, and attach the score as `match_score`.
+    """
+    solutions = list(solutions)
+    scores = score_solutions(
+        catalog, [solution.id for solution in solutions if solution.id in catalog['solutions']],
+        **preferences
+    )
+    for solution in solutions:
+        solution.match_score = round(scores.get(solution.id, 0.0) * 100)
+    # sorted() is stable, so equal scores keep their stored order
+    return sorted(solutions, key=lambda solution: -scores.get(solution.id, 0.0))
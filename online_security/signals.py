@@ -0,0 +1,19 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from .catalog import invalidate_catalog
+from .models import Category, Recommendation, Solution
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Recommendation)
+@receiver(post_save, sender=Solution)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Recommendation)
+@receiver(post_delete, sender=Solution)
+def catalog_changed(sender, **kwargs):
+    invalidate_catalog()
+
+@receiver(m2m_changed, sender=Recommendation.categories.through)
+@receiver(m2m_changed, sender=Solution.recommendations.through)
+def catalog_links_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_catalog()
@@ -1,3 +1,432 @@
-from django.test import TestCase
+import json
+from io import StringIO
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.db import DatabaseCache
+from django.core.management import call_command
+from django.db import connection
+from django.http import QueryDict
+from django.contrib.admin.sites import site
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from online_security.catalog import CATALOG_CACHE_KEY, annual_cost, cost_band, get_catalog
+from online_security.facets import parse_facet_filters, search_catalog
+from online_security.models import Category, Recommendation, Solution, Tutorial, TutorialStep
+from online_security.ranking import rank_solutions, score_solutions
 
-# Create your tests here.
+class SecurityCatalogTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.accounts = Category.objects.create(
+            name='Accounts', description='Account security', importance='critical'
+        )
+        self.devices = Category.objects.create(
+            name='Devices', description='Device security', importance='recommended'
+        )
+
+        self.passwords = Recommendation.objects.create(
+            name='Use a password manager', description='Unique passwords everywhere',
+            importance='critical'
+        )
+        self.passwords.categories.add(self.accounts)
+
+        self.encryption = Recommendation.objects.create(
+            name='Encrypt your disk', description='Full disk encryption',
+            importance='recommended'
+        )
+        self.encryption.categories.add(self.devices)
+
+        self.bitwarden = Solution.objects.create(
+            name='Bitwarden', description='Open-source password manager', type='product',
+            cost='10', cost_duration='year', implementation_difficulty='easy',
+            supported_platforms=['Mac', 'Windows', 'iOS', 'Android']
+        )
+        self.bitwarden.recommendations.add(self.passwords)
+
+        self.filevault = Solution.objects.create(
+            name='FileVault', description='Built-in macOS encryption', type='practice',
+            implementation_difficulty='very_easy', supported_platforms=['Mac']
+        )
+        self.filevault.recommendations.add(self.encryption)
+
+        self.veracrypt = Solution.objects.create(
+            name='VeraCrypt', description='Cross-platform disk encryption', type='product',
+            implementation_difficulty='hard', supported_platforms=['Windows', 'Linux']
+        )
+        self.veracrypt.recommendations.add(self.encryption)
+
+class TestCostNormalization(TestCase):
+    def test_annual_cost(self):
+        self.assertEqual(annual_cost('5', 'month'), 60)
+        self.assertEqual(annual_cost('36', 'year'), 36)
+        self.assertEqual(annual_cost('20', 'one-time'), 20)
+        self.assertEqual(annual_cost(None, None), 0)
+
+    def test_cost_band(self):
+        self.assertEqual(cost_band(0), 'free')
+        self.assertEqual(cost_band(36), 'low')
+        self.assertEqual(cost_band(120), 'medium')
+        self.assertEqual(cost_band(240), 'high')
+
+class TestFacetedSearch(SecurityCatalogTestCase):
+    def search(self, query='', **filters):
+        return search_catalog(
+            get_catalog(), query, {facet: set(values) for facet, values in filters.items()}
+        )
+
+    def test_catalog_is_cached(self):
+        get_catalog()
+        # One cache read, none of the catalog queries
+        with self.assertNumQueries(1):
+            get_catalog()
+
+    def test_catalog_cache_is_shared_between_processes(self):
+        get_catalog()
+        # A separate cache instance, as in another worker or a management command
+        other_process = DatabaseCache(settings.CACHES['default']['LOCATION'], {})
+        self.assertIsNotNone(other_process.get(CATALOG_CACHE_KEY))
+        self.veracrypt.save()
+        self.assertIsNone(other_process.get(CATALOG_CACHE_KEY))
+
+    def test_catalog_invalidated_on_change(self):
+        get_catalog()
+        self.veracrypt.supported_platforms = ['Linux']
+        self.veracrypt.save()
+        solution = get_catalog()['solutions'][self.veracrypt.id]
+        self.assertEqual(solution['supported_platforms'], ['Linux'])
+
+    def test_no_filters_returns_everything(self):
+        matching_ids, counts = self.search()
+        self.assertEqual(matching_ids, [self.passwords.id, self.encryption.id])
+        self.assertEqual(counts['importance'], {'critical': 1, 'recommended': 1})
+        self.assertEqual(counts['platform']['Mac'], 2)
+        self.assertEqual(counts['platform']['Linux'], 1)
+
+    def test_multi_select_within_facet_is_or(self):
+        matching_ids, _ = self.search(importance=['critical', 'recommended'])
+        self.assertEqual(len(matching_ids), 2)
+
+    def test_solution_facets_must_match_same_solution(self):
+        # FileVault is Mac-only and VeraCrypt is hard, so no single solution matches both
+        matching_ids, _ = self.search(platform=['Mac'], difficulty=['hard'])
+        self.assertNotIn(self.encryption.id, matching_ids)
+
+        matching_ids, _ = self.search(platform=['Linux'], difficulty=['hard'])
+        self.assertEqual(matching_ids, [self.encryption.id])
+
+    def test_counts_ignore_own_facet(self):
+        _, counts = self.search(importance=['critical'])
+        # Selecting a severity should still show how many the other severities have
+        self.assertEqual(counts['importance'], {'critical': 1, 'recommended': 1})
+        # Other facets are narrowed to the critical recommendation
+        self.assertNotIn('Linux', counts['platform'])
+        self.assertEqual(counts['cost'], {'low': 1})
+
+    def test_text_query_matches_solution_names(self):
+        matching_ids, _ = self.search('veracrypt')
+        self.assertEqual(matching_ids, [self.encryption.id])
+
+    def test_legacy_severity_parameter(self):
+        filters = parse_facet_filters(QueryDict('severity=critical'))
+        self.assertEqual(filters, {'importance': {'critical'}})
+
+class TestSecurityBrowseViews(SecurityCatalogTestCase):
+    def test_browse_filters_recommendations(self):
+        response = self.client.get(reverse('security_browse'), {'category': [self.devices.id]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['recommendations']), [self.encryption])
+        self.assertEqual(list(response.context['hidden_recommendations']), [self.passwords])
+
+    def test_facets_endpoint(self):
+        response = self.client.get(
+            reverse('security_browse_facets'), {'platform': ['iOS', 'Linux']}
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(data['results'], [self.passwords.id, self.encryption.id])
+
+        platforms = {option['value']: option for option in data['facets']['platform']}
+        self.assertTrue(platforms['iOS']['selected'])
+        self.assertEqual(platforms['Mac']['count'], 2)
+
+    def test_facets_endpoint_uses_saved_platforms(self):
+        self.client.get(reverse('security_browse'), {'platform': ['Android']})
+        page = self.client.get(reverse('security_browse'))
+        data = self.client.get(reverse('security_browse_facets')).json()
+        self.assertEqual(data['results'], [recommendation.id for recommendation in page.context['recommendations']])
+        self.assertEqual(data['results'], [self.passwords.id])
+
+class TestPlatformFiltering(SecurityCatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.checklist = Solution.objects.create(
+            name='Security checkup', description='Review account settings', type='practice'
+        )
+        self.checklist.recommendations.add(self.passwords)
+
+    def test_for_platforms_overlap(self):
+        solutions = Solution.objects.for_platforms(['iOS', 'Linux'])
+        self.assertEqual(
+            set(solutions), {self.bitwarden, self.veracrypt, self.checklist}
+        )
+
+    def test_for_platforms_contains(self):
+        solutions = Solution.objects.for_platforms(['Mac', 'iOS'], match_all=True)
+        self.assertEqual(set(solutions), {self.bitwarden, self.checklist})
+
+    def test_for_platforms_without_universal(self):
+        solutions = Solution.objects.for_platforms(['Mac'], include_universal=False)
+        self.assertEqual(set(solutions), {self.bitwarden, self.filevault})
+
+    def test_for_platforms_uses_gin_index(self):
+        for match_all in (False, True):
+            sql, params = Solution.objects.for_platforms(['Mac'], match_all=match_all).query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute(f'EXPLAIN {sql}', params)
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+            # Both the platform match and the universal match come from the index
+            self.assertEqual(plan.count('Bitmap Index Scan on solution_platforms_gin'), 2)
+            self.assertNotIn('Seq Scan', plan)
+
+    def test_no_platforms_returns_everything(self):
+        self.assertEqual(Solution.objects.for_platforms([]).count(), 4)
+
+    def test_detail_page_filters_solutions_and_remembers_platforms(self):
+        url = reverse('security_recommendation_detail', args=[self.encryption.id])
+        response = self.client.get(url, {'platform': ['Linux']})
+        self.assertEqual(
+            list(response.context['recommendation'].solutions.all()), [self.veracrypt]
+        )
+        self.assertEqual(self.client.session['security_platforms'], ['Linux'])
+
+        # Saved platforms apply on the next visit without query parameters
+        response = self.client.get(url)
+        self.assertEqual(response.context['selected_platforms'], ['Linux'])
+
+        # Submitting the picker with nothing selected clears the preference
+        response = self.client.get(url, {'platform_filter': '1'})
+        self.assertEqual(len(response.context['recommendation'].solutions.all()), 2)
+
+    def test_browse_uses_saved_platforms(self):
+        self.client.get(reverse('security_browse'), {'platform': ['Android']})
+        response = self.client.get(reverse('security_browse'))
+        self.assertEqual(list(response.context['recommendations']), [self.passwords])
+
+class TestSolutionRanking(SecurityCatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.luks = Solution.objects.create(
+            name='LUKS', description='Linux disk encryption', type='practice',
+            implementation_difficulty='medium', implementation_time='30',
+            implementation_time_unit='minutes', supported_platforms=['Linux']
+        )
+        self.luks.recommendations.add(self.encryption)
+        self.paid = Solution.objects.create(
+            name='Paid Encryption Suite', description='Commercial encryption', type='product',
+            cost='20', cost_duration='month', implementation_difficulty='very_easy',
+            supported_platforms=['Windows', 'Linux']
+        )
+        self.paid.recommendations.add(self.encryption)
+
+    def rank(self, **preferences):
+        solutions = [self.filevault, self.veracrypt, self.luks, self.paid]
+        return rank_solutions(get_catalog(), solutions, **preferences)
+
+    def test_no_preferences_keeps_stored_order(self):
+        self.assertEqual(
+            self.rank(), [self.filevault, self.veracrypt, self.luks, self.paid]
+        )
+
+    def test_platforms_rank_supported_solutions_first(self):
+        ranked = self.rank(platforms=['Mac'])
+        self.assertEqual(ranked[0], self.filevault)
+
+    def test_budget_and_effort(self):
+        ranked = self.rank(platforms=['Linux'], budget='free', effort='low')
+        # Free, quick and Linux-supporting wins; unsupported platforms sink
+        self.assertEqual(ranked[0], self.luks)
+        self.assertEqual(ranked[-1], self.filevault)
+        self.assertTrue(all(0 <= solution.match_score <= 100 for solution in ranked))
+
+    def test_scoring_uses_cached_catalog(self):
+        catalog = get_catalog()
+        with self.assertNumQueries(0):
+            score_solutions(catalog, catalog['solutions'].keys(), platforms=['Linux'], budget='low')
+
+    def test_results_page_ranks_solutions(self):
+        session = self.client.session
+        session['assessment_results'] = {
+            'needs_action': [self.encryption.id], 'completed': [], 'not_applicable': []
+        }
+        session.save()
+        # Anonymous sessions are signed cookies, so the key changes with the data
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+        response = self.client.get(reverse('security_assessment_results'), {
+            'platform_filter': '1', 'platform': ['Linux'], 'budget': 'free', 'effort': 'low'
+        })
+        self.assertEqual(response.status_code, 200)
+        recommendation = response.context['results']['needs_action'][0]
+        self.assertEqual(recommendation.ranked_solutions[0], self.luks)
+        self.assertEqual(
+            self.client.session['security_ranking'], {'budget': 'free', 'effort': 'low'}
+        )
+
+class TestPopulateOnlineSecurityData(TestCase):
+    def populate(self, **options):
+        out = StringIO()
+        call_command('populate_online_security_data', stdout=out, stderr=out, **options)
+        return out.getvalue()
+
+    def test_initial_load_keeps_file_order(self):
+        self.populate()
+        with open(settings.BASE_DIR / 'data' / 'online_security.json', encoding='utf-8') as file:
+            data = json.load(file)
+        first = data['categories'][0]
+        self.assertEqual(Category.objects.get(name=first['name']).order, first['order'])
+        self.assertTrue(Solution.objects.exists())
+        self.assertTrue(Recommendation.categories.through.objects.exists())
+
+    def test_second_run_writes_nothing(self):
+        self.populate()
+        solution_ids = set(Solution.objects.values_list('id', flat=True))
+
+        output = self.populate()
+        self.assertIn('Solutions: 0 created, 0 updated', output)
+        self.assertIn('Categories: 0 created, 0 updated', output)
+        self.assertEqual(set(Solution.objects.values_list('id', flat=True)), solution_ids)
+
+    def test_changed_rows_are_updated_in_place(self):
+        self.populate()
+        solution = Solution.objects.first()
+        solution.description = 'Edited by hand'
+        solution.save()
+
+        output = self.populate()
+        self.assertIn('Solutions: 0 created, 1 updated', output)
+        refreshed = Solution.objects.get(name=solution.name)
+        self.assertEqual(refreshed.pk, solution.pk)
+        self.assertNotEqual(refreshed.description, 'Edited by hand')
+
+    def test_clear_only_removes_entries_missing_from_file(self):
+        self.populate()
+        extra = Solution.objects.create(name='Not in file', description='Extra', type='practice')
+        kept_ids = set(Solution.objects.exclude(pk=extra.pk).values_list('id', flat=True))
+
+        self.populate()
+        self.assertTrue(Solution.objects.filter(pk=extra.pk).exists())
+
+        self.populate(clear=True)
+        self.assertFalse(Solution.objects.filter(pk=extra.pk).exists())
+        self.assertEqual(set(Solution.objects.values_list('id', flat=True)), kept_ids)
+
+class TestOrderedModelMixin(TestCase):
+    def setUp(self):
+        self.solution = Solution.objects.create(name='Signal', description='Messenger', type='product')
+        self.other_solution = Solution.objects.create(name='Tor', description='Browser', type='product')
+        self.tutorials = [
+            Tutorial.objects.create(
+                solution=self.solution, name=f'Tutorial {index}', description='Steps',
+                estimated_time='5 minutes', difficulty='easy'
+            )
+            for index in range(4)
+        ]
+
+    def ordered_tutorials(self):
+        return list(Tutorial.objects.filter(solution=self.solution).order_by('order'))
+
+    def test_new_objects_are_spaced_per_scope(self):
+        orders = [tutorial.order for tutorial in self.tutorials]
+        self.assertEqual(orders, [1024, 2048, 3072, 4096])
+
+        other = Tutorial.objects.create(
+            solution=self.other_solution, name='Other', description='Steps',
+            estimated_time='5 minutes', difficulty='easy'
+        )
+        self.assertEqual(other.order, Tutorial.order_gap)
+
+    def test_move_up_writes_one_row(self):
+        last = self.tutorials[3]
+        with self.assertNumQueries(5):  # savepoint, tie check, neighbours, update, release
+            last.move_up()
+        self.assertEqual(
+            self.ordered_tutorials(),
+            [self.tutorials[0], self.tutorials[1], self.tutorials[3], self.tutorials[2]]
+        )
+
+    def test_move_down_and_to_position(self):
+        self.tutorials[0].move_down()
+        self.assertEqual(self.ordered_tutorials()[1], self.tutorials[0])
+
+        self.tutorials[3].update_order(1)
+        self.assertEqual(self.ordered_tutorials()[0], self.tutorials[3])
+
+    def test_move_at_edges_is_noop(self):
+        self.tutorials[0].move_up()
+        self.tutorials[3].move_down()
+        self.assertEqual(self.ordered_tutorials(), self.tutorials)
+
+    def test_rebalances_when_gap_is_exhausted(self):
+        Tutorial.objects.filter(pk=self.tutorials[0].pk).update(order=1)
+        Tutorial.objects.filter(pk=self.tutorials[1].pk).update(order=2)
+        Tutorial.objects.filter(pk=self.tutorials[2].pk).update(order=3)
+        self.tutorials[3].refresh_from_db()
+
+        self.tutorials[3].update_order(2)
+        self.assertEqual(
+            self.ordered_tutorials(),
+            [self.tutorials[0], self.tutorials[3], self.tutorials[1], self.tutorials[2]]
+        )
+
+    def test_admin_moves_selected_rows_across_a_rebalance(self):
+        for index, tutorial in enumerate(self.tutorials):
+            Tutorial.objects.filter(pk=tutorial.pk).update(order=index + 1)
+        model_admin = site._registry[Tutorial]
+        request = RequestFactory().post('/')
+        selected = Tutorial.objects.filter(pk__in=[self.tutorials[2].pk, self.tutorials[3].pk])
+
+        # Moving the first selected row has no room and rebalances the scope
+        model_admin.move_up(request, selected)
+        self.assertEqual(
+            self.ordered_tutorials(),
+            [self.tutorials[0], self.tutorials[2], self.tutorials[3], self.tutorials[1]]
+        )
+
+        model_admin.move_down(request, selected)
+        self.assertEqual(self.ordered_tutorials(), self.tutorials)
+
+    def test_bulk_reorder_is_one_statement(self):
+        new_order = [self.tutorials[2], self.tutorials[0], self.tutorials[3], self.tutorials[1]]
+        with self.assertNumQueries(3):  # savepoint, update, release
+            Tutorial.bulk_reorder([tutorial.pk for tutorial in new_order])
+        self.assertEqual(self.ordered_tutorials(), new_order)
+
+    def test_bulk_reorder_respects_unique_steps(self):
+        tutorial = self.tutorials[0]
+        steps = [
+            TutorialStep.objects.create(
+                tutorial=tutorial, order=index + 1, name=f'Step {index}', description='Do it'
+            )
+            for index in range(3)
+        ]
+        TutorialStep.bulk_reorder([steps[2].pk, steps[1].pk, steps[0].pk])
+        self.assertEqual(
+            list(tutorial.steps.order_by('order')), [steps[2], steps[1], steps[0]]
+        )
+
+    def test_admin_reorder_endpoint(self):
+        admin_user = get_user_model().objects.create_superuser(
+            username='admin', email='admin@example.com', password='password', email_verified=True
+        )
+        self.client.force_login(admin_user)
+        url = reverse('admin:online_security_tutorial_reorder')
+        new_order = list(reversed(self.tutorials))
+
+        self.assertEqual(self.client.get(url).status_code, 405)
+        response = self.client.post(url, {'ids': [tutorial.pk for tutorial in new_order]})
+        self.assertEqual(response.json(), {'status': 'success', 'updated': 4})
+        self.assertEqual(self.ordered_tutorials(), new_order)
@@ -6,5 +6,6 @@ urlpatterns = [
     path('assessment/', views.security_assessment, name='security_assessment'),
     path('assessment/results/', views.security_assessment_results, name='security_assessment_results'),
     path('browse/', views.security_browse, name='security_browse'),
+    path('browse/facets/', views.security_browse_facets, name='security_browse_facets'),
     path('recommendation/<int:pk>/', views.security_recommendation_detail, name='security_recommendation_detail'),
 ]
@@ -1,8 +1,48 @@
 from django.contrib import messages
 from django.http import JsonResponse
+from django.db.models import Prefetch
 from django.shortcuts import redirect, render, get_object_or_404
-from django.db.models import Q
-from .models import Category, Recommendation, Solution
+from .catalog import get_catalog
+from .facets import FACET_LABELS, FACETS, facet_options, parse_facet_filters, search_catalog
+from .models import PLATFORM_CHOICES, Category, Recommendation, Solution
+from .ranking import BUDGET_CHOICES, BUDGET_LIMITS, EFFORT_CHOICES, EFFORT_LIMITS, rank_solutions
+
+PLATFORM_SESSION_KEY = 'security_platforms'
+RANKING_SESSION_KEY = 'security_ranking'
+
+def get_user_platforms(request):
+    """
+    Return the visitor's declared platforms. An explicit selection in the query
+    string is remembered in the session for the other security pages.
+    """
+    if 'platform_filter' in request.GET or 'platform' in request.GET:
+        valid_platforms = {platform for platform, _ in PLATFORM_CHOICES}
+        platforms = [
+            platform for platform in request.GET.getlist('platform')
+            if platform in valid_platforms
+        ]
+        request.session[PLATFORM_SESSION_KEY] = platforms
+        return platforms
+    return request.session.get(PLATFORM_SESSION_KEY, [])
+
+def get_ranking_preferences(request):
+    """Budget and effort tolerance used to rank solutions, remembered like platforms"""
+    if 'platform_filter' in request.GET:
+        budget = request.GET.get('budget', '')
+        effort = request.GET.get('effort', '')
+        preferences = {
+            'budget': budget if budget in BUDGET_LIMITS else '',
+            'effort': effort if effort in EFFORT_LIMITS else '',
+        }
+        request.session[RANKING_SESSION_KEY] = preferences
+        return preferences
+    return request.session.get(RANKING_SESSION_KEY, {'budget': '', 'effort': ''})
+
+def platform_context(platforms):
+    return {
+        'platform_choices': PLATFORM_CHOICES,
+        'selected_platforms': platforms,
+    }
 
 def security_assessment(request):
     if request.method == 'POST':
@@ -76,10 +116,15 @@ def security_assessment_results(request):
         return JsonResponse({'status': 'error'}, status=400)
     
     # GET request - show results
+    platforms = get_user_platforms(request)
+    preferences = get_ranking_preferences(request)
     results = {
         'needs_action': Recommendation.objects.filter(
             id__in=session_results['needs_action']
-        ).prefetch_related('categories', 'solutions'),
+        ).prefetch_related(
+            'categories',
+            Prefetch('solutions', queryset=Solution.objects.for_platforms(platforms))
+        ),
         'completed': Recommendation.objects.filter(
             id__in=session_results['completed']
         ),
@@ -88,63 +133,95 @@ def security_assessment_results(request):
         )
     }
     
+    # Rank each recommendation's solutions for this visitor
+    catalog = get_catalog()
+    for recommendation in results['needs_action']:
+        recommendation.ranked_solutions = rank_solutions(
+            catalog, recommendation.solutions.all(), platforms=platforms, **preferences
+        )
+
     return render(request, 'online_security/assessment_results.html', {
-        'results': results
+        'results': results,
+        'budget_choices': BUDGET_CHOICES,
+        'effort_choices': EFFORT_CHOICES,
+        'ranking_preferences': preferences,
+        **platform_context(platforms),
     })
 
 def security_browse(request):
-    """Browse security recommendations with filtering"""
-    # Get all filter parameters
+    """Browse security recommendations with faceted filtering"""
     query = request.GET.get('q', '').strip()
-    category_id = request.GET.get('category')
-    severity = request.GET.get('severity')
-
-    # Start with all recommendations
-    recommendations = Recommendation.objects.all()
+    filters = parse_facet_filters(request.GET)
 
-    # Apply filters
-    if query:
-        recommendations = recommendations.filter(
-            Q(name__icontains=query) |
-            Q(description__icontains=query) |
-            Q(solutions__name__icontains=query)
-        ).distinct()
+    # Default the platform facet to the visitor's saved platforms
+    platforms = get_user_platforms(request)
+    if platforms:
+        filters['platform'] = set(platforms)
 
-    if category_id:
-        recommendations = recommendations.filter(categories__id=category_id)
+    catalog = get_catalog()
+    matching_ids, counts = search_catalog(catalog, query, filters)
+    matching = set(matching_ids)
 
-    if severity:
-        recommendations = recommendations.filter(importance=severity)
+    # Render every card so the page can refine client-side without reloading
+    recommendations = []
+    hidden_recommendations = []
+    for recommendation in Recommendation.objects.all():
+        if recommendation.id in matching:
+            recommendations.append(recommendation)
+        else:
+            hidden_recommendations.append(recommendation)
 
-    # Get all categories for the filter dropdown
-    categories = Category.objects.all().order_by('order', 'name')
+    facets = facet_options(catalog, counts, filters)
 
     context = {
         'recommendations': recommendations,
-        'categories': categories,
+        'hidden_recommendations': hidden_recommendations,
+        'facet_groups': [
+            (facet, FACET_LABELS[facet], facets[facet]) for facet in FACETS
+        ],
         # Pass the current filters back to the template
         'current_filters': {
             'query': query,
-            'category': category_id,
-            'severity': severity,
+            **{facet: sorted(values) for facet, values in filters.items()},
         }
     }
 
     return render(request, 'online_security/browse.html', context)
 
+def security_browse_facets(request):
+    """JSON facet counts and matching recommendation ids for client-side refinement"""
+    query = request.GET.get('q', '').strip()
+    filters = parse_facet_filters(request.GET)
+
+    # Same platform default as security_browse, so counts match the page
+    platforms = get_user_platforms(request)
+    if platforms:
+        filters['platform'] = set(platforms)
+
+    catalog = get_catalog()
+    matching_ids, counts = search_catalog(catalog, query, filters)
+
+    return JsonResponse({
+        'count': len(matching_ids),
+        'results': matching_ids,
+        'facets': facet_options(catalog, counts, filters),
+    })
+
 def security_landing(request):
     """Landing page for the security center"""
     return render(request, 'online_security/landing.html')
 
 def security_recommendation_detail(request, pk):
+    platforms = get_user_platforms(request)
     recommendation = get_object_or_404(
         Recommendation.objects.prefetch_related(
             'categories',
-            'solutions'
+            Prefetch('solutions', queryset=Solution.objects.for_platforms(platforms))
         ),
         pk=pk
     )
     
     return render(request, 'online_security/recommendation_detail.html', {
-        'recommendation': recommendation
+        'recommendation': recommendation,
+        **platform_context(platforms),
     })
@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, HashedEmail
+from django.utils import timezone
+from .models import User, HashedEmail, OutboundEmail
+from .services.abuse import invalidate_blocked_hashes
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
@@ -26,26 +28,73 @@ class CustomUserAdmin(UserAdmin):
     # Fields that are read-only
     readonly_fields = ('last_login', 'date_joined')
 
+class AccountCountFilter(admin.SimpleListFilter):
+    title = 'accounts'
+    parameter_name = 'accounts'
+
+    def lookups(self, request, model_admin):
+        return (
+            ('0', 'No accounts'),
+            ('1', 'One account'),
+            ('2', 'Two or more'),
+            ('5', 'Five or more'),
+        )
+
+    def queryset(self, request, queryset):
+        if self.value() in ('0', '1'):
+            return queryset.filter(total_users=int(self.value()))
+        if self.value() in ('2', '5'):
+            return queryset.filter(total_users__gte=int(self.value()))
+        return queryset
+
 @admin.register(HashedEmail)
 class HashedEmailAdmin(admin.ModelAdmin):
     list_display = ('email_hash', 'first_used', 'last_used', 'total_users',
                    'active_users', 'is_blocked')
-    list_filter = ('is_blocked', 'first_used', 'last_used')
+    list_filter = ('is_blocked', AccountCountFilter, 'first_used', 'last_used')
     search_fields = ('email_hash',)
     actions = ['block_selected_hashes', 'unblock_selected_hashes']
 
+    def get_queryset(self, request):
+        # Counts come from one annotated query instead of two per row
+        return super().get_queryset(request).with_user_counts()
+
     def total_users(self, obj):
-        return obj.get_total_users_count()
+        return obj.total_users
     total_users.short_description = 'Total Users'
+    total_users.admin_order_field = 'total_users'
 
     def active_users(self, obj):
-        return obj.get_active_users_count()
+        return obj.active_users
     active_users.short_description = 'Active Users (30d)'
+    active_users.admin_order_field = 'active_users'
 
     def block_selected_hashes(self, request, queryset):
         queryset.update(is_blocked=True)
+        # update() skips model signals, so refresh the blocked-hash cache here
+        invalidate_blocked_hashes()
     block_selected_hashes.short_description = "Block selected email hashes"
 
     def unblock_selected_hashes(self, request, queryset):
         queryset.update(is_blocked=False)
-    unblock_selected_hashes.short_description = "Unblock selected email hashes"
\ No newline at end of file
+        invalidate_blocked_hashes()
+    unblock_selected_hashes.short_description = "Unblock selected email hashes"
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('to_email', 'subject')
+    readonly_fields = ('message_id', 'created_at', 'sent_at', 'last_error')
+    actions = ['retry_selected_emails']
+
+    def retry_selected_emails(self, request, queryset):
+        # Sent and failed emails have had their address and body cleared
+        queryset.filter(
+            status__in=[OutboundEmail.STATUS_PENDING, OutboundEmail.STATUS_SENDING]
+        ).update(
+            status=OutboundEmail.STATUS_PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now()
+        )
+    retry_selected_emails.short_description = "Retry selected emails now"
\ No newline at end of file
@@ -3,6 +3,7 @@ from django.conf import settings
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth import get_user_model
 from .models import User, HashedEmail
+from .services.abuse import account_count, is_hash_blocked
 import re
 
 User = get_user_model()
@@ -78,24 +79,22 @@ class SignupForm(UserCreationForm):
 
     def clean_email(self):
         email = self.cleaned_data.get('email').lower().strip()
+
+        # Abuse checks come first and are answered from memory, so a spam wave
+        # against a blocked address never reaches the database
+        email_hash = HashedEmail.hash_email(email)
+        if is_hash_blocked(email_hash):
+            raise forms.ValidationError(
+                "This email address cannot be used for registration. Please contact support if you think this is an error."
+            )
+
+        # Optional: Check for suspicious activity
+        if account_count(email_hash) >= settings.MAX_ACCOUNTS_PER_EMAIL:
+            raise forms.ValidationError(
+                "Maximum number of accounts for this email has been reached."
+            )
+
         if User.objects.filter(email=email).exists():
             raise forms.ValidationError("This email is already registered.")
-        
-        # Check if the email hash is blocked
-        email_hash = HashedEmail.hash_email(email)
-        try:
-            hashed_email = HashedEmail.objects.get(email_hash=email_hash)
-            if hashed_email.is_blocked:
-                raise forms.ValidationError(
-                    "This email address cannot be used for registration. Please contact support if you think this is an error."
-                )
-            
-            # Optional: Check for suspicious activity
-            if hashed_email.get_total_users_count() >= settings.MAX_ACCOUNTS_PER_EMAIL:
-                raise forms.ValidationError(
-                    "Maximum number of accounts for this email has been reached."
-                )
-        except HashedEmail.DoesNotExist:
-            pass
-        
+
         return email
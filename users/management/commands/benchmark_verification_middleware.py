@@ -0,0 +1,50 @@
+# users/management/commands/benchmark_verification_middleware.py
+import timeit
+from django.contrib.auth import SESSION_KEY
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+from users.middleware import VERIFIED_SESSION_KEY, EmailVerificationMiddleware
+from users.models import User
+
+class Command(BaseCommand):
+    help = 'Measure the per-request overhead of EmailVerificationMiddleware'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100000,
+                            help='Requests to time per scenario')
+
+    def build_request(self, path, session, user):
+        request = RequestFactory().get(path)
+        # Session data is kept in memory so the timing isolates the middleware
+        request.session = session
+        request.user = user
+        return request
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        response = HttpResponse()
+
+        def get_response(request):
+            return response
+
+        middleware = EmailVerificationMiddleware(get_response)
+        allowed_path = middleware.get_allowed_paths()[1]
+        scenarios = [
+            ('anonymous', self.build_request('/', {}, AnonymousUser())),
+            ('verified (session flag)', self.build_request(
+                '/', {SESSION_KEY: '1', VERIFIED_SESSION_KEY: True}, User(email_verified=True)
+            )),
+            ('unverified, allowed path', self.build_request(
+                allowed_path, {SESSION_KEY: '1'}, User(email_verified=False)
+            )),
+        ]
+
+        baseline = timeit.timeit(
+            lambda: get_response(scenarios[0][1]), number=iterations
+        ) / iterations
+        self.stdout.write(f"{iterations} requests per scenario, overhead over calling the view directly:")
+        for name, request in scenarios:
+            elapsed = timeit.timeit(lambda: middleware(request), number=iterations) / iterations
+            self.stdout.write(f"  {name:<28} {(elapsed - baseline) * 1e9:8.0f} ns/request")
@@ -0,0 +1,18 @@
+# users/management/commands/clear_expired_sessions.py
+from django.core.management.base import BaseCommand
+from users.sessions import SessionStore
+
+class Command(BaseCommand):
+    help = 'Delete expired database sessions in small batches (run on a schedule)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Sessions deleted per transaction (defaults to SESSION_CLEANUP_BATCH_SIZE)')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        deleted = SessionStore.clear_expired(
+            batch_size=options['batch_size'], pause=options['pause']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired sessions'))
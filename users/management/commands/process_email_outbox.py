@@ -0,0 +1,44 @@
+# users/management/commands/process_email_outbox.py
+import logging
+import time
+from django.core.management.base import BaseCommand
+from users.services.mail import metrics
+from users.services.outbox import process_outbox
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Deliver queued emails from the outbox, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Emails to claim per batch (defaults to EMAIL_OUTBOX_BATCH_SIZE)')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling the outbox instead of exiting when it is empty')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds to sleep between polls of an empty outbox')
+
+    def handle(self, *args, **options):
+        totals = {'sent': 0, 'pending': 0, 'failed': 0}
+        try:
+            while True:
+                results = process_outbox(batch_size=options['batch_size'])
+                for status, count in results.items():
+                    totals[status] += count
+                if not any(results.values()):
+                    if not options['loop']:
+                        break
+                    time.sleep(options['interval'])
+                elif options['loop']:
+                    logger.info(f"Mail transport metrics: {metrics.snapshot()}")
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Outbox: {totals['sent']} sent, {totals['pending']} retrying, {totals['failed']} failed"
+        ))
+        snapshot = metrics.snapshot()
+        self.stdout.write(
+            f"Transport: {snapshot['requests']} requests, {snapshot['errors']} errors, "
+            f"{snapshot['avg_latency_ms']}ms avg, {snapshot['max_latency_ms']}ms max"
+        )
@@ -0,0 +1,59 @@
+# users/management/commands/rotate_recovery_keys.py
+from cryptography.fernet import InvalidToken
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from users.models import RecoveryKey
+from users.services.keys import rotate_encrypted_key
+
+class Command(BaseCommand):
+    help = 'Re-encrypt all recovery keys with the current RECOVERY_KEY_ENCRYPTION_KEY'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows read and updated per batch')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would be rotated without writing')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        rotated = current = failed = 0
+        last_pk = 0
+
+        # Keyset pagination over the primary key: each batch is one indexed
+        # range read and one bulk UPDATE in its own short transaction, so only
+        # the rows in the current batch are ever locked
+        while True:
+            batch = list(
+                RecoveryKey.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .only('pk', 'encrypted_key')[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            changed = []
+            for recovery_key in batch:
+                try:
+                    encrypted_key = rotate_encrypted_key(recovery_key.encrypted_key)
+                except (InvalidToken, ValueError):
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(
+                        f'Recovery key {recovery_key.pk} could not be decrypted with any configured key'
+                    ))
+                    continue
+                if encrypted_key is None:
+                    current += 1
+                    continue
+                recovery_key.encrypted_key = encrypted_key
+                changed.append(recovery_key)
+
+            rotated += len(changed)
+            if changed and not options['dry_run']:
+                with transaction.atomic():
+                    RecoveryKey.objects.bulk_update(changed, ['encrypted_key'])
+
+        action = 'would be rotated' if options['dry_run'] else 'rotated'
+        self.stdout.write(self.style.SUCCESS(
+            f'Recovery keys: {rotated} {action}, {current} already current, {failed} failed'
+        ))
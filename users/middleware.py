@@ -1,24 +1,47 @@
+from django.contrib.auth import SESSION_KEY
 from django.shortcuts import redirect
 from django.contrib import messages
 from django.urls import reverse
 
+# Set at login (see users/signals.py) for users who may skip the check, so
+# the middleware doesn't need to load the user on every request
+VERIFIED_SESSION_KEY = '_email_verified'
+
+ALLOWED_URL_NAMES = (
+    'users:logout',
+    'users:verification_sent',
+    'users:resend_verification',
+)
+
 class EmailVerificationMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
+        self.allowed_paths = None
+
+    def get_allowed_paths(self):
+        # Resolved on the first request rather than in __init__ so the
+        # script prefix is known; str.startswith() takes the whole tuple
+        if self.allowed_paths is None:
+            self.allowed_paths = tuple(reverse(name) for name in ALLOWED_URL_NAMES)
+        return self.allowed_paths
 
     def __call__(self, request):
-        if request.user.is_authenticated and not request.user.email_verified:
-            # Allow superusers to bypass verification
-            if request.user.is_superuser:
-                return self.get_response(request)
-            
-            # Allow access to logout and verification endpoints
-            allowed_paths = [
-                reverse('users:logout'),
-                reverse('users:verification_sent'),
-                reverse('users:resend_verification'),
-            ]
-            if not any(request.path.startswith(path) for path in allowed_paths):
-                messages.warning(request, 'Please verify your email to access this page.')
-                return redirect('users:verification_sent')
-        return self.get_response(request)
\ No newline at end of file
+        session = request.session
+        # Anonymous visitors and users already known to be verified need no further work
+        if SESSION_KEY not in session or session.get(VERIFIED_SESSION_KEY):
+            return self.get_response(request)
+
+        user = request.user
+        if not user.is_authenticated:
+            return self.get_response(request)
+
+        # Allow superusers to bypass verification
+        if user.email_verified or user.is_superuser:
+            session[VERIFIED_SESSION_KEY] = True
+            return self.get_response(request)
+
+        # Allow access to logout and verification endpoints
+        if not request.path.startswith(self.get_allowed_paths()):
+            messages.warning(request, 'Please verify your email to access this page.')
+            return redirect('users:verification_sent')
+        return self.get_response(request)
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.3 on 2026-10-19 05:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0008_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('verification_token', ''), _negated=True), fields=['verification_token'], name='user_verification_token_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('email_verified', False)), fields=['date_joined'], name='user_unverified_joined_idx'),
+        ),
+    ]
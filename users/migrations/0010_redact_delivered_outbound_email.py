@@ -0,0 +1,35 @@
+# Generated by Django 5.1.3 on 2026-10-19 06:09
+
+from django.db import migrations, models
+
+
+def redact_finished_emails(apps, schema_editor):
+    """
+    Clear the address and bodies of emails already sent or given up on, as
+    the outbox now does when they finish
+    """
+    OutboundEmail = apps.get_model('users', 'OutboundEmail')
+    OutboundEmail.objects.filter(status__in=['sent', 'failed']).update(
+        to_email='', html_content='', text_content='',
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_user_token_and_unverified_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboundemail',
+            name='html_content',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name='outboundemail',
+            name='to_email',
+            field=models.EmailField(blank=True, max_length=254),
+        ),
+        migrations.RunPython(redact_finished_emails, migrations.RunPython.noop),
+    ]
@@ -4,12 +4,13 @@ from django.core.exceptions import ValidationError
 from django.core.validators import MinLengthValidator, RegexValidator
 from django.db import models
 from django.utils import timezone
-from cryptography.fernet import Fernet
 from django.conf import settings
 import base64
 import hashlib
 import re
 import secrets
+from .services.activity import touch
+from .services.keys import get_keyring
 
 def validate_username_characters(value):
     """Custom validator to ensure username only contains allowed characters"""
@@ -18,6 +19,20 @@ def validate_username_characters(value):
             'Username may only contain letters, numbers, underscores, and hyphens.'
         )
 
+class HashedEmailQuerySet(models.QuerySet):
+    def with_user_counts(self, days=30):
+        """
+        Annotate total_users and active_users (logged in within the last N
+        days) in the same query, for listing many hashes at once
+        """
+        cutoff = timezone.now() - timezone.timedelta(days=days)
+        return self.annotate(
+            total_users=models.Count('users'),
+            active_users=models.Count(
+                'users', filter=models.Q(users__last_login__gte=cutoff)
+            ),
+        )
+
 class HashedEmail(models.Model):
     """
     Stores hashed email addresses to prevent abuse while maintaining privacy
@@ -26,6 +41,8 @@ class HashedEmail(models.Model):
     first_used = models.DateTimeField(auto_now_add=True)
     last_used = models.DateTimeField(auto_now_add=True)
     is_blocked = models.BooleanField(default=False)
+
+    objects = HashedEmailQuerySet.as_manager()
     
     @staticmethod
     def hash_email(email):
@@ -48,8 +65,8 @@ class HashedEmail(models.Model):
             defaults={'last_used': timezone.now()}
         )
         if not created:
-            hashed_email.last_used = timezone.now()
-            hashed_email.save()
+            # Throttled and batched, see users/services/activity.py
+            touch(hashed_email, 'last_used')
         return hashed_email
     
     def get_active_users_count(self, days=30):
@@ -97,12 +114,28 @@ class User(AbstractUser):
         related_name='users'
     )
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Token lookups in verify_email; most rows have no token
+            models.Index(
+                fields=['verification_token'],
+                name='user_verification_token_idx',
+                condition=~models.Q(verification_token=''),
+            ),
+            # Finding stale unverified accounts (delete_unverified_users)
+            models.Index(
+                fields=['date_joined'],
+                name='user_unverified_joined_idx',
+                condition=models.Q(email_verified=False),
+            ),
+        ]
+
     def update_last_login(self):
         """
-        Update the last login timestamp
+        Update the last login timestamp, skipping the write if it was
+        already updated within ACTIVITY_TIMESTAMP_GRANULARITY
         """
-        self.last_login = timezone.now()
-        self.save(update_fields=['last_login'])
+        return touch(self, 'last_login')
 
 class RecoveryKey(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -118,13 +151,8 @@ class RecoveryKey(models.Model):
 
     @staticmethod
     def get_encryption_key():
-        if not hasattr(settings, 'RECOVERY_KEY_ENCRYPTION_KEY'):
-            key = Fernet.generate_key()
-            with open('recovery_key.key', 'wb') as key_file:
-                key_file.write(key)
-        else:
-            key = settings.RECOVERY_KEY_ENCRYPTION_KEY
-        return Fernet(key)
+        """The process-wide keyring (see users/services/keys.py)"""
+        return get_keyring()
 
     def encrypt_recovery_key(self, recovery_key):
         f = self.get_encryption_key()
@@ -141,4 +169,43 @@ class RecoveryKey(models.Model):
             stored_key = stored_key_with_salt[:-len(self.key_salt)]
             return secrets.compare_digest(provided_key, stored_key)
         except Exception:
-            return False
\ No newline at end of file
+            return False
+class OutboundEmail(models.Model):
+    """
+    Durable outbox for transactional email. Rows are written in the same
+    transaction as the change that triggers them and delivered later by the
+    process_email_outbox worker.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    # Blanked once the email is sent or has failed (see services/outbox.py)
+    to_email = models.EmailField(blank=True)
+    subject = models.CharField(max_length=255)
+    html_content = models.TextField(blank=True)
+    text_content = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    # When the row is next due; while sending this doubles as the claim lease
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    message_id = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to_email or '[redacted]'} ({self.status})"
@@ -0,0 +1,70 @@
+# users/services/abuse.py
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from users.models import HashedEmail, User
+
+BLOCKED_HASHES_CACHE_KEY = 'users:blocked_email_hashes'
+
+_lock = threading.Lock()
+_local_blocked = None
+_local_loaded_at = 0.0
+
+def _load_blocked():
+    rows = list(HashedEmail.objects.filter(is_blocked=True).values_list('id', 'email_hash'))
+    return (
+        frozenset(email_hash for _, email_hash in rows),
+        frozenset(pk for pk, _ in rows),
+    )
+
+def get_blocked():
+    """
+    Return (blocked email hashes, blocked HashedEmail ids).
+
+    Blocked addresses are a small, exact list, so plain frozensets are used
+    rather than a Bloom filter and a hit never needs a database check. Each
+    worker keeps its own copy for BLOCKED_HASHES_LOCAL_TTL seconds; with
+    BLOCKED_HASHES_SHARED_CACHE the sets are also shared through the Django
+    cache so workers don't each rebuild them from the database.
+    """
+    global _local_blocked, _local_loaded_at
+
+    now = time.monotonic()
+    with _lock:
+        if _local_blocked is not None and now - _local_loaded_at < settings.BLOCKED_HASHES_LOCAL_TTL:
+            return _local_blocked
+
+    blocked = cache.get(BLOCKED_HASHES_CACHE_KEY) if settings.BLOCKED_HASHES_SHARED_CACHE else None
+    if blocked is None:
+        blocked = _load_blocked()
+        if settings.BLOCKED_HASHES_SHARED_CACHE:
+            cache.set(BLOCKED_HASHES_CACHE_KEY, blocked, settings.EMAIL_HASH_CACHE_TIMEOUT)
+
+    with _lock:
+        _local_blocked, _local_loaded_at = blocked, now
+    return blocked
+
+def is_hash_blocked(email_hash):
+    return email_hash in get_blocked()[0]
+
+def is_hashed_email_blocked(hashed_email_id):
+    return hashed_email_id is not None and hashed_email_id in get_blocked()[1]
+
+def invalidate_blocked_hashes():
+    """
+    Drop this worker's copy and the shared copy. Other workers pick up the
+    change when their local copy expires.
+    """
+    global _local_blocked
+    with _lock:
+        _local_blocked = None
+    cache.delete(BLOCKED_HASHES_CACHE_KEY)
+
+def account_count(email_hash):
+    """
+    Number of accounts linked to an email hash. Read from the database every
+    time, one indexed COUNT: a cached count would let signups spread across
+    workers get past MAX_ACCOUNTS_PER_EMAIL.
+    """
+    return User.objects.filter(hashed_email__email_hash=email_hash).count()
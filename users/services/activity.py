@@ -0,0 +1,84 @@
+# users/services/activity.py
+import logging
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Case, Value, When
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+# (model, field) -> {pk: timestamp}
+_pending = {}
+_oldest_pending = None
+
+def is_stale(value, now=None):
+    """
+    Whether a stored timestamp is older than ACTIVITY_TIMESTAMP_GRANULARITY
+    and therefore worth writing again
+    """
+    now = now or timezone.now()
+    return value is None or now - value >= timedelta(seconds=settings.ACTIVITY_TIMESTAMP_GRANULARITY)
+
+def touch(instance, field, now=None):
+    """
+    Bump an activity timestamp such as User.last_login.
+
+    Writes within the granularity of the stored value are skipped. Others
+    update the instance straight away but are buffered and written in bulk
+    once ACTIVITY_FLUSH_BATCH timestamps are pending or the oldest has waited
+    ACTIVITY_FLUSH_INTERVAL seconds (and at the end of every request).
+    Returns True if a write was queued.
+    """
+    global _oldest_pending
+
+    now = now or timezone.now()
+    if not is_stale(getattr(instance, field), now):
+        return False
+    setattr(instance, field, now)
+
+    with _lock:
+        _pending.setdefault((type(instance), field), {})[instance.pk] = now
+        if _oldest_pending is None:
+            _oldest_pending = time.monotonic()
+        due = (
+            sum(len(values) for values in _pending.values()) >= settings.ACTIVITY_FLUSH_BATCH
+            or time.monotonic() - _oldest_pending >= settings.ACTIVITY_FLUSH_INTERVAL
+        )
+    if due:
+        flush()
+    return True
+
+def flush():
+    """
+    Write all buffered timestamps, one UPDATE per model and field.
+    Returns the number of rows updated.
+    """
+    global _pending, _oldest_pending
+
+    with _lock:
+        pending, _pending = _pending, {}
+        _oldest_pending = None
+
+    updated = 0
+    for (model, field), values in pending.items():
+        updated += model.objects.filter(pk__in=values).update(**{
+            field: Case(
+                *[When(pk=pk, then=Value(timestamp)) for pk, timestamp in values.items()],
+                output_field=model._meta.get_field(field)
+            )
+        })
+    return updated
+
+def flush_quietly(**kwargs):
+    """
+    request_finished receiver; a failed flush must never break a response
+    """
+    if not _pending:
+        return
+    try:
+        flush()
+    except Exception as e:
+        logger.error(f"Failed to flush activity timestamps: {str(e)}", exc_info=True)
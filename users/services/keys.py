@@ -0,0 +1,59 @@
+# users/services/keys.py
+import base64
+from functools import lru_cache
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+KEY_SETTINGS = ('RECOVERY_KEY_ENCRYPTION_KEY', 'RECOVERY_KEY_PREVIOUS_KEYS')
+
+def _as_bytes(key):
+    return key.encode() if isinstance(key, str) else key
+
+@lru_cache(maxsize=None)
+def get_primary_key():
+    """
+    Fernet for the current key, used to check whether a token needs rotating
+    """
+    key = getattr(settings, 'RECOVERY_KEY_ENCRYPTION_KEY', None)
+    if not key:
+        raise ImproperlyConfigured('RECOVERY_KEY_ENCRYPTION_KEY must be set.')
+    return Fernet(_as_bytes(key))
+
+@lru_cache(maxsize=None)
+def get_keyring():
+    """
+    Keyring for recovery key encryption, built once per process.
+
+    New tokens are always encrypted with RECOVERY_KEY_ENCRYPTION_KEY. Tokens
+    encrypted with any of RECOVERY_KEY_PREVIOUS_KEYS still decrypt, so a key
+    can be rotated by moving it to the previous keys and running the
+    rotate_recovery_keys command.
+    """
+    previous = getattr(settings, 'RECOVERY_KEY_PREVIOUS_KEYS', ())
+    return MultiFernet([get_primary_key()] + [Fernet(_as_bytes(key)) for key in previous if key])
+
+def rotate_encrypted_key(encrypted_key):
+    """
+    Re-encrypt a stored RecoveryKey.encrypted_key with the current key.
+    Returns None if it already uses the current key. Raises InvalidToken if
+    no key in the keyring can decrypt it.
+    """
+    token = base64.b64decode(encrypted_key)
+    try:
+        get_primary_key().decrypt(token)
+        return None
+    except InvalidToken:
+        pass
+    return base64.b64encode(get_keyring().rotate(token)).decode()
+
+def reset_keyring():
+    get_primary_key.cache_clear()
+    get_keyring.cache_clear()
+
+@receiver(setting_changed)
+def keys_setting_changed(setting, **kwargs):
+    if setting in KEY_SETTINGS:
+        reset_keyring()
@@ -1,71 +1,325 @@
 # users/services/mail.py
 import logging
+import threading
+import time
+from functools import lru_cache
 import mailtrap as mt
+import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
-from django.template.loader import render_to_string
+from django.db import transaction
+from django.template.loader import get_template
 from django.utils.html import strip_tags
-from django.core.mail import send_mail as django_send_mail
+from django.utils.module_loading import import_string
+from django.core.mail import EmailMultiAlternatives, get_connection
+from users.models import OutboundEmail
 
 logger = logging.getLogger(__name__)
 
-class EmailService:
+CONSOLE_EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+class TransportMetrics:
+    """
+    Process-wide counters for provider requests: latency per request and the
+    number of emails sent or failed
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.errors = 0
+            self.sent = 0
+            self.failed = 0
+            self.total_latency = 0.0
+            self.max_latency = 0.0
+
+    def record_request(self, latency, error=False):
+        with self._lock:
+            self.requests += 1
+            self.errors += int(error)
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def record_results(self, sent=0, failed=0):
+        with self._lock:
+            self.sent += sent
+            self.failed += failed
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'sent': self.sent,
+                'failed': self.failed,
+                'avg_latency_ms': round(self.total_latency / self.requests * 1000, 1) if self.requests else 0.0,
+                'max_latency_ms': round(self.max_latency * 1000, 1),
+            }
+
+metrics = TransportMetrics()
+
+class BaseTransport:
+    """
+    Messages passed to send_batch are any objects with to_email, subject,
+    html_content and text_content attributes, such as OutboundEmail rows
+    """
+    def send(self, to_email, subject, html_content, text_content):
+        raise NotImplementedError
+
+    def send_batch(self, messages):
+        """
+        Send several messages, returning one result per message in order:
+        the provider message id, or the exception that message failed with
+        """
+        results = []
+        for message in messages:
+            try:
+                results.append(self.send(
+                    message.to_email, message.subject, message.html_content, message.text_content
+                ))
+            except Exception as e:
+                results.append(e)
+        return results
+
+class MailtrapTransport(BaseTransport):
+    """
+    Deliver email through the Mailtrap sending API over a pooled keep-alive
+    session, so sends after the first skip the TCP and TLS handshake
+    """
+    SEND_PATH = '/api/send'
+    BATCH_PATH = '/api/batch'
+    MAX_BATCH_SIZE = 500  # provider limit per batch request
+
     def __init__(self):
-        self.is_local = settings.EMAIL_BACKEND == 'django.core.mail.backends.console.EmailBackend'
-        if not self.is_local:
-            self.client = mt.MailtrapClient(token=settings.MAILTRAP_API_TOKEN)
-            self.sender = mt.Address(
-                email=settings.MAILTRAP_SENDER_EMAIL,
-                name="MyBlueList"
+        self.client = mt.MailtrapClient(token=settings.MAILTRAP_API_TOKEN)
+        self.sender = mt.Address(
+            email=settings.MAILTRAP_SENDER_EMAIL,
+            name="MyBlueList"
+        )
+        self.session = requests.Session()
+        self.session.headers.update(self.client.headers)
+        self.session.mount('https://', HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=settings.MAILTRAP_POOL_SIZE
+        ))
+
+    def _mail_data(self, to_email, subject, html_content, text_content):
+        return mt.Mail(
+            sender=self.sender,
+            to=[mt.Address(email=to_email)],
+            subject=subject,
+            html=html_content,
+            text=text_content
+        ).api_data
+
+    def _post(self, path, payload):
+        started = time.perf_counter()
+        try:
+            response = self.session.post(
+                f"{self.client.base_url}{path}",
+                json=payload,
+                timeout=settings.MAILTRAP_TIMEOUT
+            )
+            if not response.ok:
+                self.client._handle_failed_response(response)
+            data = response.json()
+        except Exception:
+            metrics.record_request(time.perf_counter() - started, error=True)
+            raise
+        metrics.record_request(time.perf_counter() - started)
+        return data
+
+    def send(self, to_email, subject, html_content, text_content):
+        try:
+            data = self._post(
+                self.SEND_PATH, self._mail_data(to_email, subject, html_content, text_content)
             )
+        except Exception:
+            metrics.record_results(failed=1)
+            raise
+        metrics.record_results(sent=1)
+        message_ids = data.get('message_ids')
+        return message_ids[0] if message_ids else ''
+
+    def send_batch(self, messages):
+        """
+        Send messages through the batch endpoint, up to MAX_BATCH_SIZE per request
+        """
+        messages = list(messages)
+        results = []
+        for start in range(0, len(messages), self.MAX_BATCH_SIZE):
+            chunk = messages[start:start + self.MAX_BATCH_SIZE]
+            batch_requests = []
+            for message in chunk:
+                data = self._mail_data(
+                    message.to_email, message.subject, message.html_content, message.text_content
+                )
+                data.pop('from')
+                batch_requests.append(data)
+
+            try:
+                data = self._post(self.BATCH_PATH, {
+                    'base': {'from': self.sender.api_data},
+                    'requests': batch_requests,
+                })
+            except Exception as e:
+                metrics.record_results(failed=len(chunk))
+                results.extend([e] * len(chunk))
+                continue
+
+            responses = data.get('responses', [])
+            for index in range(len(chunk)):
+                response = responses[index] if index < len(responses) else {}
+                if response.get('success'):
+                    message_ids = response.get('message_ids')
+                    results.append(message_ids[0] if message_ids else '')
+                else:
+                    results.append(mt.MailtrapError('; '.join(response.get('errors') or ['No response for message'])))
+            failed = sum(isinstance(result, Exception) for result in results[start:])
+            metrics.record_results(sent=len(chunk) - failed, failed=failed)
+        return results
+
+class DjangoMailTransport(BaseTransport):
+    """
+    Local stand-in transport that hands email to Django's EMAIL_BACKEND
+    (console in development, locmem in tests)
+    """
+    def _message(self, to_email, subject, html_content, text_content, connection=None):
+        message = EmailMultiAlternatives(
+            subject=subject,
+            body=text_content,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[to_email],
+            connection=connection
+        )
+        message.attach_alternative(html_content, 'text/html')
+        return message
+
+    def send(self, to_email, subject, html_content, text_content):
+        started = time.perf_counter()
+        try:
+            self._message(to_email, subject, html_content, text_content).send()
+        except Exception:
+            metrics.record_request(time.perf_counter() - started, error=True)
+            metrics.record_results(failed=1)
+            raise
+        metrics.record_request(time.perf_counter() - started)
+        metrics.record_results(sent=1)
+        logger.info(f"[LOCAL] Email would be sent to {to_email}")
+        return ''
+
+    def send_batch(self, messages):
+        # One backend connection is reused for the whole batch
+        started = time.perf_counter()
+        results = []
+        with get_connection() as connection:
+            for message in messages:
+                try:
+                    self._message(
+                        message.to_email, message.subject, message.html_content,
+                        message.text_content, connection=connection
+                    ).send()
+                    logger.info(f"[LOCAL] Email would be sent to {message.to_email}")
+                    results.append('')
+                except Exception as e:
+                    results.append(e)
+        failed = sum(isinstance(result, Exception) for result in results)
+        metrics.record_request(time.perf_counter() - started, error=bool(failed))
+        metrics.record_results(sent=len(results) - failed, failed=failed)
+        return results
+
+def get_transport():
+    """
+    Build the transport named by EMAIL_TRANSPORT, falling back to the local
+    transport when the console backend is configured and Mailtrap otherwise
+    """
+    transport_path = getattr(settings, 'EMAIL_TRANSPORT', None)
+    if transport_path:
+        return import_string(transport_path)()
+    if settings.EMAIL_BACKEND == CONSOLE_EMAIL_BACKEND:
+        return DjangoMailTransport()
+    return MailtrapTransport()
+
+@lru_cache(maxsize=None)
+def compiled_template(template_name):
+    """
+    Load and compile an email template once per process
+    """
+    return get_template(template_name)
+
+class EmailService:
+    VERIFICATION_SUBJECT = "Verify your MyBlueList account"
+    VERIFICATION_TEMPLATES = (
+        'users/emails/verification_email.html',
+        'users/emails/verification_email.txt',
+    )
+
+    def __init__(self, transport=None):
+        self._transport = transport
+
+    @property
+    def transport(self):
+        # Built lazily so importing the views doesn't open a connection pool
+        if self._transport is None:
+            self._transport = get_transport()
+        return self._transport
 
     def send_email(self, to_email, subject, html_content, text_content=None):
         """
-        Send an email using either Mailtrap API or console backend
+        Send an email immediately through the configured transport
         """
         try:
             if text_content is None:
                 text_content = strip_tags(html_content)
-
-            if self.is_local:
-                # Use Django's send_mail for local development
-                django_send_mail(
-                    subject=subject,
-                    message=text_content,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[to_email],
-                    html_message=html_content
-                )
-                logger.info(f"[LOCAL] Email would be sent to {to_email}")
-                return True, None
-            else:
-                # Use Mailtrap for production
-                mail = mt.Mail(
-                    sender=self.sender,
-                    to=[mt.Address(email=to_email)],
-                    subject=subject,
-                    html=html_content,
-                    text=text_content
-                )
-                response = self.client.send(mail)
-                logger.info(f"Email sent successfully to {to_email}.")
-                return True, None
-
+            message_id = self.transport.send(to_email, subject, html_content, text_content)
+            logger.info(f"Email sent successfully to {to_email}.")
+            return True, message_id
         except Exception as e:
             logger.error(f"Failed to send email to {to_email}: {str(e)}", exc_info=True)
             return False, None
 
-    def send_verification_email(self, user, verification_url):
+    def queue_email(self, to_email, subject, html_content, text_content=None):
         """
-        Send account verification email
+        Add an email to the outbox for the background worker to deliver.
+        Call inside the transaction that creates the data the email refers
+        to, so the email is only sent if that transaction commits.
+        """
+        if text_content is None:
+            text_content = strip_tags(html_content)
+        return OutboundEmail.objects.create(
+            to_email=to_email,
+            subject=subject,
+            html_content=html_content,
+            text_content=text_content
+        )
+
+    def render_verification_email(self, user, verification_url):
+        """
+        Render the (html, text) bodies of the verification email
         """
-        subject = "Verify your MyBlueList account"
-        
         context = {
             'user': user,
             'verification_url': verification_url
         }
-        
-        html_content = render_to_string('users/emails/verification_email.html', context)
-        text_content = render_to_string('users/emails/verification_email.txt', context)
-        
-        return self.send_email(user.email, subject, html_content, text_content)
\ No newline at end of file
+        html_template, text_template = (
+            compiled_template(name) for name in self.VERIFICATION_TEMPLATES
+        )
+        return html_template.render(context), text_template.render(context)
+
+    def send_verification_email(self, user, verification_url):
+        """
+        Queue the account verification email
+        """
+        html_content, text_content = self.render_verification_email(user, verification_url)
+
+        try:
+            # Savepoint so a failed insert doesn't break the caller's transaction
+            with transaction.atomic():
+                outbound = self.queue_email(user.email, self.VERIFICATION_SUBJECT, html_content, text_content)
+        except Exception as e:
+            logger.error(f"Failed to queue email to {user.email}: {str(e)}", exc_info=True)
+            return False, None
+        return True, outbound.pk
@@ -0,0 +1,110 @@
+# users/services/outbox.py
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from users.models import OutboundEmail
+from .mail import EmailService
+
+logger = logging.getLogger(__name__)
+
+def retry_delay(attempts):
+    """
+    Exponential backoff: EMAIL_OUTBOX_RETRY_DELAY seconds after the first
+    failure, doubling per attempt up to EMAIL_OUTBOX_MAX_RETRY_DELAY
+    """
+    delay = settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(delay, settings.EMAIL_OUTBOX_MAX_RETRY_DELAY))
+
+def claim_batch(batch_size):
+    """
+    Claim up to batch_size due emails for this worker.
+
+    Rows are locked with SKIP LOCKED so concurrent workers never claim the same
+    email, then marked as sending with a lease. If a worker dies mid-batch the
+    lease expires and the rows become due again.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                status__in=[OutboundEmail.STATUS_PENDING, OutboundEmail.STATUS_SENDING],
+                next_attempt_at__lte=now
+            )
+            .order_by('next_attempt_at', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        OutboundEmail.objects.filter(id__in=ids).update(
+            status=OutboundEmail.STATUS_SENDING,
+            attempts=F('attempts') + 1,
+            next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE)
+        )
+    return list(OutboundEmail.objects.filter(id__in=ids).order_by('next_attempt_at', 'id'))
+
+# Cleared once an email is sent or given up on: the address is the personal
+# data the app promises to purge, and bodies carry verification tokens
+REDACTED_FIELDS = ['to_email', 'html_content', 'text_content']
+
+def redact(outbound):
+    for field in REDACTED_FIELDS:
+        setattr(outbound, field, '')
+    return REDACTED_FIELDS
+
+def record_result(outbound, result):
+    """
+    Record the outcome of sending one claimed email, where result is the
+    provider message id or the exception the send failed with. Returns the
+    new status. Sent and failed emails keep only their subject and delivery
+    metadata.
+    """
+    if isinstance(result, Exception):
+        outbound.last_error = str(result)
+        if outbound.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            outbound.status = OutboundEmail.STATUS_FAILED
+            logger.error(f"Giving up on email {outbound.pk} after {outbound.attempts} attempts: {result}")
+            outbound.save(update_fields=['status', 'last_error', *redact(outbound)])
+        else:
+            outbound.status = OutboundEmail.STATUS_PENDING
+            outbound.next_attempt_at = timezone.now() + retry_delay(outbound.attempts)
+            logger.warning(f"Email {outbound.pk} failed (attempt {outbound.attempts}), retrying: {result}")
+            outbound.save(update_fields=['status', 'next_attempt_at', 'last_error'])
+        return outbound.status
+
+    outbound.status = OutboundEmail.STATUS_SENT
+    outbound.message_id = result or ''
+    outbound.sent_at = timezone.now()
+    outbound.last_error = ''
+    outbound.save(update_fields=['status', 'message_id', 'sent_at', 'last_error', *redact(outbound)])
+    logger.info(f"Email {outbound.pk} sent successfully.")
+    return outbound.status
+
+def process_outbox(batch_size=None, email_service=None):
+    """
+    Deliver one batch of due emails with a single transport batch call.
+    Returns a dict counting each outcome.
+    """
+    email_service = email_service or EmailService()
+    batch = claim_batch(batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE)
+    results = {
+        OutboundEmail.STATUS_SENT: 0,
+        OutboundEmail.STATUS_PENDING: 0,
+        OutboundEmail.STATUS_FAILED: 0,
+    }
+    if not batch:
+        return results
+
+    try:
+        send_results = email_service.transport.send_batch(batch)
+    except Exception as e:
+        logger.error(f"Batch send failed: {str(e)}", exc_info=True)
+        send_results = [e] * len(batch)
+
+    for outbound, result in zip(batch, send_results):
+        results[record_result(outbound, result)] += 1
+    return results
@@ -0,0 +1,190 @@
+# users/services/ratelimit.py
+import math
+import re
+import threading
+import time
+from functools import lru_cache, wraps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.shortcuts import render
+from django.utils.module_loading import import_string
+
+RATE_PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+RATE_RE = re.compile(r'^(\d+)/(\d*)([smhd])$')
+
+def parse_rate(rate):
+    """
+    Parse a rate such as '5/m' or '1/30s' into (limit, window in seconds)
+    """
+    match = RATE_RE.match(rate)
+    if not match:
+        raise ImproperlyConfigured(f'Invalid rate limit: {rate!r}')
+    limit, multiplier, period = match.groups()
+    return int(limit), int(multiplier or 1) * RATE_PERIODS[period]
+
+class LocalBackend:
+    """
+    Counters kept in this process, so each worker limits independently.
+    No network or database round trip.
+    """
+    MAX_KEYS = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> (window, {window index: count})
+        self._counts = {}
+
+    def hit(self, key, window_index, window):
+        with self._lock:
+            counts = self._counts.setdefault(key, (window, {}))[1]
+            counts[window_index] = counts.get(window_index, 0) + 1
+            for index in [index for index in counts if index < window_index - 1]:
+                del counts[index]
+            if len(self._counts) > self.MAX_KEYS:
+                self._prune(window_index * window)
+            return counts[window_index], counts.get(window_index - 1, 0)
+
+    def release(self, key, window_index):
+        with self._lock:
+            counts = self._counts.get(key, (None, {}))[1]
+            if counts.get(window_index):
+                counts[window_index] -= 1
+
+    def _prune(self, now):
+        # Drop keys that no longer have a current or previous window
+        for key, (window, counts) in list(self._counts.items()):
+            if max(counts, default=0) < now // window - 1:
+                del self._counts[key]
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+class CacheBackend:
+    """
+    Counters shared between workers through the RATELIMIT_CACHE cache, such
+    as the database cache table or Redis
+    """
+    def __init__(self):
+        self.cache = caches[settings.RATELIMIT_CACHE]
+
+    def hit(self, key, window_index, window):
+        current_key = f'ratelimit:{key}:{window_index}'
+        # Kept for two windows so it can serve as the previous window
+        self.cache.add(current_key, 0, window * 2)
+        try:
+            current = self.cache.incr(current_key)
+        except ValueError:
+            # Expired between add() and incr()
+            self.cache.set(current_key, 1, window * 2)
+            current = 1
+        previous = self.cache.get(f'ratelimit:{key}:{window_index - 1}', 0)
+        return current, previous
+
+    def release(self, key, window_index):
+        try:
+            self.cache.decr(f'ratelimit:{key}:{window_index}')
+        except ValueError:
+            # Already expired, so there is nothing to give back
+            pass
+
+@lru_cache(maxsize=None)
+def get_backend():
+    return import_string(settings.RATELIMIT_BACKEND)()
+
+@receiver(setting_changed)
+def ratelimit_setting_changed(setting, **kwargs):
+    if setting in ('RATELIMIT_BACKEND', 'RATELIMIT_CACHE'):
+        get_backend.cache_clear()
+
+def client_ip(request):
+    """
+    The client address, read from X-Forwarded-For when RATELIMIT_PROXY_COUNT
+    trusted proxies sit in front of the app
+    """
+    proxies = settings.RATELIMIT_PROXY_COUNT
+    forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if proxies and forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(',') if hop.strip()]
+        if len(hops) >= proxies:
+            return hops[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+def request_key(request, key):
+    """
+    Resolve a key spec: 'ip', 'user' or 'post:<field>'. Returns None when the
+    request has no value for it, in which case the limit doesn't apply.
+    """
+    if key == 'ip':
+        return client_ip(request) or None
+    if key == 'user':
+        return str(request.user.pk) if request.user.is_authenticated else None
+    if key.startswith('post:'):
+        value = request.POST.get(key[len('post:'):], '').strip().lower()
+        return value or None
+    raise ImproperlyConfigured(f'Unknown rate limit key: {key!r}')
+
+def check_rate(scope, value, rate, now=None):
+    """
+    Count a hit against the sliding window for scope/value. Returns 0 if the
+    request is allowed, otherwise the seconds until it would be.
+
+    The window is approximated from two fixed windows: the previous window's
+    count is weighted by how much of it still overlaps the sliding window.
+    """
+    limit, window = parse_rate(rate)
+    now = time.time() if now is None else now
+    window_index = int(now // window)
+    current, previous = get_backend().hit(f'{scope}:{value}', window_index, window)
+
+    elapsed = (now % window) / window
+    if previous * (1 - elapsed) + current <= limit:
+        return 0
+    return max(1, math.ceil(window - now % window))
+
+def release_rate(scope, value, rate, now):
+    """
+    Take back a hit counted by check_rate(scope, value, rate, now)
+    """
+    _, window = parse_rate(rate)
+    get_backend().release(f'{scope}:{value}', int(now // window))
+
+def is_redirect(response):
+    return 300 <= response.status_code < 400
+
+def ratelimit(scope, key='ip', methods=('POST',), count_if=None):
+    """
+    Limit a view to settings.RATELIMITS[scope] requests per key. Requests over
+    the limit get a 429 before the view runs, so the password hashing or key
+    decryption it would do is never started.
+
+    With count_if, a request whose response fails count_if(response) is
+    taken back off the count afterwards, e.g. count_if=is_redirect to count
+    only form submissions that succeeded. It is still counted while the
+    view runs, so concurrent requests can't get past the limit together.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapped_view(request, *args, **kwargs):
+            rate = settings.RATELIMITS.get(scope)
+            if settings.RATELIMIT_ENABLE and rate and request.method in methods:
+                value = request_key(request, key)
+                if value is not None:
+                    now = time.time()
+                    retry_after = check_rate(scope, value, rate, now)
+                    if retry_after:
+                        response = render(request, 'users/rate_limited.html', {
+                            'retry_after': retry_after,
+                        }, status=429)
+                        response['Retry-After'] = str(retry_after)
+                        return response
+                    response = view_func(request, *args, **kwargs)
+                    if count_if is not None and not count_if(response):
+                        release_rate(scope, value, rate, now)
+                    return response
+            return view_func(request, *args, **kwargs)
+        return wrapped_view
+    return decorator
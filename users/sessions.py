@@ -0,0 +1,127 @@
+"""
+Session engine for the app (SESSION_ENGINE = 'users.sessions').
+
+Anonymous sessions, such as assessment answers, platform preferences and
+flash messages, are kept in a signed cookie and never touch the database.
+Once a user logs in the session moves to the database, so it can be
+invalidated server side and sensitive values like the one-time recovery key
+never leave the server. The database is read on every request rather than
+through cached_db: a per-worker cached copy would outlive a logout or
+password change made in another worker.
+"""
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.contrib.sessions.backends import db
+from django.core import signing
+from django.utils import timezone
+
+COOKIE_SALT = 'users.sessions.cookie'
+
+def is_cookie_key(session_key):
+    # Database keys are lowercase alphanumeric; signed payloads contain ':'
+    return bool(session_key) and ':' in session_key
+
+class SessionStore(db.SessionStore):
+    def _is_anonymous(self):
+        return SESSION_KEY not in self._session
+
+    def _cookie_payload(self):
+        return signing.dumps(
+            self._session, serializer=self.serializer, compress=True, salt=COOKIE_SALT
+        )
+
+    def load(self):
+        if is_cookie_key(self.session_key):
+            try:
+                return signing.loads(
+                    self.session_key,
+                    serializer=self.serializer,
+                    max_age=self.get_session_cookie_age(),
+                    salt=COOKIE_SALT,
+                )
+            except Exception:
+                # Bad signature or expired; start a fresh session
+                self._session_key = None
+                return {}
+        return super().load()
+
+    def exists(self, session_key):
+        if is_cookie_key(session_key):
+            return False
+        return super().exists(session_key)
+
+    def create(self):
+        if self._is_anonymous():
+            # The cookie payload is produced on save
+            self.modified = True
+            return
+        super().create()
+
+    def save(self, must_create=False):
+        if self._is_anonymous():
+            payload = self._cookie_payload()
+            if len(payload) <= settings.SESSION_ANONYMOUS_COOKIE_MAX_SIZE:
+                previous_key = self.session_key
+                self._session_key = payload
+                self.modified = True
+                if previous_key and not is_cookie_key(previous_key):
+                    # e.g. a session stored before this engine was enabled
+                    super().delete(previous_key)
+                return
+            # Too large for a cookie, keep it in the database instead
+
+        if self.session_key is None or is_cookie_key(self.session_key):
+            # Moving from cookie to database storage needs a new key
+            self._session_key = None
+            return super().create()
+        super().save(must_create=must_create)
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            session_key = self.session_key
+        if session_key is None or is_cookie_key(session_key):
+            # Nothing is stored server side; dropping the data clears the cookie
+            return
+        super().delete(session_key)
+
+    async def aload(self):
+        return await sync_to_async(self.load)()
+
+    async def aexists(self, session_key):
+        return await sync_to_async(self.exists)(session_key)
+
+    async def acreate(self):
+        return await sync_to_async(self.create)()
+
+    async def asave(self, must_create=False):
+        return await sync_to_async(self.save)(must_create=must_create)
+
+    async def adelete(self, session_key=None):
+        return await sync_to_async(self.delete)(session_key)
+
+    @classmethod
+    def clear_expired(cls, batch_size=None, pause=0):
+        """
+        Delete expired database sessions in batches of SESSION_CLEANUP_BATCH_SIZE,
+        each in its own short transaction, instead of one long DELETE.
+        Returns the number of sessions deleted.
+        """
+        model = cls.get_model_class()
+        batch_size = batch_size or settings.SESSION_CLEANUP_BATCH_SIZE
+        deleted = 0
+        while True:
+            keys = list(
+                model.objects.filter(expire_date__lt=timezone.now())
+                .values_list('session_key', flat=True)[:batch_size]
+            )
+            if not keys:
+                return deleted
+            deleted += model.objects.filter(session_key__in=keys).delete()[0]
+            if pause:
+                time.sleep(pause)
+
+    @classmethod
+    async def aclear_expired(cls):
+        return await sync_to_async(cls.clear_expired)()
@@ -0,0 +1,26 @@
+from django.contrib.auth.signals import user_logged_in
+from django.core.signals import request_finished
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .middleware import VERIFIED_SESSION_KEY
+from .models import HashedEmail
+from .services.abuse import invalidate_blocked_hashes
+from .services.activity import flush_quietly
+
+# Replace Django's receiver, which writes last_login on every login
+user_logged_in.disconnect(dispatch_uid='update_last_login')
+request_finished.connect(flush_quietly, dispatch_uid='users.flush_activity_timestamps')
+
+@receiver(post_save, sender=HashedEmail)
+@receiver(post_delete, sender=HashedEmail)
+def hashed_email_changed(sender, **kwargs):
+    invalidate_blocked_hashes()
+
+@receiver(user_logged_in)
+def cache_verification_state(sender, request, user, **kwargs):
+    if request is not None and hasattr(request, 'session'):
+        request.session[VERIFIED_SESSION_KEY] = bool(user.email_verified or user.is_superuser)
+
+@receiver(user_logged_in)
+def record_last_login(sender, user, **kwargs):
+    user.update_last_login()
@@ -0,0 +1,98 @@
+from django.contrib.admin.sites import site
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from users.forms import SignupForm
+from users.models import HashedEmail, User
+from users.services import abuse
+
+@override_settings(
+    BLOCKED_HASHES_LOCAL_TTL=60,
+    BLOCKED_HASHES_SHARED_CACHE=True,
+    EMAIL_HASH_CACHE_TIMEOUT=60,
+    MAX_ACCOUNTS_PER_EMAIL=2,
+)
+class TestCachedAbuseChecks(TestCase):
+    def setUp(self):
+        cache.clear()
+        abuse.invalidate_blocked_hashes()
+        self.email = 'spam@example.com'
+        self.hashed_email = HashedEmail.get_or_create_hash(self.email)
+        self.hashed_email.is_blocked = True
+        self.hashed_email.save()
+        self.signup_data = {
+            'username': 'newuser',
+            'email': self.email,
+            'password1': 'testpass123',
+            'password2': 'testpass123'
+        }
+
+    def tearDown(self):
+        cache.clear()
+        abuse.invalidate_blocked_hashes()
+
+    def test_blocked_signup_is_answered_from_memory(self):
+        abuse.get_blocked()
+        form = SignupForm(data=self.signup_data)
+        form.cleaned_data = {'email': self.email}
+        with self.assertNumQueries(0):
+            with self.assertRaisesMessage(ValidationError, 'cannot be used'):
+                form.clean_email()
+
+    def test_local_copy_survives_shared_cache_loss(self):
+        abuse.get_blocked()
+        cache.clear()
+        with self.assertNumQueries(0):
+            self.assertTrue(abuse.is_hash_blocked(self.hashed_email.email_hash))
+            self.assertTrue(abuse.is_hashed_email_blocked(self.hashed_email.pk))
+
+    def test_unblocking_invalidates(self):
+        self.assertTrue(abuse.is_hash_blocked(self.hashed_email.email_hash))
+        self.hashed_email.is_blocked = False
+        self.hashed_email.save()
+        self.assertFalse(abuse.is_hash_blocked(self.hashed_email.email_hash))
+
+    def test_admin_actions_invalidate(self):
+        self.assertTrue(abuse.is_hash_blocked(self.hashed_email.email_hash))
+        model_admin = site._registry[HashedEmail]
+        request = RequestFactory().post('/')
+        queryset = HashedEmail.objects.filter(pk=self.hashed_email.pk)
+
+        model_admin.unblock_selected_hashes(request, queryset)
+        self.assertFalse(abuse.is_hash_blocked(self.hashed_email.email_hash))
+        model_admin.block_selected_hashes(request, queryset)
+        self.assertTrue(abuse.is_hash_blocked(self.hashed_email.email_hash))
+
+    def test_account_count_reads_database(self):
+        email_hash = HashedEmail.hash_email('user@example.com')
+        with self.assertNumQueries(1):
+            self.assertEqual(abuse.account_count(email_hash), 0)
+
+        hashed_email = HashedEmail.get_or_create_hash('user@example.com')
+        for index in range(2):
+            user = User.objects.create_user(
+                username=f'user{index}', email='', password='testpass123'
+            )
+            user.hashed_email = hashed_email
+            user.save(update_fields=['hashed_email'])
+        self.assertEqual(abuse.account_count(email_hash), 2)
+
+        self.signup_data['email'] = 'user@example.com'
+        form = SignupForm(data=self.signup_data)
+        self.assertFalse(form.is_valid())
+        self.assertIn('Maximum number of accounts', str(form.errors['email']))
+
+        User.objects.get(username='user0').delete()
+        self.assertEqual(abuse.account_count(email_hash), 1)
+
+    def test_blocked_login_is_rejected(self):
+        user = User.objects.create_user(
+            username='blocked', email=self.email, password='testpass123', email_verified=True
+        )
+        user.hashed_email = self.hashed_email
+        user.save()
+        response = self.client.post(reverse('users:login'), {
+            'username': 'blocked', 'password': 'testpass123'
+        })
+        self.assertContains(response, 'This account has been disabled')
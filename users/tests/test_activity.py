@@ -0,0 +1,65 @@
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from users.models import HashedEmail, User
+from users.services import activity
+
+@override_settings(ACTIVITY_TIMESTAMP_GRANULARITY=3600, ACTIVITY_FLUSH_INTERVAL=60, ACTIVITY_FLUSH_BATCH=3)
+class TestActivityTimestamps(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(
+                username=f'user{index}', email=f'user{index}@example.com',
+                password='testpass123', email_verified=True, recovery_key_viewed=True
+            )
+            for index in range(3)
+        ]
+
+    def tearDown(self):
+        activity.flush()
+
+    def test_recent_timestamp_is_not_rewritten(self):
+        user = self.users[0]
+        user.last_login = timezone.now() - timedelta(minutes=5)
+        with self.assertNumQueries(0):
+            self.assertFalse(user.update_last_login())
+
+    def test_writes_are_buffered_and_flushed_in_bulk(self):
+        with self.assertNumQueries(0):
+            self.assertTrue(self.users[0].update_last_login())
+            self.assertTrue(self.users[1].update_last_login())
+        self.assertIsNone(User.objects.get(pk=self.users[0].pk).last_login)
+
+        # The third pending timestamp reaches ACTIVITY_FLUSH_BATCH
+        with self.assertNumQueries(1):
+            self.users[2].update_last_login()
+        for user in self.users:
+            self.assertEqual(User.objects.get(pk=user.pk).last_login, user.last_login)
+
+    def test_mixed_models_flush_one_update_each(self):
+        hashed_email = HashedEmail.get_or_create_hash('someone@example.com')
+        HashedEmail.objects.filter(pk=hashed_email.pk).update(last_used=timezone.now() - timedelta(days=1))
+        hashed_email.refresh_from_db()
+
+        self.users[0].update_last_login()
+        activity.touch(hashed_email, 'last_used')
+        with self.assertNumQueries(2):
+            self.assertEqual(activity.flush(), 2)
+        hashed_email_from_db = HashedEmail.objects.get(pk=hashed_email.pk)
+        self.assertEqual(hashed_email_from_db.last_used, hashed_email.last_used)
+
+    def test_login_writes_last_login_once_per_request(self):
+        response = self.client.post(reverse('users:login'), {
+            'username': 'user0', 'password': 'testpass123'
+        })
+        self.assertEqual(response.status_code, 302)
+        # Flushed at the end of the request even though the interval hasn't passed
+        last_login = User.objects.get(pk=self.users[0].pk).last_login
+        self.assertIsNotNone(last_login)
+
+        self.client.logout()
+        self.client.post(reverse('users:login'), {
+            'username': 'user0', 'password': 'testpass123'
+        })
+        self.assertEqual(User.objects.get(pk=self.users[0].pk).last_login, last_login)
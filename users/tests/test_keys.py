@@ -0,0 +1,70 @@
+from io import StringIO
+from cryptography.fernet import Fernet
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from users.models import RecoveryKey, User
+from users.services.keys import get_keyring
+
+OLD_KEY = Fernet.generate_key()
+NEW_KEY = Fernet.generate_key()
+
+class TestRecoveryKeyring(TestCase):
+    def create_recovery_keys(self, count):
+        plain_keys = {}
+        for index in range(count):
+            user = User.objects.create_user(
+                username=f'user{index}', email=f'user{index}@example.com', password='testpass123'
+            )
+            plain_key = RecoveryKey.generate_recovery_key()
+            recovery_key = RecoveryKey(user=user)
+            recovery_key.encrypt_recovery_key(plain_key)
+            recovery_key.save()
+            plain_keys[recovery_key.pk] = plain_key
+        return plain_keys
+
+    def assert_keys_verify(self, plain_keys):
+        for recovery_key in RecoveryKey.objects.filter(pk__in=plain_keys):
+            self.assertTrue(recovery_key.verify_recovery_key(plain_keys[recovery_key.pk]))
+
+    def test_keyring_is_built_once(self):
+        self.assertIs(RecoveryKey.get_encryption_key(), RecoveryKey.get_encryption_key())
+
+    @override_settings(RECOVERY_KEY_ENCRYPTION_KEY=None)
+    def test_missing_key_is_a_configuration_error(self):
+        with self.assertRaises(ImproperlyConfigured):
+            get_keyring()
+
+    def test_rotation(self):
+        with self.settings(RECOVERY_KEY_ENCRYPTION_KEY=OLD_KEY):
+            plain_keys = self.create_recovery_keys(5)
+
+        with self.settings(RECOVERY_KEY_ENCRYPTION_KEY=NEW_KEY, RECOVERY_KEY_PREVIOUS_KEYS=[OLD_KEY]):
+            # Old tokens still verify through the keyring before rotation
+            self.assert_keys_verify(plain_keys)
+
+            out = StringIO()
+            call_command('rotate_recovery_keys', batch_size=2, dry_run=True, stdout=out)
+            self.assertIn('5 would be rotated', out.getvalue())
+
+            out = StringIO()
+            # Four keyset reads (the last one empty) and a savepoint, UPDATE and release per batch
+            with self.assertNumQueries(4 + 3 * 3):
+                call_command('rotate_recovery_keys', batch_size=2, stdout=out)
+            self.assertIn('5 rotated, 0 already current, 0 failed', out.getvalue())
+
+            out = StringIO()
+            call_command('rotate_recovery_keys', stdout=out)
+            self.assertIn('0 rotated, 5 already current', out.getvalue())
+
+        # The old key can now be retired
+        with self.settings(RECOVERY_KEY_ENCRYPTION_KEY=NEW_KEY, RECOVERY_KEY_PREVIOUS_KEYS=[]):
+            self.assert_keys_verify(plain_keys)
+
+    def test_undecryptable_keys_are_reported(self):
+        with self.settings(RECOVERY_KEY_ENCRYPTION_KEY=OLD_KEY):
+            self.create_recovery_keys(1)
+        with self.settings(RECOVERY_KEY_ENCRYPTION_KEY=NEW_KEY):
+            out = StringIO()
+            call_command('rotate_recovery_keys', stdout=out)
+        self.assertIn('0 rotated, 0 already current, 1 failed', out.getvalue())
@@ -5,6 +5,13 @@ from users.middleware import EmailVerificationMiddleware
 from django.http import HttpResponse
 from users.models import HashedEmail
 from django.contrib.messages import get_messages
+from django.contrib.auth import SESSION_KEY
+from django.core.management import call_command
+from django.test import RequestFactory
+from django.utils.functional import SimpleLazyObject
+from io import StringIO
+from unittest.mock import patch
+from users.middleware import VERIFIED_SESSION_KEY
 
 User = get_user_model()
 
@@ -106,4 +113,43 @@ class TestEmailVerificationMiddleware(TestCase):
         
         # Should now have access
         response = self.client.get(reverse('home'))
-        self.assertEqual(response.status_code, 200)
\ No newline at end of file
+        self.assertEqual(response.status_code, 200)
+
+    def test_login_caches_verified_flag(self):
+        """Test that login stores the verification state in the session"""
+        self.client.force_login(self.verified_user)
+        self.assertTrue(self.client.session[VERIFIED_SESSION_KEY])
+
+        self.client.force_login(self.unverified_user)
+        self.assertFalse(self.client.session[VERIFIED_SESSION_KEY])
+
+    def test_verified_session_skips_user_load(self):
+        """Test that a cached verified flag avoids loading the user"""
+        def load_user():
+            raise AssertionError('user should not be loaded')
+
+        middleware = EmailVerificationMiddleware(lambda request: HttpResponse('ok'))
+        request = RequestFactory().get(reverse('home'))
+        request.session = {SESSION_KEY: str(self.verified_user.pk), VERIFIED_SESSION_KEY: True}
+        request.user = SimpleLazyObject(load_user)
+
+        with self.assertNumQueries(0):
+            response = middleware(request)
+        self.assertEqual(response.content, b'ok')
+
+    def test_allowed_paths_resolved_once(self):
+        """Test that allowed paths are reversed once per middleware instance"""
+        middleware = EmailVerificationMiddleware(lambda request: HttpResponse('ok'))
+        with patch('users.middleware.reverse', wraps=reverse) as mock_reverse:
+            for _ in range(3):
+                request = RequestFactory().get(reverse('users:verification_sent'))
+                request.session = {SESSION_KEY: str(self.unverified_user.pk)}
+                request.user = self.unverified_user
+                self.assertEqual(middleware(request).content, b'ok')
+        self.assertEqual(mock_reverse.call_count, 3)
+
+    def test_benchmark_command(self):
+        """Test that the middleware microbenchmark runs"""
+        out = StringIO()
+        call_command('benchmark_verification_middleware', iterations=10, stdout=out)
+        self.assertIn('ns/request', out.getvalue())
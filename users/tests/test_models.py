@@ -3,8 +3,10 @@ from django.test import Client, TestCase, override_settings
 from django.core.exceptions import ValidationError
 from users.models import User, HashedEmail
 from django.conf import settings
-from django.db import IntegrityError
+from django.db import IntegrityError, connection
 from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from django.utils import timezone
 
 @override_settings(MAX_ACCOUNTS_PER_EMAIL=2)
@@ -115,12 +117,17 @@ class TestHashedEmail(TestCase):
         hashed_email2 = HashedEmail.get_or_create_hash(self.email)
         self.assertEqual(hashed_email1, hashed_email2)
         
-        # Verify last_used is updated
-        old_last_used = hashed_email1.last_used
+        # Verify last_used is updated once it is older than the granularity
+        old_last_used = timezone.now() - timedelta(seconds=settings.ACTIVITY_TIMESTAMP_GRANULARITY + 1)
+        HashedEmail.objects.filter(pk=hashed_email1.pk).update(last_used=old_last_used)
         hashed_email3 = HashedEmail.get_or_create_hash(self.email)
         hashed_email3.refresh_from_db()
         self.assertGreater(hashed_email3.last_used, old_last_used)
 
+        # But not rewritten again within it
+        with self.assertNumQueries(1):
+            HashedEmail.get_or_create_hash(self.email)
+
     def test_active_users_counting(self):
         """Test counting of active users"""
         hashed_email = HashedEmail.get_or_create_hash(self.email)
@@ -185,6 +192,60 @@ class TestHashedEmail(TestCase):
         user4.delete()
         self.assertEqual(hashed_email.get_total_users_count(), 3)
 
+    def test_with_user_counts(self):
+        """Test annotated counts match the per-instance methods"""
+        hashed_email = HashedEmail.get_or_create_hash(self.email)
+        unused = HashedEmail.get_or_create_hash("unused@example.com")
+        now = timezone.now()
+        for i, days_ago in enumerate([5, 45, None]):
+            user = User.objects.create_user(
+                username=f"user{i}",
+                email=self.email,
+                password=self.password
+            )
+            user.hashed_email = hashed_email
+            user.last_login = now - timedelta(days=days_ago) if days_ago else None
+            user.save()
+
+        counts = {
+            h.pk: (h.total_users, h.active_users)
+            for h in HashedEmail.objects.with_user_counts()
+        }
+        self.assertEqual(counts[hashed_email.pk], (3, 1))
+        self.assertEqual(counts[unused.pk], (0, 0))
+        annotated = HashedEmail.objects.with_user_counts(days=60).get(pk=hashed_email.pk)
+        self.assertEqual(annotated.active_users, hashed_email.get_active_users_count(days=60))
+
+    def test_admin_changelist_counts_in_one_query(self):
+        """Test the admin changelist doesn't count users per row"""
+        admin_user = User.objects.create_superuser(
+            username="siteadmin",
+            email="siteadmin@example.com",
+            password=self.password
+        )
+        admin_user.email_verified = True
+        admin_user.recovery_key_viewed = True
+        admin_user.save()
+        client = Client()
+        client.force_login(admin_user)
+        url = reverse('admin:users_hashedemail_changelist')
+
+        HashedEmail.get_or_create_hash(self.email)
+        with CaptureQueriesContext(connection) as few:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        for i in range(10):
+            HashedEmail.get_or_create_hash(f"other{i}@example.com")
+        with CaptureQueriesContext(connection) as many:
+            response = client.get(url, {'o': '-4'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(many), len(few))
+
+        response = client.get(url, {'accounts': '2'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 0)
+
     def test_blocking_functionality(self):
         """Test email blocking functionality"""
         hashed_email = HashedEmail.get_or_create_hash(self.email)
@@ -0,0 +1,207 @@
+from datetime import timedelta
+from io import StringIO
+from django.core import mail
+from django.core.management import call_command
+from django.template.loader import get_template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from users.models import OutboundEmail, User
+from unittest.mock import MagicMock, patch
+from users.services.mail import BaseTransport, EmailService, MailtrapTransport, compiled_template, metrics
+from users.services.outbox import claim_batch, process_outbox, retry_delay
+
+class FlakyTransport(BaseTransport):
+    """Transport stand-in that fails a set number of times before succeeding"""
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.sent = []
+
+    def send(self, to_email, subject, html_content, text_content):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('provider unavailable')
+        self.sent.append(to_email)
+        return f'msg-{len(self.sent)}'
+
+@override_settings(
+    EMAIL_OUTBOX_RETRY_DELAY=30,
+    EMAIL_OUTBOX_MAX_RETRY_DELAY=600,
+    EMAIL_OUTBOX_MAX_ATTEMPTS=3,
+    EMAIL_OUTBOX_BATCH_SIZE=2,
+)
+class TestEmailOutbox(TestCase):
+    def queue(self, count=1):
+        service = EmailService()
+        return [
+            service.queue_email(f'user{index}@example.com', 'Subject', '<p>Hello</p>')
+            for index in range(count)
+        ]
+
+    def test_signup_queues_email_without_sending(self):
+        response = self.client.post(reverse('users:signup'), {
+            'username': 'newuser',
+            'email': 'new@example.com',
+            'password1': 'testpass123',
+            'password2': 'testpass123'
+        })
+        self.assertRedirects(response, reverse('users:verification_sent'))
+        self.assertEqual(len(mail.outbox), 0)
+
+        outbound = OutboundEmail.objects.get()
+        user = User.objects.get(username='newuser')
+        self.assertEqual(outbound.to_email, 'new@example.com')
+        self.assertIn(user.verification_token, outbound.text_content)
+
+        process_outbox()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['new@example.com'])
+
+        # The address and verification link don't outlive delivery
+        outbound.refresh_from_db()
+        self.assertEqual(outbound.status, OutboundEmail.STATUS_SENT)
+        self.assertEqual((outbound.to_email, outbound.html_content, outbound.text_content), ('', '', ''))
+        self.assertFalse(OutboundEmail.objects.filter(text_content__contains=user.verification_token).exists())
+
+    def test_queue_strips_html_for_text_part(self):
+        outbound, = self.queue()
+        self.assertEqual(outbound.text_content, 'Hello')
+        self.assertEqual(outbound.status, OutboundEmail.STATUS_PENDING)
+
+    def test_batches_are_limited(self):
+        self.queue(3)
+        transport = FlakyTransport()
+        results = process_outbox(email_service=EmailService(transport))
+        self.assertEqual(results[OutboundEmail.STATUS_SENT], 2)
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.STATUS_PENDING).count(), 1)
+
+        process_outbox(email_service=EmailService(transport))
+        self.assertEqual(len(transport.sent), 3)
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.STATUS_SENT).exists())
+
+    def test_failure_backs_off_then_gives_up(self):
+        outbound, = self.queue()
+        service = EmailService(FlakyTransport(failures=10))
+
+        before = timezone.now()
+        process_outbox(email_service=service)
+        outbound.refresh_from_db()
+        self.assertEqual(outbound.status, OutboundEmail.STATUS_PENDING)
+        self.assertEqual(outbound.attempts, 1)
+        self.assertIn('provider unavailable', outbound.last_error)
+        self.assertGreaterEqual(outbound.next_attempt_at, before + timedelta(seconds=30))
+        # Kept for the retry
+        self.assertEqual(outbound.to_email, 'user0@example.com')
+        self.assertEqual(outbound.text_content, 'Hello')
+
+        # Not due yet, so nothing is claimed
+        self.assertEqual(claim_batch(10), [])
+
+        for attempt in range(2):
+            OutboundEmail.objects.update(next_attempt_at=timezone.now())
+            process_outbox(email_service=service)
+        outbound.refresh_from_db()
+        self.assertEqual(outbound.status, OutboundEmail.STATUS_FAILED)
+        self.assertEqual(outbound.attempts, 3)
+        self.assertEqual((outbound.to_email, outbound.html_content, outbound.text_content), ('', '', ''))
+
+    def test_retry_delay_is_exponential_and_capped(self):
+        self.assertEqual(retry_delay(1), timedelta(seconds=30))
+        self.assertEqual(retry_delay(3), timedelta(seconds=120))
+        self.assertEqual(retry_delay(10), timedelta(seconds=600))
+
+    def test_expired_claims_are_retried(self):
+        outbound, = self.queue()
+        claimed = claim_batch(10)
+        self.assertEqual([email.pk for email in claimed], [outbound.pk])
+        self.assertEqual(claim_batch(10), [])
+
+        # Simulate a worker that died before finishing its batch
+        OutboundEmail.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual([email.pk for email in claim_batch(10)], [outbound.pk])
+
+    def test_command_drains_outbox(self):
+        self.queue(3)
+        out = StringIO()
+        call_command('process_email_outbox', stdout=out)
+        self.assertIn('3 sent', out.getvalue())
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_batch_is_sent_in_one_transport_call(self):
+        self.queue(2)
+        transport = FlakyTransport()
+        with patch.object(transport, 'send_batch', wraps=transport.send_batch) as send_batch:
+            process_outbox(email_service=EmailService(transport))
+        send_batch.assert_called_once()
+        self.assertEqual(len(transport.sent), 2)
+
+def mock_response(data, status=200):
+    response = MagicMock(ok=status < 400, status_code=status)
+    response.json.return_value = data
+    return response
+
+class TestMailtrapTransport(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.transport = MailtrapTransport()
+        self.messages = [
+            OutboundEmail(to_email=f'user{index}@example.com', subject='Hi',
+                          html_content='<p>Hi</p>', text_content='Hi')
+            for index in range(3)
+        ]
+
+    def test_connections_are_pooled_and_reused(self):
+        adapter = self.transport.session.get_adapter('https://send.api.mailtrap.io')
+        self.assertEqual(adapter._pool_maxsize, 10)
+
+        with patch.object(self.transport.session, 'post',
+                          return_value=mock_response({'success': True, 'message_ids': ['abc']})) as post:
+            self.assertEqual(self.transport.send('a@example.com', 'Hi', '<p>Hi</p>', 'Hi'), 'abc')
+            self.transport.send('b@example.com', 'Hi', '<p>Hi</p>', 'Hi')
+        self.assertEqual(post.call_count, 2)
+        self.assertTrue(post.call_args.args[0].endswith('/api/send'))
+        self.assertEqual(metrics.snapshot()['sent'], 2)
+
+    def test_send_batch_maps_results_per_message(self):
+        data = {'success': True, 'responses': [
+            {'success': True, 'message_ids': ['id-0']},
+            {'success': False, 'errors': ['invalid address']},
+            {'success': True, 'message_ids': ['id-2']},
+        ]}
+        with patch.object(self.transport.session, 'post', return_value=mock_response(data)) as post:
+            results = self.transport.send_batch(self.messages)
+
+        post.assert_called_once()
+        self.assertTrue(post.call_args.args[0].endswith('/api/batch'))
+        payload = post.call_args.kwargs['json']
+        self.assertEqual(payload['base']['from']['email'], 'noreply@mybluelist.org')
+        self.assertEqual(
+            [request['to'][0]['email'] for request in payload['requests']],
+            [message.to_email for message in self.messages]
+        )
+        self.assertNotIn('from', payload['requests'][0])
+
+        self.assertEqual(results[0], 'id-0')
+        self.assertIsInstance(results[1], Exception)
+        self.assertIn('invalid address', str(results[1]))
+        self.assertEqual(results[2], 'id-2')
+        snapshot = metrics.snapshot()
+        self.assertEqual((snapshot['requests'], snapshot['sent'], snapshot['failed']), (1, 2, 1))
+
+    def test_send_batch_failure_fails_every_message(self):
+        with patch.object(self.transport.session, 'post',
+                          return_value=mock_response({'errors': ['Unauthorized']}, status=401)):
+            results = self.transport.send_batch(self.messages)
+        self.assertTrue(all(isinstance(result, Exception) for result in results))
+        snapshot = metrics.snapshot()
+        self.assertEqual((snapshot['errors'], snapshot['failed']), (1, 3))
+
+class TestVerificationTemplates(TestCase):
+    def test_templates_are_compiled_once(self):
+        compiled_template.cache_clear()
+        user = User(username='someone', email='someone@example.com')
+        with patch('users.services.mail.get_template', wraps=get_template) as loader:
+            for _ in range(3):
+                html, text = EmailService().render_verification_email(user, 'https://example.com/verify/abc')
+        self.assertEqual(loader.call_count, 2)
+        self.assertIn('https://example.com/verify/abc', text)
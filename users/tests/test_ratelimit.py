@@ -0,0 +1,138 @@
+from unittest.mock import patch
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.exceptions import ImproperlyConfigured
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from users.models import User
+from users.services import ratelimit
+
+@override_settings(
+    RATELIMIT_ENABLE=True,
+    RATELIMIT_BACKEND='users.services.ratelimit.LocalBackend',
+    RATELIMITS={
+        'login': '100/m',
+        'login_username': '3/m',
+        'reset_password': '100/m',
+        'reset_password_username': '2/h',
+        'signup': '2/h',
+        'import': '1/30s',
+    },
+)
+class TestRateLimit(TestCase):
+    def setUp(self):
+        ratelimit.get_backend().clear()
+        self.user = User.objects.create_user(
+            username='target', email='target@example.com', password='testpass123', email_verified=True
+        )
+
+    def tearDown(self):
+        ratelimit.get_backend().clear()
+
+    def test_parse_rate(self):
+        self.assertEqual(ratelimit.parse_rate('5/m'), (5, 60))
+        self.assertEqual(ratelimit.parse_rate('1/30s'), (1, 30))
+        self.assertEqual(ratelimit.parse_rate('10/2h'), (10, 7200))
+        with self.assertRaises(ImproperlyConfigured):
+            ratelimit.parse_rate('five per minute')
+
+    def test_sliding_window_weights_previous_window(self):
+        # 3 hits at the very end of one window
+        for _ in range(3):
+            self.assertEqual(ratelimit.check_rate('test', 'key', '4/m', now=59.9), 0)
+        # A quarter into the next window 75% of them still count: 2.25 + 1
+        self.assertEqual(ratelimit.check_rate('test', 'key', '4/m', now=75), 0)
+        # 2.25 + 2 is over the limit; retry after the rest of the window
+        self.assertEqual(ratelimit.check_rate('test', 'key', '4/m', now=75), 45)
+        # Two windows later nothing counts
+        self.assertEqual(ratelimit.check_rate('test', 'key', '4/m', now=180), 0)
+
+    def test_login_limited_per_username_before_password_check(self):
+        data = {'username': 'Target', 'password': 'wrong-password'}
+        for _ in range(3):
+            self.assertEqual(self.client.post(reverse('users:login'), data).status_code, 200)
+
+        with patch('django.contrib.auth.forms.authenticate') as authenticate:
+            response = self.client.post(reverse('users:login'), data)
+        authenticate.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], str(response.context['retry_after']))
+        self.assertContains(response, 'too many requests', status_code=429)
+
+        # Other usernames are unaffected
+        response = self.client.post(reverse('users:login'), {'username': 'other', 'password': 'x'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_reset_password_limited_per_username(self):
+        data = {
+            'username': 'target', 'recovery_key': 'guess',
+            'new_password1': 'newpass123', 'new_password2': 'newpass123'
+        }
+        for _ in range(2):
+            self.client.post(reverse('users:reset_password'), data)
+        self.assertEqual(self.client.post(reverse('users:reset_password'), data).status_code, 429)
+
+    def test_signup_limited_per_ip(self):
+        for index in range(2):
+            self.client.post(reverse('users:signup'), {'username': f'new{index}'})
+        response = self.client.post(reverse('users:signup'), {'username': 'new3'}, REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(reverse('users:signup'), {'username': 'new4'})
+        self.assertEqual(response.status_code, 429)
+
+    def test_get_requests_are_not_counted(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get(reverse('users:signup')).status_code, 200)
+
+    def test_import_counts_only_successful_imports(self):
+        self.user.user_permissions.add(Permission.objects.get(codename='can_import_business_csv'))
+        self.client.force_login(self.user)
+        url = reverse('import_business')
+
+        # A rejected file can be corrected and resubmitted straight away
+        for _ in range(2):
+            response = self.client.post(url, {'name': 'Acme'})
+            self.assertEqual(response.status_code, 200)
+
+        csv_file = SimpleUploadedFile('acme.csv', b'Recipient,View,From Organization\nSomeone,Democrat,$10\n')
+        response = self.client.post(url, {
+            'name': 'Acme', 'website': 'https://acme.example', 'description': 'Widgets',
+            'csv_file': csv_file, 'data_sources[]': ['https://example.com'],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.client.post(url, {'name': 'Acme 2'}).status_code, 429)
+
+    @override_settings(RATELIMIT_BACKEND='users.services.ratelimit.CacheBackend')
+    def test_import_limit_is_shared_between_workers(self):
+        self.user.user_permissions.add(Permission.objects.get(codename='can_import_business_csv'))
+        self.client.force_login(self.user)
+        csv_file = SimpleUploadedFile('acme.csv', b'Recipient,View,From PACs\nSomeone,Democrat,$10\n')
+        response = self.client.post(reverse('import_business'), {
+            'name': 'Acme', 'website': 'https://acme.example', 'description': 'Widgets',
+            'csv_file': csv_file, 'data_sources[]': ['https://example.com'],
+        })
+        self.assertEqual(response.status_code, 302)
+
+        # Another worker has its own backend instance but reads the same counts
+        ratelimit.get_backend.cache_clear()
+        self.assertEqual(self.client.post(reverse('import_business'), {'name': 'Acme 2'}).status_code, 429)
+
+    @override_settings(RATELIMIT_PROXY_COUNT=1)
+    def test_client_ip_behind_proxy(self):
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='1.1.1.1, 2.2.2.2', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(ratelimit.client_ip(request), '2.2.2.2')
+
+    @override_settings(RATELIMIT_BACKEND='users.services.ratelimit.CacheBackend')
+    def test_shared_cache_backend(self):
+        cache.clear()
+        for _ in range(3):
+            self.assertEqual(ratelimit.check_rate('shared', 'key', '3/h', now=10), 0)
+        # A fresh backend instance, as in another worker, sees the same counts
+        ratelimit.get_backend.cache_clear()
+        self.assertGreater(ratelimit.check_rate('shared', 'key', '3/h', now=10), 0)
+        # Released hits are given back to every worker
+        for _ in range(2):
+            ratelimit.release_rate('shared', 'key', '3/h', now=10)
+        self.assertEqual(ratelimit.check_rate('shared', 'key', '3/h', now=10), 0)
+        cache.clear()
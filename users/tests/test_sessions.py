@@ -0,0 +1,88 @@
+from datetime import timedelta
+from io import StringIO
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from users.models import User
+from users.sessions import SessionStore, is_cookie_key
+
+class TestSessionStore(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='member', email='member@example.com', password='testpass123',
+            email_verified=True, recovery_key_viewed=True
+        )
+
+    def browse_with_platform(self):
+        return self.client.get(reverse('security_browse'), {'platform_filter': '1', 'platform': ['Mac']})
+
+    def test_anonymous_session_uses_signed_cookie(self):
+        response = self.browse_with_platform()
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Session.objects.exists())
+
+        cookie = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.assertTrue(is_cookie_key(cookie))
+        self.assertEqual(self.client.session['security_platforms'], ['Mac'])
+
+    def test_login_moves_session_to_database(self):
+        self.browse_with_platform()
+        self.client.post(reverse('users:login'), {'username': 'member', 'password': 'testpass123'})
+
+        cookie = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.assertFalse(is_cookie_key(cookie))
+        session = Session.objects.get(session_key=cookie).get_decoded()
+        self.assertEqual(session['_auth_user_id'], str(self.user.pk))
+        # Data from the anonymous session carries over
+        self.assertEqual(session['security_platforms'], ['Mac'])
+
+        self.client.post(reverse('users:logout'))
+        self.assertFalse(Session.objects.exists())
+
+    def test_session_revoked_in_database_is_logged_out(self):
+        self.client.post(reverse('users:login'), {'username': 'member', 'password': 'testpass123'})
+        session_key = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.assertEqual(SessionStore(session_key).get('_auth_user_id'), str(self.user.pk))
+
+        # As when another worker handles a logout or password change
+        Session.objects.filter(session_key=session_key).delete()
+        self.assertIsNone(SessionStore(session_key).get('_auth_user_id'))
+
+    def test_tampered_cookie_is_discarded(self):
+        self.browse_with_platform()
+        cookie = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        store = SessionStore(cookie[:-2] + 'xx')
+        self.assertEqual(dict(store.items()), {})
+        self.assertIsNone(store.session_key)
+
+    @override_settings(SESSION_ANONYMOUS_COOKIE_MAX_SIZE=10)
+    def test_large_anonymous_session_falls_back_to_database(self):
+        store = SessionStore()
+        store['answers'] = list(range(100))
+        store.save()
+        self.assertFalse(is_cookie_key(store.session_key))
+        self.assertEqual(SessionStore(store.session_key)['answers'], list(range(100)))
+
+    def test_clear_expired_deletes_in_batches(self):
+        expired = timezone.now() - timedelta(days=1)
+        Session.objects.bulk_create([
+            Session(session_key=f'expired{index:025d}', session_data='', expire_date=expired)
+            for index in range(5)
+        ])
+        Session.objects.create(
+            session_key='current0000000000000000000000000', session_data='',
+            expire_date=timezone.now() + timedelta(days=1)
+        )
+
+        # Three batches of up to two, each a select and a delete, then a final empty select
+        with self.assertNumQueries(3 * 2 + 1):
+            self.assertEqual(SessionStore.clear_expired(batch_size=2), 5)
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)),
+                         ['current0000000000000000000000000'])
+
+        out = StringIO()
+        call_command('clear_expired_sessions', stdout=out)
+        self.assertIn('Deleted 0 expired sessions', out.getvalue())
@@ -0,0 +1,80 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from users.models import HashedEmail, RecoveryKey, User
+from users.services import abuse
+
+class TestDeleteUnverifiedUsers(TestCase):
+    def setUp(self):
+        self.email = 'shared@example.com'
+        self.hashed_email = HashedEmail.get_or_create_hash(self.email)
+
+    def create_user(self, username, days_ago, verified=False, **extra):
+        user = User.objects.create_user(
+            username=username, email=self.email, password='testpass123', **extra
+        )
+        user.email_verified = verified
+        user.verification_token = '' if verified else f'token-{username}'
+        user.date_joined = timezone.now() - timedelta(days=days_ago)
+        user.hashed_email = self.hashed_email
+        user.save()
+        return user
+
+    def run_command(self, *args):
+        out = StringIO()
+        call_command('delete_unverified_users', *args, stdout=out)
+        return out.getvalue()
+
+    def test_deletes_only_stale_unverified_accounts(self):
+        stale = [self.create_user(f'stale{index}', days_ago=30) for index in range(3)]
+        recent = self.create_user('recent', days_ago=1)
+        verified = self.create_user('verified', days_ago=30, verified=True)
+        staff = self.create_user('staff', days_ago=30, is_staff=True)
+        RecoveryKey.objects.create(user=stale[0], encrypted_key='x', key_salt='y')
+
+        output = self.run_command('--days', '14', '--batch-size', '2')
+
+        self.assertIn('3 deleted', output)
+        self.assertFalse(User.objects.filter(pk__in=[user.pk for user in stale]).exists())
+        self.assertFalse(RecoveryKey.objects.filter(user_id=stale[0].pk).exists())
+        self.assertEqual(
+            set(User.objects.values_list('pk', flat=True)),
+            {recent.pk, verified.pk, staff.pk},
+        )
+        # The hash itself is kept for abuse checks
+        self.assertTrue(HashedEmail.objects.filter(pk=self.hashed_email.pk).exists())
+
+    def test_dry_run(self):
+        self.create_user('stale', days_ago=30)
+        output = self.run_command('--days', '14', '--dry-run')
+        self.assertIn('1 would be deleted', output)
+        self.assertTrue(User.objects.filter(username='stale').exists())
+
+    def test_account_count_reflects_deletion(self):
+        for index in range(2):
+            self.create_user(f'stale{index}', days_ago=30)
+        self.assertEqual(abuse.account_count(self.hashed_email.email_hash), 2)
+
+        self.run_command('--days', '14')
+        with self.assertNumQueries(1):
+            self.assertEqual(abuse.account_count(self.hashed_email.email_hash), 0)
+
+    def test_deletion_does_not_query_per_user(self):
+        for index in range(5):
+            self.create_user(f'stale{index}', days_ago=30)
+        # Read, savepoint, three auth tables, recovery keys, two edit request
+        # references, the political data history reference, the users, release,
+        # and the final empty read
+        with self.assertNumQueries(12):
+            self.run_command('--days', '14')
+
+    def test_verify_email_uses_token(self):
+        user = self.create_user('pending', days_ago=1)
+        response = self.client.get(reverse('users:verify_email', args=[user.verification_token]))
+        self.assertRedirects(response, reverse('users:verification_success'))
+        user.refresh_from_db()
+        self.assertTrue(user.email_verified)
+        self.assertEqual(user.verification_token, '')
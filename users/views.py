@@ -8,12 +8,15 @@ from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.urls import reverse
 from django.conf import settings
+from django.db import transaction
 from django.views.decorators.http import require_http_methods
 import secrets
 import logging
 from .forms import LoginForm, PasswordResetForm, SignupForm
 from .models import RecoveryKey, User, HashedEmail
+from .services.abuse import is_hashed_email_blocked
 from .services.mail import EmailService
+from .services.ratelimit import ratelimit
 
 logger = logging.getLogger(__name__)
 email_service = EmailService()
@@ -21,6 +24,8 @@ email_service = EmailService()
 def get_involved(request):
     return render(request, 'users/get_involved.html')
 
+@ratelimit('login')
+@ratelimit('login_username', key='post:username')
 def login_view(request):
     if request.user.is_authenticated:
         # Check if they need to see their recovery key
@@ -34,12 +39,12 @@ def login_view(request):
             user = form.get_user()
 
             # Check if user's hashed_email is blocked
-            if user.hashed_email and user.hashed_email.is_blocked:
+            if is_hashed_email_blocked(user.hashed_email_id):
                 messages.error(request, 'This account has been disabled due to suspicious activity.')
                 return render(request, 'users/login.html', {'form': form})
             
+            # last_login is bumped (throttled) by the user_logged_in receiver
             login(request, user)
-            user.update_last_login()
             
             # Handle remember me
             if not form.cleaned_data.get('remember_me'):
@@ -83,23 +88,25 @@ def logout_view(request):
 def resend_verification(request):
     if not request.user.email_verified:
         try:
-            request.user.verification_token = secrets.token_urlsafe(32)
-            request.user.save()
-            
-            verification_url = request.build_absolute_uri(
-                reverse('users:verify_email', args=[request.user.verification_token])
-            )
-            
-            success, message_id = email_service.send_verification_email(
-                request.user, 
-                verification_url
-            )
+            # The email is queued in the outbox, committed together with the new token
+            with transaction.atomic():
+                request.user.verification_token = secrets.token_urlsafe(32)
+                request.user.save()
+
+                verification_url = request.build_absolute_uri(
+                    reverse('users:verify_email', args=[request.user.verification_token])
+                )
+
+                success, message_id = email_service.send_verification_email(
+                    request.user,
+                    verification_url
+                )
             
             if success:
-                logger.info(f"Verification email resent successfully to {request.user.email}")
+                logger.info(f"Verification email queued for {request.user.email}")
                 messages.success(request, 'Verification email has been resent.')
             else:
-                logger.error(f"Failed to resend verification email to {request.user.email}")
+                logger.error(f"Failed to queue verification email for {request.user.email}")
                 messages.error(request, 'Failed to send verification email. Please try again.')
         except Exception as e:
             logger.error(f"Error in resend_verification: {str(e)}", exc_info=True)
@@ -107,6 +114,8 @@ def resend_verification(request):
             
     return redirect('users:verification_sent')
 
+@ratelimit('reset_password')
+@ratelimit('reset_password_username', key='post:username')
 def reset_password(request):
     if request.method == 'POST':
         form = PasswordResetForm(request.POST)
@@ -158,31 +167,34 @@ def show_recovery_key(request):
         'recovery_key': recovery_key
     })
 
+@ratelimit('signup')
 def signup(request):
     if request.method == 'POST':
         form = SignupForm(request.POST)
         if form.is_valid():
             try:
-                user = form.save(commit=False)
-                user.email_verified = False
-                user.verification_token = secrets.token_urlsafe(32)
-                user.save()
-                
-                verification_url = request.build_absolute_uri(
-                    reverse('users:verify_email', args=[user.verification_token])
-                )
-                
-                success, message_id = email_service.send_verification_email(
-                    user, 
-                    verification_url
-                )
+                # The email is queued in the outbox, committed together with the user
+                with transaction.atomic():
+                    user = form.save(commit=False)
+                    user.email_verified = False
+                    user.verification_token = secrets.token_urlsafe(32)
+                    user.save()
+
+                    verification_url = request.build_absolute_uri(
+                        reverse('users:verify_email', args=[user.verification_token])
+                    )
+
+                    success, message_id = email_service.send_verification_email(
+                        user,
+                        verification_url
+                    )
                 
                 if success:
-                    logger.info(f"User {user.username} created and verification email sent")
+                    logger.info(f"User {user.username} created and verification email queued")
                     messages.success(request, 
                         'Account created successfully. Please check your email to verify your account.')
                 else:
-                    logger.error(f"Failed to send verification email to new user {user.email}")
+                    logger.error(f"Failed to queue verification email for new user {user.email}")
                     messages.warning(request, 
                         'Account created but we could not send the verification email. '
                         'Please use the resend verification option.')